@@ -1,8 +1,30 @@
-from flask import Flask, request, render_template, jsonify, send_file, flash
+from flask import Flask, Request, request, render_template, jsonify, send_file, flash, Response, stream_with_context
 import os
-from modules import PDFConverter, generate_unique_filename, cleanup_file, validate_pdf_file, create_response
+import json
+import time
+import logging
+import tempfile
+import threading
+from modules import (PDFConverter, prewarm, screen_pdf, check_page_range, ConversionCache, JobQueue, TabulaBackend, StrategyStore, StorageManager, metrics, generate_unique_filename, cleanup_file,
+                     validate_pdf_file, create_response, parse_page_ranges, validate_output_format, OUTPUT_FORMATS, MIMETYPES)
+
+# LOG_LEVEL=DEBUG mostra o rastreamento detalhado da extração página a página
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'),
+                    format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+# Uploads até este tamanho ficam em memória em /convert-direct, sem arquivos intermediários
+DIRECT_MAX_MEMORY = int(os.environ.get('DIRECT_MAX_MEMORY', str(16 * 1024 * 1024)))  # 16MB
+
+
+class SpooledRequest(Request):
+    """Keeps uploaded files in memory up to DIRECT_MAX_MEMORY before spilling to a temp file"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=DIRECT_MAX_MEMORY, mode='rb+')
+
 
 app = Flask(__name__)
+app.request_class = SpooledRequest
 app.secret_key = 'your-secret-key-here'
 
 # Configuration
@@ -10,17 +32,80 @@ UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'output'
 EXCEL_FOLDER = os.path.join(OUTPUT_FOLDER, 'excel')
 TEMP_FOLDER = 'temp'
+CACHE_FOLDER = os.path.join(OUTPUT_FOLDER, 'cache')
+JOBS_DB = os.path.join(TEMP_FOLDER, 'jobs.db')
+STORAGE_DB = os.path.join(TEMP_FOLDER, 'storage.db')
 ALLOWED_EXTENSIONS = {'pdf'}
-MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
+MAX_FILE_SIZE = int(os.environ.get('MAX_FILE_SIZE', str(16 * 1024 * 1024)))  # 16MB
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', str(200 * 1024 * 1024)))  # 200MB
+EXCEL_BACKEND = os.environ.get('EXCEL_BACKEND', 'streaming')  # 'streaming' ou 'standard'
+# Conversões simultâneas em segundo plano; 0 executa na própria requisição (serverless)
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '0' if 'VERCEL' in os.environ else '2'))
+EXTRACTION_WORKERS = int(os.environ.get('EXTRACTION_WORKERS', '1'))  # Processos por conversão
+# Uma página por vez, gravando as tabelas conforme são extraídas: memória estável em PDFs enormes
+LOW_MEMORY = os.environ.get('LOW_MEMORY', '0') == '1'
+# Tenta primeiro a estratégia que venceu as primeiras páginas (e documentos do mesmo layout)
+ADAPTIVE_STRATEGY = os.environ.get('ADAPTIVE_STRATEGY', '0') == '1'
+STRATEGY_PLANS = os.path.join(TEMP_FOLDER, 'strategy_plans.json')
+# Une as tabelas que continuam na página seguinte: um extrato de 300 páginas vira uma planilha
+STITCH_TABLES = os.environ.get('STITCH_TABLES', '0') == '1'
+# Colunas de números (1.234,56), percentuais e datas (dd/mm/aaaa) viram células numéricas e de data no Excel
+TYPED_CELLS = os.environ.get('TYPED_CELLS', '0') == '1'
+# Processo dedicado com a JVM do tabula aquecida; desligado no Vercel, onde não há processos persistentes
+TABULA_WARM = os.environ.get('TABULA_WARM', '0' if 'VERCEL' in os.environ else '1') == '1'
+TABULA_TIMEOUT = int(os.environ.get('TABULA_TIMEOUT', '120'))  # Segundos por chamada ao tabula
+# pdfplumber e tabula ao mesmo tempo, ficando com o primeiro resultado aceitável; ENGINE_TIMEOUT limita cada motor
+ENGINE_RACE = os.environ.get('ENGINE_RACE', '0') == '1'
+ENGINE_TIMEOUT = int(os.environ.get('ENGINE_TIMEOUT', '300'))
+# Triagem antes da extração: recusa PDFs sem texto e pula as páginas sem texto (o /upload sempre faz a triagem)
+PDF_SCREENING = os.environ.get('PDF_SCREENING', '0') == '1'
+# Remove as linhas repetidas entre as tabelas e os cabeçalhos repetidos no meio dos dados
+DEDUPE_ROWS = os.environ.get('DEDUPE_ROWS', '0') == '1'
+# Colunas de tabelas sem linhas encontradas pelas posições dos caracteres, antes da estratégia 'text'
+GEOMETRIC_COLUMNS = os.environ.get('GEOMETRIC_COLUMNS', '0') == '1'
+# Uploads e arquivos gerados expiram após STORAGE_TTL segundos sem acesso; cada pasta tem sua cota em bytes
+STORAGE_TTL = int(os.environ.get('STORAGE_TTL', str(24 * 3600)))
+UPLOADS_MAX_BYTES = int(os.environ.get('UPLOADS_MAX_BYTES', str(1024 * 1024 * 1024)))  # 1GB
+OUTPUT_MAX_BYTES = int(os.environ.get('OUTPUT_MAX_BYTES', str(1024 * 1024 * 1024)))  # 1GB
+STORAGE_HASHED_DIRS = os.environ.get('STORAGE_HASHED_DIRS', '0') == '1'  # Subpastas ab/cd/ pelo hash do nome
+# Segundos entre limpezas em segundo plano; 0 limpa só quando a cota estoura (serverless)
+STORAGE_SWEEP_INTERVAL = int(os.environ.get('STORAGE_SWEEP_INTERVAL', '0' if 'VERCEL' in os.environ else '300'))
+# Importa pdfplumber, pandas e openpyxl em segundo plano logo após a inicialização, antes da primeira conversão
+PREWARM = os.environ.get('PREWARM', '0' if 'VERCEL' in os.environ else '1') == '1'
+# Definido pelo gunicorn.conf.py: as threads em segundo plano só começam em cada worker, depois do fork
+DEFER_BACKGROUND = os.environ.get('DEFER_BACKGROUND', '0') == '1'
+# Como os processos de EXTRACTION_WORKERS são criados; o gunicorn.conf.py usa 'forkserver'
+EXTRACTION_START_METHOD = os.environ.get('EXTRACTION_START_METHOD') or None
+SSE_KEEPALIVE = 15  # Segundos sem eventos até /convert-stream mandar um comentário de keep-alive
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['OUTPUT_FOLDER'] = OUTPUT_FOLDER
 app.config['EXCEL_FOLDER'] = EXCEL_FOLDER
 app.config['TEMP_FOLDER'] = TEMP_FOLDER
+app.config['CACHE_FOLDER'] = CACHE_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
 
+# Ensure directories exist (both for local and Vercel)
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+os.makedirs(EXCEL_FOLDER, exist_ok=True)
+os.makedirs(TEMP_FOLDER, exist_ok=True)
+
 # Initialize modules
-pdf_converter = PDFConverter(UPLOAD_FOLDER, EXCEL_FOLDER)
+upload_storage = StorageManager(UPLOAD_FOLDER, STORAGE_DB, area='uploads', ttl_seconds=STORAGE_TTL,
+                                max_bytes=UPLOADS_MAX_BYTES, hashed_dirs=STORAGE_HASHED_DIRS)
+excel_storage = StorageManager(EXCEL_FOLDER, STORAGE_DB, area='excel', ttl_seconds=STORAGE_TTL,
+                               max_bytes=OUTPUT_MAX_BYTES, hashed_dirs=STORAGE_HASHED_DIRS)
+conversion_cache = ConversionCache(CACHE_FOLDER, max_bytes=CACHE_MAX_BYTES)
+tabula_backend = TabulaBackend(timeout=TABULA_TIMEOUT) if TABULA_WARM else None
+strategy_store = StrategyStore(STRATEGY_PLANS) if ADAPTIVE_STRATEGY else None
+pdf_converter = PDFConverter(UPLOAD_FOLDER, EXCEL_FOLDER, max_workers=EXTRACTION_WORKERS, cache=conversion_cache,
+                             excel_backend=EXCEL_BACKEND, tabula_backend=tabula_backend, low_memory=LOW_MEMORY,
+                             adaptive=ADAPTIVE_STRATEGY, strategy_store=strategy_store,
+                             output_storage=excel_storage, stitch_pages=STITCH_TABLES, typed_cells=TYPED_CELLS,
+                             engine_race=ENGINE_RACE, engine_timeout=ENGINE_TIMEOUT or None,
+                             start_method=EXTRACTION_START_METHOD, screening=PDF_SCREENING,
+                             dedupe_rows=DEDUPE_ROWS, geometric_columns=GEOMETRIC_COLUMNS)
 
 # Routes
 
@@ -45,12 +130,20 @@ def upload_file():
         unique_filename, file_id = generate_unique_filename(file.filename)
         
         # Save uploaded file
-        upload_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+        upload_path = upload_storage.path_for(unique_filename)
         file.save(upload_path)
         
+        # Non-PDFs and password-protected PDFs are refused before they are stored
+        screening = screen_pdf(upload_path)
+        if not screening['ok']:
+            cleanup_file(upload_path)
+            return jsonify(create_response(False, screening['error'], {'screening': screening})), 400
+        upload_storage.add(unique_filename, upload_path)
+        
         return jsonify(create_response(True, "Arquivo carregado com sucesso", {
             'file_id': file_id,
-            'filename': unique_filename
+            'filename': unique_filename,
+            'screening': screening
         }))
         
     except Exception as e:
@@ -58,9 +151,236 @@ def upload_file():
         return jsonify(create_response(False, f"Erro ao processar arquivo: {str(e)}")), 500
 
 
+def run_conversion_job(payload, report_progress, report_event):
+    """Job handler: convert an uploaded PDF and return the download info"""
+    upload_path = upload_storage.resolve(payload['filename'])
+    if upload_path is None:
+        raise RuntimeError("Arquivo não encontrado (o upload pode ter expirado)")
+    
+    def on_progress(event):
+        report_event(event)
+        if event['event'] == 'page_finished':
+            report_progress(event['pages_done'], event['pages_total'])
+    
+    start = time.perf_counter()
+    with metrics.request_scope() as timings:
+        success, excel_path, error = pdf_converter.convert_pdf_to_excel(
+            upload_path, progress_callback=on_progress, pages=payload.get('pages'),
+            output_format=payload.get('output_format', 'xlsx')
+        )
+    if not success:
+        raise RuntimeError(error)
+    
+    excel_filename = os.path.basename(excel_path)
+    return {
+        'excel_filename': excel_filename,
+        'download_url': f'/download-excel/{excel_filename}',
+        'rows_removed': sum(value for (name, _), value in timings['counters'].items()
+                            if name == 'rows_deduplicated'),
+        'timings': {
+            'total_seconds': round(time.perf_counter() - start, 4),
+            'stages': metrics.format_scope(timings)
+        }
+    }
+
+def job_status_data(job):
+    """Public fields of a job"""
+    data = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'pages_done': job['pages_done'],
+        'pages_total': job['pages_total'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at'],
+        'status_url': f"/jobs/{job['id']}",
+        'result_url': f"/jobs/{job['id']}/result"
+    }
+    if job['error']:
+        data['error'] = job['error']
+    if job['result']:
+        data.update(job['result'])
+    return data
+
+job_queue = JobQueue(JOBS_DB, run_conversion_job, max_workers=JOB_WORKERS)
+
+
+def start_background_services():
+    """Start this process's background threads: the storage sweepers and the prewarm
+    
+    Runs at import, or, under a prefork server (DEFER_BACKGROUND=1, see
+    gunicorn.conf.py), in each worker right after the fork: threads do not
+    survive a fork, and a thread of the master could hold a lock at the moment
+    a worker is forked. The job workers start on the first submit of each
+    process, so they never run in the master either.
+    """
+    if STORAGE_SWEEP_INTERVAL > 0:
+        upload_storage.start_sweeper(STORAGE_SWEEP_INTERVAL)
+        excel_storage.start_sweeper(STORAGE_SWEEP_INTERVAL)
+    if PREWARM:
+        threading.Thread(target=prewarm, name='prewarm', daemon=True).start()
+
+
+if not DEFER_BACKGROUND:
+    start_background_services()
+
+
+# Not at import: every worker of a multi-process server imports the app and
+# would fail the jobs its siblings are running. One owner runs it at startup:
+# the __main__ block, gunicorn.conf.py's when_ready, or this command
+@app.cli.command('fail-stale-jobs')
+def fail_stale_jobs_command():
+    """Mark the jobs left running by a stopped server as failed"""
+    print(f"{job_queue.fail_stale_jobs()} job(s) marcados como falhos")
+
+def start_conversion(options):
+    """Queue the conversion described by a request's options, or join the identical one in flight
+    
+    Returns (job_id, joined, error); error is a (response, status) pair. The job is
+    identified by the PDF content and settings, so a user who re-uploads and
+    resubmits the same file while it converts follows the running job instead
+    of starting a second conversion.
+    """
+    filename = options.get('filename')
+    if not filename:
+        return None, False, (jsonify(create_response(False, "Nome do arquivo não fornecido")), 400)
+    
+    upload_path = upload_storage.resolve(filename)
+    
+    if upload_path is None:
+        return None, False, (jsonify(create_response(False, "Arquivo não encontrado")), 404)
+    
+    try:
+        pages = parse_page_ranges(options.get('pages'))
+        output_format = validate_output_format(options.get('output_format'))
+    except ValueError as e:
+        return None, False, (jsonify(create_response(False, str(e))), 400)
+    page_error = check_page_range(upload_path, pages)
+    if page_error:
+        return None, False, (jsonify(create_response(False, page_error)), 400)
+    
+    settings = dict(pdf_converter.cache_settings(), pages=pages, output_format=output_format)
+    dedupe_key = conversion_cache.make_key(upload_path, settings)
+    job_id, joined = job_queue.submit_or_join({'filename': filename, 'pages': pages, 'output_format': output_format},
+                                              dedupe_key)
+    return job_id, joined, None
+
 @app.route('/convert', methods=['POST'])
 def convert_pdf():
-    """Convert PDF to Excel"""
+    """Queue a PDF to Excel conversion"""
+    try:
+        job_id, joined, error = start_conversion(request.get_json())
+        if error:
+            return error
+        
+        job = job_queue.get(job_id)
+        message = "Conversão já em andamento" if joined else "Conversão iniciada"
+        return jsonify(create_response(True, message, job_status_data(job))), 202
+            
+    except Exception as e:
+        return jsonify(create_response(False, f"Erro ao converter PDF: {str(e)}")), 500
+
+def sse_message(event_type, data, event_id=None):
+    """One Server-Sent Events message with a JSON payload"""
+    message = f"id: {event_id}\n" if event_id is not None else ""
+    return message + f"event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def job_event_stream(job_id, after=0, joined=False):
+    """SSE messages of a job: its status, the logged events after `after`, then the final status
+    
+    Event ids are the log sequence numbers, so a reconnecting EventSource
+    (Last-Event-ID) resumes where it stopped. The stream ends with a 'done'
+    or 'failed' message carrying the same fields as /jobs/<job_id>.
+    """
+    yield sse_message('job', dict(job_status_data(job_queue.get(job_id)), joined=joined))
+    while True:
+        events = job_queue.wait_events(job_id, after, timeout=SSE_KEEPALIVE)
+        if not events:
+            job = job_queue.get(job_id)
+            if job['status'] not in ('done', 'failed'):
+                yield ": keep-alive\n\n"
+                continue
+            # Finished while we waited, or interrupted without a final event
+            events = job_queue.events(job_id, after)
+            if not events:
+                yield sse_message(job['status'], job_status_data(job))
+                return
+        for seq, event in events:
+            after = seq
+            if event['event'] in ('job_done', 'job_failed'):
+                job = job_queue.get(job_id)
+                yield sse_message(job['status'], job_status_data(job), seq)
+                return
+            yield sse_message(event['event'], event, seq)
+
+@app.route('/convert-stream')
+def convert_stream():
+    """Start (or join) a conversion and stream its progress as Server-Sent Events"""
+    job_id = request.args.get('job_id')
+    joined = True
+    if job_id:
+        if job_queue.get(job_id) is None:
+            return jsonify(create_response(False, "Conversão não encontrada")), 404
+    else:
+        job_id, joined, error = start_conversion(request.args)
+        if error:
+            return error
+    
+    # EventSource resends Last-Event-ID on reconnect; a new EventSource can only use the query string
+    try:
+        after = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0)
+    except ValueError:
+        after = 0
+    return Response(
+        stream_with_context(job_event_stream(job_id, after, joined)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/convert-direct', methods=['POST'])
+def convert_direct():
+    """Convert the uploaded PDF in one request and return the workbook in the response body"""
+    if 'file' not in request.files:
+        return jsonify(create_response(False, "Nenhum arquivo enviado")), 400
+    
+    file = request.files['file']
+    is_valid, message = validate_pdf_file(file)
+    
+    if not is_valid:
+        return jsonify(create_response(False, message)), 400
+    
+    try:
+        pages = parse_page_ranges(request.form.get('pages'))
+        output_format = validate_output_format(request.form.get('output_format'))
+    except ValueError as e:
+        return jsonify(create_response(False, str(e))), 400
+    page_error = check_page_range(file.stream, pages)
+    if page_error:
+        return jsonify(create_response(False, page_error)), 400
+    
+    start = time.perf_counter()
+    excel_buffer = tempfile.SpooledTemporaryFile(max_size=DIRECT_MAX_MEMORY)
+    with metrics.request_scope():
+        success, error = pdf_converter.convert_pdf(file.stream, excel_buffer, pages=pages, output_format=output_format)
+    
+    if not success:
+        excel_buffer.close()
+        return jsonify(create_response(False, error)), 500
+    
+    excel_buffer.seek(0)
+    extension = OUTPUT_FORMATS[output_format]
+    download_name = os.path.splitext(file.filename)[0] + '.' + extension
+    response = send_file(
+        excel_buffer,
+        as_attachment=True,
+        download_name=f"convertido_{download_name}",
+        mimetype=MIMETYPES[extension]
+    )
+    response.headers['X-Conversion-Seconds'] = f"{time.perf_counter() - start:.3f}"
+    return response
+
+@app.route('/detect-tables', methods=['POST'])
+def detect_tables():
+    """List the pages of an uploaded PDF that appear to contain tables"""
     try:
         data = request.get_json()
         filename = data.get('filename')
@@ -68,33 +388,90 @@ def convert_pdf():
         if not filename:
             return jsonify(create_response(False, "Nome do arquivo não fornecido")), 400
         
-        upload_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        upload_path = upload_storage.resolve(filename)
         
-        if not os.path.exists(upload_path):
+        if upload_path is None:
             return jsonify(create_response(False, "Arquivo não encontrado")), 404
         
-        # Convert PDF
-        success, excel_path, error = pdf_converter.convert_pdf_to_excel(upload_path)
-        
-        if success:
-            excel_filename = os.path.basename(excel_path)
-            return jsonify(create_response(True, "PDF convertido para Excel com sucesso", {
-                'excel_filename': excel_filename,
-                'download_url': f'/download-excel/{excel_filename}'
-            }))
-        else:
-            return jsonify(create_response(False, error)), 500
-            
+        table_pages, page_count = pdf_converter.detect_table_pages(upload_path)
+        return jsonify(create_response(True, f"{len(table_pages)} de {page_count} páginas com tabelas", {
+            'pages': table_pages,
+            'page_count': page_count
+        }))
+    
     except Exception as e:
-        return jsonify(create_response(False, f"Erro ao converter PDF: {str(e)}")), 500
+        return jsonify(create_response(False, f"Erro ao analisar PDF: {str(e)}")), 500
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Conversion job status and page progress"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify(create_response(False, "Conversão não encontrada")), 404
+    return jsonify(create_response(True, "Status da conversão", job_status_data(job)))
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """Conversion job result (download info)"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify(create_response(False, "Conversão não encontrada")), 404
+    if job['status'] == 'failed':
+        return jsonify(create_response(False, job['error'], job_status_data(job))), 500
+    if job['status'] != 'done':
+        return jsonify(create_response(False, "Conversão em andamento", job_status_data(job))), 202
+    return jsonify(create_response(True, "PDF convertido para Excel com sucesso", job_status_data(job)))
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Conversion counters and stage timings in Prometheus text format"""
+    cache = conversion_cache.stats()
+    gauges = {
+        'cache_entries': cache['entries'],
+        'cache_size_bytes': cache['size_bytes'],
+    }
+    for storage in (upload_storage, excel_storage):
+        storage_stats = storage.stats()
+        gauges[f"storage_{storage_stats['area']}_files"] = storage_stats['files']
+        gauges[f"storage_{storage_stats['area']}_size_bytes"] = storage_stats['size_bytes']
+    if tabula_backend:
+        tabula = tabula_backend.health()
+        gauges['tabula_backend_alive'] = int(tabula['alive'])
+        gauges['tabula_backend_restarts'] = tabula['restarts']
+    return Response(metrics.render_prometheus(gauges), mimetype='text/plain; version=0.0.4')
+
+@app.route('/warmup', methods=['POST'])
+def warmup():
+    """Load the conversion backends now, so the first conversion doesn't pay for the imports"""
+    return jsonify(create_response(True, "Conversor pronto", {'imports': prewarm()}))
+
+@app.route('/tabula-health')
+def tabula_health():
+    """State and timing of the warm tabula backend"""
+    if not tabula_backend:
+        return jsonify(create_response(False, "Backend tabula persistente desativado (TABULA_WARM=0)")), 404
+    return jsonify(create_response(True, "Estado do backend tabula", tabula_backend.health()))
+
+@app.route('/cache-stats')
+def cache_stats():
+    """Conversion cache counters"""
+    return jsonify(create_response(True, "Estatísticas do cache", conversion_cache.stats()))
+
+@app.route('/storage-stats')
+def storage_stats():
+    """Tracked uploads and generated files, with their TTL and quota"""
+    return jsonify(create_response(True, "Estatísticas do armazenamento", {
+        'uploads': upload_storage.stats(),
+        'outputs': excel_storage.stats()
+    }))
 
 @app.route('/preview/<filename>')
 def preview_file(filename):
     """Preview PDF file"""
     try:
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        if os.path.exists(file_path):
-            return send_file(file_path)
+        file_path = upload_storage.resolve(filename)
+        if file_path:
+            return send_file(os.path.abspath(file_path))
         else:
             return jsonify(create_response(False, "Arquivo não encontrado")), 404
     except Exception as e:
@@ -104,26 +481,21 @@ def preview_file(filename):
 def download_excel(filename):
     """Download Excel file"""
     try:
-        file_path = os.path.join(app.config['EXCEL_FOLDER'], filename)
-        if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=True, download_name=f"convertido_{filename}")
+        file_path = excel_storage.resolve(filename)
+        if file_path:
+            return send_file(os.path.abspath(file_path), as_attachment=True, download_name=f"convertido_{filename}")
         else:
             return jsonify(create_response(False, "Arquivo Excel não encontrado")), 404
     except Exception as e:
         return jsonify(create_response(False, f"Erro ao baixar Excel: {str(e)}")), 500
 
-# Ensure directories exist (both for local and Vercel)
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-os.makedirs(EXCEL_FOLDER, exist_ok=True)
-os.makedirs(TEMP_FOLDER, exist_ok=True)
-
 if __name__ == '__main__':
     print("PDF Converter iniciado!")
     print("Funcionalidade:")
     print("   - Conversão de PDF para Excel")
     print("Acesse: http://localhost:5000")
     
+    job_queue.fail_stale_jobs()
     app.run(debug=True, host='0.0.0.0', port=5000)
 
 # For Vercel deployment
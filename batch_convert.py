@@ -0,0 +1,100 @@
+"""
+PDF Studio - Conversão em Lote (linha de comando)
+
+Uso:
+    python batch_convert.py pdfs/ saida/                  # um Excel por PDF
+    python batch_convert.py lista.txt saida/ --combined   # um único Excel com todas as tabelas
+    python batch_convert.py pdfs/ saida/ --workers 4 --pages 1-3
+
+Interrompido (Ctrl+C), basta rodar o mesmo comando de novo: os PDFs já convertidos
+são pulados. O relatório fica em saida/batch_report.json.
+"""
+
+import argparse
+import logging
+import os
+import sys
+from modules import BatchConverter, collect_pdfs, parse_page_ranges, validate_output_format
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte um diretório (ou lista) de PDFs para Excel")
+    parser.add_argument('source', help="Diretório com PDFs (recursivo) ou arquivo com um caminho de PDF por linha")
+    parser.add_argument('output', help="Pasta de saída dos arquivos Excel e do relatório")
+    parser.add_argument('--workers', type=int, default=None, help="Processos simultâneos (padrão: núcleos da CPU)")
+    parser.add_argument('--combined', action='store_true', help="Gera um único Excel com as tabelas de todos os PDFs")
+    parser.add_argument('--pages', help="Páginas a converter em cada PDF, ex.: 1-3,7")
+    parser.add_argument('--format', default='xlsx', dest='output_format',
+                        help="Formato por PDF: xlsx, csv, jsonl ou parquet (ZIP com um arquivo por tabela)")
+    parser.add_argument('--excel-backend', default='streaming', choices=['streaming', 'standard'])
+    parser.add_argument('--low-memory', action='store_true',
+                        help="Extrai uma página por vez, para PDFs muito grandes (memória estável)")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="Aprende a estratégia de extração vencedora por layout e a tenta primeiro")
+    parser.add_argument('--stitch', action='store_true',
+                        help="Une as tabelas que continuam na página seguinte em uma única planilha")
+    parser.add_argument('--typed', action='store_true',
+                        help="Grava números, percentuais e datas como células numéricas e de data do Excel")
+    parser.add_argument('--screen', action='store_true',
+                        help="Recusa PDFs protegidos por senha ou sem texto e pula as páginas sem texto")
+    parser.add_argument('--dedupe', action='store_true',
+                        help="Remove linhas repetidas entre as tabelas e cabeçalhos repetidos")
+    parser.add_argument('--geometric', action='store_true',
+                        help="Lê tabelas sem linhas pelas posições dos caracteres (mais rápido que a estratégia 'text')")
+    parser.add_argument('--verbose', action='store_true', help="Mostra o log da extração")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    if not os.path.exists(args.source):
+        parser.error(f"Origem não encontrada: {args.source}")
+    try:
+        pages = parse_page_ranges(args.pages)
+        output_format = validate_output_format(args.output_format)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.combined and output_format != 'xlsx':
+        parser.error("--combined gera sempre um único Excel; não use com --format")
+
+    pdfs = collect_pdfs(args.source)
+    if not pdfs:
+        print("Nenhum PDF encontrado.")
+        return 1
+
+    batch = BatchConverter(args.output, workers=args.workers, combined=args.combined, pages=pages,
+                           excel_backend=args.excel_backend, output_format=output_format,
+                           low_memory=args.low_memory, adaptive=args.adaptive,
+                           stitch_pages=args.stitch, typed_cells=args.typed,
+                           screening=args.screen, dedupe_rows=args.dedupe,
+                           geometric_columns=args.geometric)
+    finished = [0]
+
+    def on_file(record):
+        finished[0] += 1
+        if record['status'] == 'done':
+            detail = f"{record['tables']} tabela(s), {record['rows']} linha(s), {record['seconds']:.2f}s"
+            if record.get('rows_removed'):
+                detail += f", {record['rows_removed']} linha(s) repetida(s) removida(s)"
+        else:
+            detail = f"ERRO: {(record['error'] or '').splitlines()[0]}"
+        print(f"[{finished[0]}] {record['name']}: {detail}", flush=True)
+
+    try:
+        report = batch.run(pdfs, progress_callback=on_file)
+    except KeyboardInterrupt:
+        print(f"\nInterrompido. Rode o mesmo comando novamente para continuar ({batch.report_path}).")
+        return 130
+
+    summary = report['summary']
+    print(f"\n{summary['converted']} de {summary['files']} PDFs convertidos "
+          f"({summary['resumed']} retomados), {summary['failed']} com erro, "
+          f"{summary['tables']} tabelas, {summary['rows']} linhas em {report['total_seconds']:.1f}s")
+    if report['combined_workbook']:
+        print(f"Excel combinado: {report['combined_workbook']}")
+    print(f"Relatório: {batch.report_path}")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
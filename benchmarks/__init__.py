@@ -0,0 +1,4 @@
+"""
+PDF Studio - Benchmarks
+Corpus sintético e medição de desempenho do pipeline de conversão
+"""
@@ -0,0 +1,126 @@
+"""
+PDF Studio - Verificação dos Cabeçalhos das Saídas
+Converte tabelas de várias páginas do corpus, com a remoção de linhas duplicadas
+ligada, e confere que cada planilha ou arquivo de saída começa pelo cabeçalho da
+tabela e pela sua primeira linha de dados
+
+Uso:
+    python -m benchmarks.check_headers
+    python -m benchmarks.check_headers --pages 10
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.run_benchmarks import CORPUS_FOLDER
+from benchmarks.synthetic_pdfs import corpus_path
+from modules.output_writers import clean_cell, column_names, parquet_available
+from modules.pdf_converter import PDFConverter
+
+LAYOUTS = ('ruled', 'text')
+
+
+def output_heads(output, output_format):
+    """(header, first data row) of every sheet or ZIP member, in order"""
+    output.seek(0)
+    if output_format == 'xlsx':
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(output, read_only=True)
+        heads = []
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(max_row=2, values_only=True)
+            heads.append(tuple([clean_cell(value) for value in row] for row in rows))
+        workbook.close()
+        return heads
+
+    heads = []
+    with zipfile.ZipFile(output) as archive:
+        for name in archive.namelist():
+            data = archive.read(name)
+            if output_format == 'csv':
+                rows = list(csv.reader(io.StringIO(data.decode('utf-8'))))[:2]
+                heads.append(tuple(rows))
+            elif output_format == 'jsonl':
+                record = json.loads(data.decode('utf-8').splitlines()[0])
+                heads.append((list(record), list(record.values())))
+            else:
+                import pandas as pd
+
+                frame = pd.read_parquet(io.BytesIO(data))
+                heads.append((list(frame.columns), [str(value) for value in frame.iloc[0]]))
+    return heads
+
+
+def expected_heads(tables, output_format):
+    heads = []
+    for table_info in tables:
+        header, first_row = table_info['data'][0], table_info['data'][1]
+        if output_format in ('jsonl', 'parquet'):
+            width = len(header) if output_format == 'jsonl' else max(len(row) for row in table_info['data'])
+            names = column_names(header, width)
+            heads.append((names, [clean_cell(value) for value in first_row][:len(names)]))
+        else:
+            heads.append(([clean_cell(value) for value in header], [clean_cell(value) for value in first_row]))
+    return heads
+
+
+def strip_trailing(head):
+    # openpyxl and csv pad short rows differently; trailing empty cells do not matter
+    result = []
+    for row in head:
+        row = list(row)
+        while row and row[-1] in ('', None):
+            row.pop()
+        result.append(row)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=5, help='Páginas de cada PDF do corpus (padrão: 5)')
+    args = parser.parse_args()
+
+    formats = ['xlsx', 'csv', 'jsonl'] + (['parquet'] if parquet_available() else [])
+    failures = []
+    checked = 0
+    for layout in LAYOUTS:
+        pdf_path = corpus_path(CORPUS_FOLDER, layout, args.pages)
+        for stitch in (False, True):
+            # Reference: the extracted tables without deduplication, one per page or stitched
+            tables = PDFConverter(None, None, stitch_pages=stitch).extract_tables(pdf_path)
+            if not stitch and len(tables) < 2:
+                failures.append(f"{layout}: esperava uma tabela por página, obteve {len(tables)}")
+                continue
+            converter = PDFConverter(None, None, stitch_pages=stitch, dedupe_rows=True)
+            for output_format in formats:
+                output = io.BytesIO()
+                success, error = converter.convert_pdf(pdf_path, output, output_format=output_format)
+                label = f"{layout} stitch={int(stitch)} {output_format}"
+                if not success:
+                    failures.append(f"{label}: {error}")
+                    continue
+                heads = [strip_trailing(head) for head in output_heads(output, output_format)]
+                expected = [strip_trailing(head) for head in expected_heads(tables, output_format)]
+                checked += len(heads)
+                if heads != expected:
+                    failures.append(f"{label}: esperado {expected[:2]}, obtido {heads[:2]}")
+
+    if failures:
+        for failure in failures:
+            print(failure)
+        sys.exit(1)
+    print(f"Cabeçalhos corretos em {checked} saídas ({', '.join(formats)})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+PDF Studio - Limite de Memória do Modo low_memory
+Confere que o pico de memória de uma conversão com low_memory=True não cresce
+com o número de páginas, além da tabela de textos do próprio xlsx
+
+Uso:
+    python -m benchmarks.check_memory                   # 20 x 300 páginas, xlsx e csv
+    python -m benchmarks.check_memory --pages 20,1000
+    python -m benchmarks.check_memory --compare         # mede também o modo padrão
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.run_benchmarks import CORPUS_FOLDER, peak_rss_mb
+from benchmarks.synthetic_pdfs import corpus_path
+
+# The bound checked for low_memory: going from the small to the large PDF may
+# add at most FLAT_MB to the peak, plus, for xlsx only, XLSX_KB_PER_PAGE per
+# extra page. openpyxl keeps the shared-strings table (one copy of every
+# distinct cell text) in memory until the workbook is saved; the extraction
+# and the csv/jsonl writers do not grow at all.
+FLAT_MB = 16
+XLSX_KB_PER_PAGE = 160
+FORMATS = ['xlsx', 'csv']
+LAYOUT = 'ruled'
+
+
+def run_case(pages, output_format, low_memory):
+    """Convert one corpus PDF (called in a fresh process) and report its peak RSS"""
+    from modules import PDFConverter
+
+    pdf_path = corpus_path(CORPUS_FOLDER, LAYOUT, pages)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        converter = PDFConverter(tmp_dir, tmp_dir, excel_backend='streaming', low_memory=low_memory)
+        start = time.perf_counter()
+        success, error = converter.convert_pdf(pdf_path, os.path.join(tmp_dir, 'out.' + output_format),
+                                               output_format=output_format)
+        seconds = time.perf_counter() - start
+    if not success:
+        raise RuntimeError(error)
+    return {
+        'pages': pages,
+        'format': output_format,
+        'low_memory': low_memory,
+        'seconds': round(seconds, 2),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_case_subprocess(pages, output_format, low_memory):
+    """Run a case in its own interpreter so peak RSS belongs to that case alone"""
+    args = [sys.executable, '-m', 'benchmarks.check_memory', '--run-case', str(pages), output_format]
+    if low_memory:
+        args.append('--low-memory')
+    completed = subprocess.run(args, cwd=ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Case {pages}/{output_format} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def allowed_growth_mb(output_format, extra_pages):
+    per_page_kb = XLSX_KB_PER_PAGE if output_format == 'xlsx' else 0
+    return FLAT_MB + per_page_kb * extra_pages / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pico de memória do modo low_memory")
+    parser.add_argument('--pages', default='20,300', help="Páginas do PDF pequeno e do grande (ex.: 20,1000)")
+    parser.add_argument('--compare', action='store_true', help="Mede também o modo padrão, só para referência")
+    parser.add_argument('--run-case', nargs=2, metavar=('PAGES', 'FORMAT'), help=argparse.SUPPRESS)
+    parser.add_argument('--low-memory', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(int(args.run_case[0]), args.run_case[1], args.low_memory)))
+        return
+
+    if peak_rss_mb() is None:
+        print("Pico de memória indisponível nesta plataforma (módulo resource)")
+        sys.exit(1)
+    small, large = sorted(int(p) for p in args.pages.split(','))
+    # Generated up front, outside the measured processes
+    for pages in (small, large):
+        corpus_path(CORPUS_FOLDER, LAYOUT, pages)
+
+    failed = False
+    for output_format in FORMATS:
+        low = [run_case_subprocess(pages, output_format, True) for pages in (small, large)]
+        growth = low[1]['peak_rss_mb'] - low[0]['peak_rss_mb']
+        allowed = allowed_growth_mb(output_format, large - small)
+        ok = growth <= allowed
+        failed = failed or not ok
+        print(f"{output_format:<5} low_memory  {small:>5} págs {low[0]['peak_rss_mb']:>8.1f} MB   "
+              f"{large:>5} págs {low[1]['peak_rss_mb']:>8.1f} MB ({low[1]['seconds']}s)   "
+              f"+{growth:.1f} MB (limite {allowed:.1f} MB) {'OK' if ok else 'FALHOU'}")
+        if args.compare:
+            standard = [run_case_subprocess(pages, output_format, False) for pages in (small, large)]
+            print(f"{output_format:<5} padrão      {small:>5} págs {standard[0]['peak_rss_mb']:>8.1f} MB   "
+                  f"{large:>5} págs {standard[1]['peak_rss_mb']:>8.1f} MB ({standard[1]['seconds']}s)")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
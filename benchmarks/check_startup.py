@@ -0,0 +1,110 @@
+"""
+PDF Studio - Custo de Inicialização (cold start)
+Mede, em processos novos, o tempo de importar o app e o da primeira conversão,
+com e sem o prewarm, e confere que importar o app não carrega os backends pesados
+
+Uso:
+    python -m benchmarks.check_startup               # 5 repetições de cada caso
+    python -m benchmarks.check_startup --repeat 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.run_benchmarks import CORPUS_FOLDER
+from benchmarks.synthetic_pdfs import corpus_path
+
+# Modules that must not be loaded by `import app`: they are only needed once a
+# conversion runs (see pdf_converter.prewarm)
+HEAVY_MODULES = ['pdfplumber', 'pdfminer', 'pandas', 'numpy', 'openpyxl', 'tabula']
+LAYOUT = 'ruled'
+PAGES = 3
+CASES = ['cold', 'prewarmed']
+# The app starts no background threads or processes during the measurement
+APP_ENV = {'JOB_WORKERS': '0', 'TABULA_WARM': '0', 'PREWARM': '0', 'STORAGE_SWEEP_INTERVAL': '0'}
+
+
+def run_case(case):
+    """Import the app, optionally prewarm, then convert one PDF (called in a fresh process)"""
+    start = time.perf_counter()
+    import app
+    import_seconds = time.perf_counter() - start
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    prewarm_seconds = None
+    if case == 'prewarmed':
+        start = time.perf_counter()
+        app.prewarm()
+        prewarm_seconds = time.perf_counter() - start
+
+    pdf_path = corpus_path(CORPUS_FOLDER, LAYOUT, PAGES)
+    start = time.perf_counter()
+    success, error = app.pdf_converter.convert_pdf(pdf_path, os.path.join(app.TEMP_FOLDER, 'startup.xlsx'))
+    convert_seconds = time.perf_counter() - start
+    if not success:
+        raise RuntimeError(error)
+    return {
+        'case': case,
+        'import_seconds': import_seconds,
+        'prewarm_seconds': prewarm_seconds,
+        'convert_seconds': convert_seconds,
+        'heavy_modules_loaded': loaded,
+    }
+
+
+def run_case_subprocess(case):
+    """Run a case in its own interpreter and working folder, as a cold start would"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = dict(os.environ, PYTHONPATH=ROOT, **APP_ENV)
+        completed = subprocess.run([sys.executable, '-m', 'benchmarks.check_startup', '--run-case', case],
+                                   cwd=work_dir, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Case {case} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def median_ms(results, key):
+    values = [result[key] for result in results if result[key] is not None]
+    return statistics.median(values) * 1000 if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo de inicialização do app e da primeira conversão")
+    parser.add_argument('--repeat', type=int, default=5, help="Processos por caso (usa a mediana)")
+    parser.add_argument('--run-case', choices=CASES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case)))
+        return
+
+    # Generated up front, outside the measured processes
+    corpus_path(CORPUS_FOLDER, LAYOUT, PAGES)
+
+    failed = False
+    for case in CASES:
+        results = [run_case_subprocess(case) for _ in range(args.repeat)]
+        loaded = sorted({name for result in results for name in result['heavy_modules_loaded']})
+        failed = failed or bool(loaded)
+        prewarm_ms = median_ms(results, 'prewarm_seconds')
+        print(f"{case:<10} import app {median_ms(results, 'import_seconds'):>7.1f} ms   "
+              f"prewarm {f'{prewarm_ms:.1f} ms' if prewarm_ms is not None else '-':>10}   "
+              f"primeira conversão ({PAGES} págs) {median_ms(results, 'convert_seconds'):>7.1f} ms")
+        if loaded:
+            print(f"           FALHOU: import app carregou {', '.join(loaded)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+PDF Studio - Verificação da Junção de Tabelas
+Confere stitch_tables em sequências de tabelas montadas à mão: continuações pelo
+cabeçalho repetido ou pelas divisões de coluna, e páginas com duas tabelas, que
+nunca são unidas pelo meio
+
+Uso:
+    python -m benchmarks.check_stitcher
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from modules.table_stitcher import stitch_tables
+
+HEADER = ['Codigo', 'Produto', 'Valor']
+EDGES = [10.0, 80.0, 300.0, 400.0]
+
+
+def table(page, number, rows, header=True, columns=None):
+    info = {'page': page, 'table': number, 'data': ([HEADER] if header else []) + rows}
+    if columns:
+        info['columns'] = columns
+    return info
+
+
+def rows(first, count):
+    return [[str(code), f'Item {code}', f'{code},00'] for code in range(first, first + count)]
+
+
+# name -> (tables, expected (page, last_page, row count) of each output table)
+CASES = {
+    'repeated_header': (
+        [table(1, 1, rows(1, 3)), table(2, 1, rows(4, 3))],
+        [(1, 2, 7)],
+    ),
+    'same_columns': (
+        [table(1, 1, rows(1, 3), columns=EDGES), table(2, 1, rows(4, 3), header=False, columns=EDGES)],
+        [(1, 2, 7)],
+    ),
+    'three_pages': (
+        [table(1, 1, rows(1, 2)), table(2, 1, rows(3, 2)), table(3, 1, rows(5, 2))],
+        [(1, 3, 7)],
+    ),
+    'page_gap': (
+        [table(1, 1, rows(1, 3)), table(3, 1, rows(4, 3))],
+        [(1, None, 4), (3, None, 4)],
+    ),
+    'different_width': (
+        [table(1, 1, rows(1, 3)), table(2, 1, [row + ['x'] for row in rows(4, 3)], header=False)],
+        [(1, None, 4), (2, None, 3)],
+    ),
+    # The first table of page 1 is followed by another one on the same page:
+    # it is not the last of its page, so page 2 never continues it
+    'two_tables_first_page': (
+        [table(1, 1, rows(1, 3)), table(1, 2, [['Total', '', '3,00']], header=False),
+         table(2, 1, rows(4, 3))],
+        [(1, None, 4), (1, None, 1), (2, None, 4)],
+    ),
+    # The second table of page 2 is not the first of its page: only the first
+    # one may continue page 1, even when the second repeats the header
+    'two_tables_second_page': (
+        [table(1, 1, rows(1, 3)), table(2, 1, [['Resumo', 'x']], header=False),
+         table(2, 2, rows(4, 3))],
+        [(1, None, 4), (2, None, 1), (2, None, 4)],
+    ),
+    'two_tables_both_match': (
+        [table(1, 1, rows(1, 3)), table(2, 1, rows(4, 3)), table(2, 2, rows(7, 3))],
+        [(1, 2, 7), (2, None, 4)],
+    ),
+}
+
+
+def main():
+    failures = []
+    for name, (tables, expected) in CASES.items():
+        result = [(info['page'], info.get('last_page'), len(info['data'])) for info in stitch_tables(tables)]
+        if result != expected:
+            failures.append(name)
+            print(f"{name}: esperado {expected}, obtido {result}")
+    if failures:
+        print(f"{len(failures)} caso(s) divergem: {', '.join(failures)}")
+        sys.exit(1)
+    print(f"Junção de tabelas correta ({len(CASES)} casos)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+PDF Studio - Regressão do Parser de Texto
+Confere parse_text_to_table / parse_generic_text_to_table contra as saídas gravadas
+e mede a vazão do parser em textos com dezenas de milhares de linhas
+
+Uso:
+    python -m benchmarks.check_text_parser            # confere e mede
+    python -m benchmarks.check_text_parser --lines 100000
+    python -m benchmarks.check_text_parser --write    # regrava as saídas esperadas
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_pdfs import COMPANIES, PRODUCTS, UNITS, _br_number
+from modules.text_parser import parse_text_to_table, parse_generic_text_to_table, parse_text_pages
+
+EXPECTED_PATH = os.path.join(ROOT, 'benchmarks', 'text_parser_expected.json')
+
+# Edge cases of the line rules: item lines with too few parts, items followed by
+# items, short company lines, tabs, unicode and mixed whitespace, a generic first
+# row with exactly 10 columns, and texts only the generic parser accepts
+HANDWRITTEN = {
+    'empty': '',
+    'blank_lines': '\n \n\t\n',
+    'single_item': '10 13866 Parafuso sextavado UN 12,50 01/02/2024\nAlfa Comercio LTDA UN 1,00 2,00 5%',
+    'item_without_company': '10 13866 Parafuso UN 12,50 01/02/2024',
+    'item_then_item': '10 1 Luva UN 1,00 01/01/2024\n11 2 Fita UN 2,00 02/01/2024\nBeta SA KG 1 2 3%',
+    'short_item': '10 13866 Luva UN\nAlfa Comercio LTDA UN 1,00 2,00 5%',
+    'short_company': '10 13866 Luva UN 1,00 01/01/2024\nAlfa LTDA',
+    'item_then_blank': '10 13866 Luva UN 1,00 01/01/2024\n\nAlfa Comercio LTDA UN 1,00 2,00 5%',
+    'indented_lines': '   10   13866 Cabo  flexivel MT 3,10 05/05/2024  \n\t Gama Insumos ME  PC 1 2 9%  ',
+    'generic_columns': 'Codigo  Produto  Valor\n1  Luva  1,00\n2  Fita isolante  2,00  extra',
+    'tabs': 'a\tb\tc\nd\te\nf\tg\th\ti',
+    'mixed_whitespace': 'a \tb  c\nx\xa0\xa0y\xa0\xa0z\nsingle line here',
+    'carriage_returns': 'a  b  c\r\n1  2  3\r\n',
+    'generic_ten_first': '  '.join('c%d' % i for i in range(10)) + '\n1  2  3',
+    'item_after_generic': 'a  b  c\n10 13866 Luva UN 1,00 01/01/2024\nAlfa Comercio LTDA UN 1,00 2,00 5%',
+    'generic_fallback_pairs': 'Nome  Valor\nTotal  10\nsem colunas',
+    'generic_fallback_words': 'uma linha com palavras\noutra linha\nduas',
+    'prose_only': 'texto\ncorrido',
+    'unicode_digits': '١٢ ٣ desc UN 1 2\nEmpresa X UN 1 2 3%',
+}
+
+TOKENS = ['10', '13866', '7', 'Luva', 'UN', '1,00', '01/01/2024', '5%', 'Alfa', 'LTDA', 'x', '']
+SEPARATORS = [' ', ' ', ' ', '  ', '\t', '   ', ' \t', '\xa0 ']
+
+
+def id_layout_text(rng, items):
+    lines = []
+    for i in range(items):
+        lines.append(" ".join([
+            str(10 + i % 90), str(13000 + i), rng.choice(PRODUCTS), rng.choice(UNITS),
+            _br_number(rng.uniform(1, 9999)), f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024"
+        ]))
+        lines.append(" ".join([
+            rng.choice(COMPANIES), rng.choice(UNITS), _br_number(rng.uniform(1, 999)),
+            _br_number(rng.uniform(1, 999)), f"{rng.randint(1, 99)}%"
+        ]))
+    return "\n".join(lines)
+
+
+def column_text(rng, rows):
+    lines = ["Codigo    Produto    Unidade    Qtd    Valor"]
+    for i in range(rows):
+        lines.append("    ".join([
+            str(1000 + i), rng.choice(PRODUCTS), rng.choice(UNITS), str(rng.randint(1, 500)),
+            _br_number(rng.uniform(1, 99999))
+        ]))
+    return "\n".join(lines)
+
+
+def random_text(rng):
+    lines = []
+    for _ in range(rng.randint(1, 8)):
+        words = [rng.choice(TOKENS) for _ in range(rng.randint(0, 12))]
+        line = ''
+        for word in words:
+            line += word + rng.choice(SEPARATORS)
+        lines.append(rng.choice(['', ' ', '\t']) + line)
+    return "\n".join(lines)
+
+
+def corpus():
+    """Deterministic {name: text} samples covering the parser rules"""
+    rng = random.Random(2024)
+    samples = dict(HANDWRITTEN)
+    for n in range(5):
+        samples[f'id_layout_{n}'] = id_layout_text(rng, rng.randint(5, 40))
+        samples[f'columns_{n}'] = column_text(rng, rng.randint(5, 40))
+    for n in range(150):
+        samples[f'random_{n}'] = random_text(rng)
+    return samples
+
+
+def parse_outputs(samples):
+    return {
+        name: {
+            'text_to_table': parse_text_to_table(text),
+            'generic': parse_generic_text_to_table(text),
+        }
+        for name, text in samples.items()
+    }
+
+
+def check():
+    """Compare against the recorded outputs. Returns the names that differ"""
+    with open(EXPECTED_PATH, 'r', encoding='utf-8') as f:
+        expected = json.load(f)
+    samples = corpus()
+    outputs = parse_outputs(samples)
+    failures = [name for name in expected if outputs.get(name) != expected[name]]
+
+    # The batch mode must give the same result as one call per page
+    names = sorted(samples)
+    batch = parse_text_pages([samples[name] for name in names])
+    failures += [f'batch:{name}' for name, result in zip(names, batch)
+                 if result != outputs[name]['text_to_table']]
+    return failures
+
+
+def throughput(line_count):
+    """Lines per second of the parser on ID-layout and column-aligned text"""
+    rng = random.Random(7)
+    texts = {
+        'id_layout': id_layout_text(rng, line_count // 2),
+        'columns': column_text(rng, line_count),
+    }
+    results = {}
+    for name, text in texts.items():
+        lines = text.count('\n') + 1
+        start = time.perf_counter()
+        parse_text_to_table(text)
+        elapsed = time.perf_counter() - start
+        results[name] = round(lines / elapsed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regressão e vazão do parser de texto")
+    parser.add_argument('--write', action='store_true', help="Regrava as saídas esperadas com o parser atual")
+    parser.add_argument('--lines', type=int, default=50000, help="Linhas do texto usado na medição de vazão")
+    args = parser.parse_args()
+
+    if args.write:
+        with open(EXPECTED_PATH, 'w', encoding='utf-8') as f:
+            json.dump(parse_outputs(corpus()), f, ensure_ascii=False, sort_keys=True)
+        print(f"Saídas esperadas gravadas em: {EXPECTED_PATH}")
+        return
+
+    failures = check()
+    if failures:
+        print(f"{len(failures)} amostra(s) divergem: {', '.join(failures[:20])}")
+        sys.exit(1)
+    print(f"Parser idêntico às saídas gravadas ({len(corpus())} amostras)")
+
+    for name, lines_per_sec in throughput(args.lines).items():
+        print(f"{name:<12}{lines_per_sec:>12,} linhas/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+PDF Studio - Teste de Carga
+Dispara clientes simultâneos que fazem upload, pedem a conversão e acompanham o job até
+o fim, medindo conversões por segundo e latência com 1, 2, 4... workers do gunicorn
+
+Uso:
+    python -m benchmarks.load_test                          # 1 e 2 workers, 8 clientes, 30s cada
+    python -m benchmarks.load_test --workers 1,2,4 --clients 16 --seconds 60
+    python -m benchmarks.load_test --url http://localhost:5000   # um servidor já em execução
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.run_benchmarks import CORPUS_FOLDER
+from benchmarks.synthetic_pdfs import corpus_path
+
+LAYOUT = 'ruled'
+PAGES = 3
+POLL_SECONDS = 0.1
+# The server starts no tabula process; the conversions stay on pdfplumber
+SERVER_ENV = {'TABULA_WARM': '0', 'LOG_LEVEL': 'WARNING'}
+
+
+def request_json(url, data=None, headers=None, timeout=120):
+    request = urllib.request.Request(url, data=data, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read() or b'{}')
+
+
+def upload(base_url, pdf_bytes):
+    """POST /upload as multipart/form-data. Returns the stored file name"""
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"load.pdf\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n").encode() + pdf_bytes + f"\r\n--{boundary}--\r\n".encode()
+    result = request_json(f"{base_url}/upload", body, {'Content-Type': f'multipart/form-data; boundary={boundary}'})
+    if not result.get('success'):
+        raise RuntimeError(f"upload: {result.get('message')}")
+    return result['filename']
+
+
+def convert(base_url, filename):
+    """POST /convert, then poll the job until it finishes"""
+    result = request_json(f"{base_url}/convert", json.dumps({'filename': filename}).encode(),
+                          {'Content-Type': 'application/json'})
+    if not result.get('success'):
+        raise RuntimeError(f"convert: {result.get('message')}")
+    while result.get('status') not in ('done', 'failed'):
+        time.sleep(POLL_SECONDS)
+        result = request_json(f"{base_url}/jobs/{result['job_id']}")
+    if result['status'] == 'failed':
+        raise RuntimeError(f"job: {(result.get('error') or '').splitlines()[0]}")
+
+
+def client(base_url, pdf_bytes, deadline, latencies, errors):
+    while time.monotonic() < deadline:
+        # A distinct trailer per upload, so neither the conversion cache nor the
+        # job deduplication turns the next conversion into a hit
+        unique_pdf = pdf_bytes + f"\n% load-test {uuid.uuid4().hex}\n".encode()
+        start = time.perf_counter()
+        try:
+            convert(base_url, upload(base_url, unique_pdf))
+        except Exception as e:
+            errors.append(str(e))
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def run_load(base_url, pdf_bytes, clients, seconds):
+    latencies = []
+    errors = []
+    deadline = time.monotonic() + seconds
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(base_url, pdf_bytes, deadline, latencies, errors))
+               for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'conversions': len(latencies),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'per_second': len(latencies) / elapsed,
+        'p50_seconds': statistics.median(latencies) if latencies else None,
+        'p95_seconds': latencies[int(len(latencies) * 0.95)] if latencies else None,
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers, work_dir):
+    """gunicorn with the production config, in its own working folder. Returns (process, url, log)"""
+    port = free_port()
+    log = open(os.path.join(work_dir, 'server.log'), 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'), '--chdir', work_dir,
+         '--pythonpath', ROOT, '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+         'app:app'],
+        env=dict(os.environ, **SERVER_ENV), stdout=log, stderr=subprocess.STDOUT
+    )
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            urllib.request.urlopen(f'{url}/cache-stats', timeout=1).close()
+            return process, url, log
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    log.close()
+    with open(log.name) as f:
+        raise RuntimeError(f"Servidor não iniciou:\n{f.read()[-2000:]}")
+
+
+def stop_server(process, log):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    log.close()
+
+
+def print_result(label, result):
+    latency = (f"p50 {result['p50_seconds']:.2f}s  p95 {result['p95_seconds']:.2f}s"
+               if result['conversions'] else '-')
+    print(f"{label:<12} {result['conversions']:>5} conversões  {result['per_second']:>6.2f}/s  {latency}"
+          f"  erros {result['errors']}", flush=True)
+    if result['first_error']:
+        print(f"             primeiro erro: {result['first_error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga de /upload + /convert")
+    parser.add_argument('--url', help="Servidor já em execução (senão sobe o gunicorn para cada --workers)")
+    parser.add_argument('--workers', default='1,2', help="Workers do gunicorn a comparar, ex.: 1,2,4")
+    parser.add_argument('--clients', type=int, default=8, help="Clientes simultâneos")
+    parser.add_argument('--seconds', type=float, default=30, help="Duração de cada rodada")
+    args = parser.parse_args()
+
+    with open(corpus_path(CORPUS_FOLDER, LAYOUT, PAGES), 'rb') as f:
+        pdf_bytes = f.read()
+    print(f"{args.clients} clientes, {args.seconds:.0f}s por rodada, PDF '{LAYOUT}' de {PAGES} páginas "
+          f"({os.cpu_count()} núcleos)")
+
+    if args.url:
+        print_result('servidor', run_load(args.url.rstrip('/'), pdf_bytes, args.clients, args.seconds))
+        return
+
+    failed = False
+    for workers in [int(value) for value in args.workers.split(',')]:
+        with tempfile.TemporaryDirectory() as work_dir:
+            process, url, log = start_server(workers, work_dir)
+            try:
+                result = run_load(url, pdf_bytes, args.clients, args.seconds)
+            finally:
+                stop_server(process, log)
+        failed = failed or result['errors'] > 0
+        print_result(f"{workers} worker(s)", result)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
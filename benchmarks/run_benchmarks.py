@@ -0,0 +1,175 @@
+"""
+PDF Studio - Benchmarks do Pipeline
+Mede open, extração, parsing de texto e escrita do Excel sobre o corpus sintético
+
+Uso:
+    python -m benchmarks.run_benchmarks                      # 1, 10, 100 e 1000 páginas
+    python -m benchmarks.run_benchmarks --pages 1,10 --layouts ruled,text
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/anterior.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_pdfs import LAYOUTS, corpus_path
+
+CORPUS_FOLDER = os.path.join(ROOT, 'benchmarks', 'corpus')
+RESULTS_FOLDER = os.path.join(ROOT, 'benchmarks', 'results')
+DEFAULT_PAGES = [1, 10, 100, 1000]
+STAGES = ['open', 'extract', 'parse_text', 'write']
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process, or None where unsupported"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == 'darwin':
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+
+def run_case(layout, pages):
+    """Run every stage on one corpus PDF (called in a fresh process)"""
+    import pdfplumber
+    from modules import PDFConverter
+    from modules.text_parser import parse_text_pages
+
+    pdf_path = corpus_path(CORPUS_FOLDER, layout, pages)
+    stages = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir, open(os.devnull, 'w') as devnull:
+        converter = PDFConverter(tmp_dir, tmp_dir)
+
+        start = time.perf_counter()
+        with pdfplumber.open(pdf_path) as pdf:
+            page_count = len(pdf.pages)
+        stages['open'] = time.perf_counter() - start
+
+        with contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            tables = converter.extract_tables_pdfplumber(pdf_path) or []
+            stages['extract'] = time.perf_counter() - start
+
+            # Page text is collected untimed, only the parser is measured
+            with pdfplumber.open(pdf_path) as pdf:
+                texts = [page.extract_text() or '' for page in pdf.pages]
+            start = time.perf_counter()
+            parse_text_pages(texts)
+            stages['parse_text'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            if tables:
+                converter.create_excel_file(tables, os.path.join(tmp_dir, 'out.xlsx'))
+            stages['write'] = time.perf_counter() - start
+
+    rows = sum(len(t['data']) for t in tables)
+    return {
+        'layout': layout,
+        'pages': page_count,
+        'tables': len(tables),
+        'rows': rows,
+        'stages': {name: round(value, 4) for name, value in stages.items()},
+        'pages_per_sec': round(page_count / stages['extract'], 2) if stages['extract'] else None,
+        'rows_per_sec': round(rows / (stages['extract'] + stages['write']), 1) if rows else 0,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_case_subprocess(layout, pages):
+    """Run a case in its own interpreter so peak RSS belongs to that case alone"""
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.run_benchmarks', '--run-case', layout, str(pages)],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Case {layout}/{pages} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def environment():
+    import pdfplumber
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pdfplumber': pdfplumber.__version__,
+    }
+
+
+def compare(current, previous):
+    """Print per-stage time changes between two result files"""
+    previous_cases = {(r['layout'], r['pages']): r for r in previous['results']}
+    print(f"\n{'case':<20}{'stage':<12}{'before':>10}{'after':>10}{'change':>10}")
+    for result in current['results']:
+        before = previous_cases.get((result['layout'], result['pages']))
+        if not before:
+            continue
+        case = f"{result['layout']}/{result['pages']}"
+        for stage in STAGES:
+            old, new = before['stages'].get(stage), result['stages'].get(stage)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            print(f"{case:<20}{stage:<12}{old:>10.3f}{new:>10.3f}{change:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline de conversão PDF -> Excel")
+    parser.add_argument('--pages', default=','.join(map(str, DEFAULT_PAGES)),
+                        help="Números de páginas separados por vírgula")
+    parser.add_argument('--layouts', default=','.join(LAYOUTS), help="Layouts: " + ', '.join(LAYOUTS))
+    parser.add_argument('--output', help="Arquivo JSON de resultados (padrão: benchmarks/results/<data>.json)")
+    parser.add_argument('--compare', help="Resultado anterior para comparação")
+    parser.add_argument('--run-case', nargs=2, metavar=('LAYOUT', 'PAGES'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case[0], int(args.run_case[1]))))
+        return
+
+    results = []
+    for layout in args.layouts.split(','):
+        for pages in [int(p) for p in args.pages.split(',')]:
+            result = run_case_subprocess(layout, pages)
+            results.append(result)
+            stages = ' '.join(f"{name}={result['stages'][name]:.3f}s" for name in STAGES)
+            print(f"{layout:<10}{pages:>6} pages  {stages}  "
+                  f"{result['pages_per_sec']} pages/s  {result['rows_per_sec']} rows/s  "
+                  f"peak {result['peak_rss_mb']} MB")
+
+    report = {'environment': environment(), 'results': results}
+    output = args.output or os.path.join(RESULTS_FOLDER, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultados salvos em: {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+PDF Studio - Corpus Sintético
+Gera PDFs determinísticos, sem dependências externas, para os benchmarks
+"""
+
+import os
+import random
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+FONT_SIZE = 8
+
+COMPANIES = ["Alfa Comercio LTDA", "Beta Distribuidora SA", "Gama Insumos ME", "Delta Servicos EIRELI"]
+PRODUCTS = ["Parafuso sextavado", "Cabo flexivel 2,5mm", "Luva nitrilica", "Tinta acrilica branca",
+            "Disjuntor bipolar", "Fita isolante", "Mangueira PVC", "Broca aco rapido"]
+UNITS = ["UN", "CX", "KG", "MT", "PC"]
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _text(x, y, text):
+    return f"BT /F1 {FONT_SIZE} Tf {x:.2f} {y:.2f} Td ({_escape(text)}) Tj ET"
+
+
+def _br_number(value):
+    """1234.5 -> '1.234,50'"""
+    return f"{value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+
+def write_pdf(page_streams, path, producer="PDF Studio benchmarks"):
+    """Write a minimal PDF (Helvetica, one content stream per page)"""
+    objects = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>", b""]
+    font_id, pages_id = 1, 2
+    kids = []
+    for stream in page_streams:
+        content = stream.encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 %d 0 R >> >> "
+            b"/Contents %d 0 R >>" % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, font_id, content_id)
+        )
+        kids.append(len(objects))
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+    objects.append(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+    catalog_id = len(objects)
+    objects.append(b"<< /Producer (%s) >>" % _escape(producer).encode('latin-1'))
+    info_id = len(objects)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, info_id, xref_offset)
+
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def ruled_table_page(rng, page_num, rows=35, cols=6):
+    """Table with ruling lines around every cell"""
+    x0, top, cell_w, cell_h = 36, PAGE_HEIGHT - 40, 90, 20
+    ops = ["0.5 w"]
+    for r in range(rows + 1):
+        y = top - r * cell_h
+        ops.append(f"{x0} {y} m {x0 + cols * cell_w} {y} l S")
+    for c in range(cols + 1):
+        x = x0 + c * cell_w
+        ops.append(f"{x} {top} m {x} {top - rows * cell_h} l S")
+    headers = ["Codigo", "Produto", "Unidade", "Quantidade", "Valor", "Data"]
+    for r in range(rows):
+        if r == 0:
+            values = headers[:cols]
+        else:
+            values = [
+                f"{page_num * 1000 + r}",
+                rng.choice(PRODUCTS),
+                rng.choice(UNITS),
+                str(rng.randint(1, 500)),
+                _br_number(rng.uniform(1, 99999)),
+                f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024",
+            ][:cols]
+        for c, value in enumerate(values):
+            ops.append(_text(x0 + c * cell_w + 3, top - r * cell_h - 14, value[:18]))
+    return "\n".join(ops)
+
+
+def text_table_page(rng, page_num, rows=60):
+    """Column-aligned table with no ruling lines"""
+    columns = [36, 110, 260, 320, 400, 490]
+    top = PAGE_HEIGHT - 40
+    ops = []
+    headers = ["Codigo", "Produto", "Unidade", "Qtd", "Valor", "Data"]
+    for r in range(rows):
+        y = top - r * 12
+        if r == 0:
+            values = headers
+        else:
+            values = [
+                f"{page_num * 1000 + r}",
+                rng.choice(PRODUCTS),
+                rng.choice(UNITS),
+                str(rng.randint(1, 500)),
+                _br_number(rng.uniform(1, 99999)),
+                f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024",
+            ]
+        for x, value in zip(columns, values):
+            ops.append(_text(x, y, value))
+    return "\n".join(ops)
+
+
+def id_layout_page(rng, page_num, items=30):
+    """The "ID + description + company" layout that parse_text_to_table targets"""
+    top = PAGE_HEIGHT - 40
+    ops = []
+    for i in range(items):
+        y = top - i * 24
+        item_line = " ".join([
+            str(10 + i),
+            str(13000 + page_num * 100 + i),
+            rng.choice(PRODUCTS),
+            rng.choice(UNITS),
+            _br_number(rng.uniform(1, 9999)),
+            f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024",
+        ])
+        company_line = " ".join([
+            rng.choice(COMPANIES),
+            rng.choice(UNITS),
+            _br_number(rng.uniform(1, 999)),
+            _br_number(rng.uniform(1, 999)),
+            f"{rng.randint(1, 99)}%",
+        ])
+        ops.append(_text(36, y, item_line))
+        ops.append(_text(48, y - 10, company_line))
+    return "\n".join(ops)
+
+
+LAYOUTS = {
+    'ruled': ruled_table_page,
+    'text': text_table_page,
+    'id_layout': id_layout_page,
+}
+
+
+def generate(layout, pages, path, seed=1234):
+    """Generate a deterministic PDF: same layout, pages and seed give the same bytes"""
+    rng = random.Random(f"{seed}-{layout}-{pages}")
+    page_fn = LAYOUTS[layout]
+    write_pdf([page_fn(rng, page_num) for page_num in range(pages)], path)
+    return path
+
+
+def corpus_path(corpus_folder, layout, pages):
+    """Generate the PDF on first use and return its path"""
+    os.makedirs(corpus_folder, exist_ok=True)
+    path = os.path.join(corpus_folder, f"{layout}_{pages}.pdf")
+    if not os.path.exists(path):
+        generate(layout, pages, path)
+    return path
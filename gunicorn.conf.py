@@ -0,0 +1,52 @@
+"""
+PDF Studio - Configuração do gunicorn (produção)
+Workers pré-forkados a partir de um app pré-carregado: as bibliotecas de extração são
+importadas uma vez no processo mestre e compartilhadas pelos workers
+
+Uso:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import multiprocessing
+import os
+
+# Read by app.py at import: background threads start in each worker, after the fork
+os.environ.setdefault('DEFER_BACKGROUND', '1')
+# Parallel page extraction forks from a clean fork server, not from a threaded worker
+os.environ.setdefault('EXTRACTION_START_METHOD', 'forkserver')
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+# Conversions are CPU-bound: one process per core runs them in parallel
+workers = int(os.environ.get('WEB_CONCURRENCY', str(multiprocessing.cpu_count())))
+# Threads per worker serve the light routes and the /convert-stream connections,
+# which stay open while the job runs
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+preload_app = True
+# /convert-direct converts inside the request
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '300'))
+graceful_timeout = 30
+# Recycles workers after this many requests, bounding what long-lived processes
+# accumulate; off by default, since a recycled worker's running jobs are lost (the
+# other workers fail them, see JobQueue.fail_orphaned_jobs, and the client must resubmit)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+
+
+def when_ready(server):
+    """In the master, once the app is loaded and before any worker is forked"""
+    import app
+
+    # Jobs still marked as running belong to the previous server; workers
+    # restarted later must not fail the jobs of the live ones
+    app.job_queue.fail_stale_jobs()
+    if app.PREWARM:
+        # Imported once here, the backends are shared by every worker (copy on write)
+        app.prewarm()
+
+
+def post_fork(server, worker):
+    import app
+
+    app.start_background_services()
@@ -3,7 +3,16 @@ PDF Converter - Módulos
 """
 
 from .pdf_utils import *
-from .pdf_converter import PDFConverter
+from .pdf_converter import PDFConverter, prewarm
+from .conversion_cache import ConversionCache
+from .storage_manager import StorageManager
+from .job_queue import JobQueue
+from .tabula_backend import TabulaBackend
+from .strategy_planner import StrategyPlanner, StrategyStore
+from .batch import BatchConverter, collect_pdfs
+from .pdf_screening import screen_pdf, check_page_range
+from .output_writers import OUTPUT_FORMATS, MIMETYPES, validate_output_format
+from .metrics import metrics
 
 
 
@@ -0,0 +1,334 @@
+"""
+PDF Studio - Conversão em Lote
+Converte diretórios inteiros (ou listas) de PDFs em paralelo, com relatório e retomada
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from .pdf_converter import PDFConverter
+from .excel_writer import StreamingExcelWriter
+from .output_writers import OUTPUT_FORMATS
+from .strategy_planner import StrategyStore
+from .cell_types import iter_typed_tables
+from .metrics import metrics
+
+STATE_FILE = 'batch_state.jsonl'
+PLANS_FILE = 'strategy_plans.json'
+REPORT_FILE = 'batch_report.json'
+TABLES_FOLDER = 'tables'
+
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+logger = logging.getLogger(__name__)
+
+# Converter of each worker process, built once by _init_worker
+_worker_converter = None
+
+
+def collect_pdfs(source):
+    """List (pdf_path, name) pairs from a directory tree or a manifest file
+
+    A directory is walked recursively and each name is the path relative to it,
+    so the output mirrors the tree. A manifest lists one PDF per line (blank
+    lines and '#' comments are ignored, relative paths are resolved from the
+    manifest's folder) and names are the file stems, de-duplicated with _2, _3...
+    """
+    pdfs = []
+    if os.path.isdir(source):
+        for folder, dirs, files in os.walk(source):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.lower().endswith('.pdf'):
+                    path = os.path.join(folder, filename)
+                    pdfs.append((path, os.path.splitext(os.path.relpath(path, source))[0]))
+        return pdfs
+
+    base = os.path.dirname(os.path.abspath(source))
+    used_names = {}
+    with open(source, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            path = line if os.path.isabs(line) else os.path.join(base, line)
+            name = os.path.splitext(os.path.basename(path))[0]
+            used_names[name] = used_names.get(name, 0) + 1
+            if used_names[name] > 1:
+                name = f"{name}_{used_names[name]}"
+            pdfs.append((path, name))
+    return pdfs
+
+
+def _init_worker(converter_kwargs, plans_path):
+    global _worker_converter
+    strategy_store = StrategyStore(plans_path) if plans_path else None
+    _worker_converter = PDFConverter(None, None, strategy_store=strategy_store, **converter_kwargs)
+
+
+def _convert_file(pdf_path, excel_path, tables_path, pages, output_format):
+    """Worker: convert one PDF to excel_path, or extract its tables to tables_path (combined mode)"""
+    converter = _worker_converter
+    start = time.perf_counter()
+    error = None
+    with metrics.request_scope() as scope:
+        if tables_path:
+            tables = None
+            if converter.screening:
+                pages, error = converter.screen_pages(pdf_path, pages)
+            if not error:
+                tables = converter.extract_tables(pdf_path, pages=pages)
+            if tables:
+                metrics.inc('tables_extracted', len(tables))
+                metrics.inc('rows_extracted', sum(len(table.get('data', [])) for table in tables))
+                with open(tables_path, 'w', encoding='utf-8') as f:
+                    json.dump(tables, f, ensure_ascii=False)
+            elif not error:
+                error = "Nenhuma tabela encontrada no PDF"
+        else:
+            success, error = converter.convert_pdf(pdf_path, excel_path, pages=pages, output_format=output_format)
+
+    counters = scope['counters']
+    return {
+        'status': STATUS_FAILED if error else STATUS_DONE,
+        'error': error,
+        'seconds': round(time.perf_counter() - start, 4),
+        'tables': counters.get(('tables_extracted', ()), 0),
+        'rows': counters.get(('rows_extracted', ()), 0),
+        'rows_removed': sum(value for (name, _), value in counters.items() if name == 'rows_deduplicated'),
+        'stages': metrics.format_scope(scope),
+    }
+
+
+class BatchConverter:
+    """Convert many PDFs over a pool of processes.
+
+    Each PDF becomes `<output_folder>/<name>.xlsx` (a .zip of per-table files
+    for the csv/jsonl/parquet `output_format`), or, with `combined=True`,
+    a sheet group of one `combined.xlsx` built after all files are extracted.
+    Every finished file is appended to `batch_state.jsonl`; running the same
+    batch again into the same folder skips the files already converted
+    (unchanged size and mtime, same settings) and retries the failures.
+    `batch_report.json` gets the per-file timings, counts and errors.
+    `low_memory` extracts each file page by page (see PDFConverter); it does
+    not apply to the combined mode, which keeps each file's tables.
+    `adaptive` plans the extraction strategy (see PDFConverter), sharing the
+    plans learned per layout across the workers in `strategy_plans.json`.
+    `stitch_pages` merges tables that continue across pages (see table_stitcher).
+    `typed_cells` writes numbers, percentages and dates as typed Excel cells
+    (see cell_types); the extracted tables kept for the combined mode stay text.
+    `screening` fails unreadable, password-protected and text-less PDFs before
+    extracting them and skips their pages without text (see pdf_screening).
+    `dedupe_rows` drops rows repeated across each file's tables and repeated
+    header rows (see row_dedup); the report counts them in 'rows_removed'.
+    `geometric_columns` reads borderless tables from the char positions
+    before pdfplumber's text strategy (see column_detector).
+    """
+
+    def __init__(self, output_folder, workers=None, combined=False, pages=None, excel_backend='streaming',
+                 combined_name='combined.xlsx', output_format='xlsx', low_memory=False,
+                 adaptive=False, stitch_pages=False, typed_cells=False, screening=False,
+                 dedupe_rows=False, geometric_columns=False):
+        self.output_folder = output_folder
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.combined = combined
+        self.pages = pages
+        self.excel_backend = excel_backend
+        self.combined_name = combined_name
+        self.output_format = output_format
+        self.low_memory = low_memory
+        self.adaptive = adaptive
+        self.stitch_pages = stitch_pages
+        self.typed_cells = typed_cells
+        self.screening = screening
+        self.dedupe_rows = dedupe_rows
+        self.geometric_columns = geometric_columns
+        self.plans_path = os.path.join(output_folder, PLANS_FILE) if adaptive else None
+        self.state_path = os.path.join(output_folder, STATE_FILE)
+        self.report_path = os.path.join(output_folder, REPORT_FILE)
+        os.makedirs(output_folder, exist_ok=True)
+
+    def _converter_kwargs(self):
+        """PDFConverter options of the workers' converters"""
+        return {
+            'excel_backend': self.excel_backend,
+            'low_memory': self.low_memory,
+            'adaptive': self.adaptive,
+            'stitch_pages': self.stitch_pages,
+            'typed_cells': self.typed_cells,
+            'screening': self.screening,
+            'dedupe_rows': self.dedupe_rows,
+            'geometric_columns': self.geometric_columns,
+        }
+
+    def _settings_key(self):
+        # The converter's own cache settings, plus what only the batch decides
+        settings = PDFConverter(None, None, **self._converter_kwargs()).cache_settings()
+        settings.update(combined=self.combined, pages=self.pages, output_format=self.output_format)
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def _output_path(self, name):
+        if self.combined:
+            return os.path.join(self.output_folder, TABLES_FOLDER, name + '.json')
+        return os.path.join(self.output_folder, f"{name}.{OUTPUT_FORMATS[self.output_format]}")
+
+    def _load_state(self):
+        """Latest state record per PDF path"""
+        state = {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Line cut short by an interruption
+                    state[record['pdf']] = record
+        except OSError:
+            pass
+        return state
+
+    @staticmethod
+    def _fingerprint(pdf_path):
+        stat = os.stat(pdf_path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+    def _is_resumable(self, record, pdf_path, settings_key):
+        if not record or record['status'] != STATUS_DONE or record.get('settings') != settings_key:
+            return False
+        try:
+            fingerprint = self._fingerprint(pdf_path)
+        except OSError:
+            return False
+        return (record.get('size'), record.get('mtime')) == (fingerprint['size'], fingerprint['mtime']) \
+            and os.path.exists(record['output'])
+
+    def run(self, pdfs, progress_callback=None):
+        """Convert (pdf_path, name) pairs (see collect_pdfs) and return the report
+
+        progress_callback, if given, receives each file record as it finishes.
+        KeyboardInterrupt stops the pool; finished files are already in the
+        state file, so the next run resumes from there.
+        """
+        started_at = datetime.now()
+        start = time.perf_counter()
+        settings_key = self._settings_key()
+        state = self._load_state()
+
+        records = {}
+        pending = []
+        for pdf_path, name in pdfs:
+            pdf_path = os.path.abspath(pdf_path)
+            record = state.get(pdf_path)
+            if self._is_resumable(record, pdf_path, settings_key):
+                records[pdf_path] = dict(record, resumed=True)
+            else:
+                pending.append((pdf_path, name))
+        logger.info("Batch: %d PDFs, %d already converted, %d to convert with %d workers",
+                    len(pdfs), len(records), len(pending), self.workers)
+
+        interrupted = False
+        with open(self.state_path, 'a', encoding='utf-8') as state_file:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                           initargs=(self._converter_kwargs(), self.plans_path))
+            try:
+                futures = {}
+                for pdf_path, name in pending:
+                    output_path = self._output_path(name)
+                    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                    excel_path, tables_path = (None, output_path) if self.combined else (output_path, None)
+                    future = executor.submit(_convert_file, pdf_path, excel_path, tables_path, self.pages,
+                                             self.output_format)
+                    futures[future] = (pdf_path, name, output_path)
+
+                for future in as_completed(futures):
+                    pdf_path, name, output_path = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {'status': STATUS_FAILED, 'error': f"{type(e).__name__}: {e}",
+                                  'seconds': None, 'tables': 0, 'rows': 0, 'stages': {}}
+                    try:
+                        fingerprint = self._fingerprint(pdf_path)
+                    except OSError:
+                        fingerprint = {'size': None, 'mtime': None}
+                    record = dict(result, pdf=pdf_path, name=name, output=output_path,
+                                  settings=settings_key, **fingerprint)
+                    state_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    state_file.flush()
+                    records[pdf_path] = record
+                    if progress_callback:
+                        progress_callback(record)
+            except KeyboardInterrupt:
+                interrupted = True
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            finally:
+                if not interrupted:
+                    executor.shutdown()
+                ordered = [records[os.path.abspath(path)] for path, _ in pdfs if os.path.abspath(path) in records]
+                combined_path = None
+                if self.combined and not interrupted:
+                    combined_path = self.write_combined(ordered)
+                self._write_report(ordered, len(pdfs), started_at, time.perf_counter() - start,
+                                   combined_path, interrupted)
+
+        with open(self.report_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def write_combined(self, records):
+        """One workbook with every table of the converted files, in input order"""
+        combined_path = os.path.join(self.output_folder, self.combined_name)
+        writer = StreamingExcelWriter(combined_path)
+        sheet_converter = PDFConverter(None, None)
+        index_rows = [["Arquivo", "Planilha", "Página", "Tabela", "Linhas"]]
+        for record in records:
+            if record['status'] != STATUS_DONE:
+                continue
+            with open(record['output'], 'r', encoding='utf-8') as f:
+                tables = json.load(f)
+            prefix = os.path.basename(record['name'])
+            typed_tables = iter_typed_tables(tables) if self.typed_cells else ((table_info, None) for table_info in tables)
+            for table_info, number_formats in typed_tables:
+                if not table_info['data']:
+                    continue
+                suffix = sheet_converter.sheet_name_for(table_info, len(tables))
+                sheet_name = f"{prefix[:30 - len(suffix)]}_{suffix}"
+                sheet_name = writer.add_sheet(sheet_name, table_info['data'], number_formats)
+                index_rows.append([record['name'], sheet_name, table_info['page'], table_info['table'],
+                                   len(table_info['data'])])
+        writer.add_sheet("Índice", index_rows)
+        writer.close()
+        return combined_path
+
+    def _write_report(self, records, file_count, started_at, seconds, combined_path, interrupted):
+        converted = [r for r in records if r['status'] == STATUS_DONE]
+        report = {
+            'started_at': started_at.isoformat(),
+            'finished_at': datetime.now().isoformat(),
+            'total_seconds': round(seconds, 3),
+            'workers': self.workers,
+            'mode': 'combined' if self.combined else 'per_file',
+            'pages': self.pages,
+            'interrupted': interrupted,
+            'combined_workbook': combined_path,
+            'summary': {
+                'files': file_count,
+                'converted': len(converted),
+                'resumed': sum(1 for r in records if r.get('resumed')),
+                'failed': sum(1 for r in records if r['status'] == STATUS_FAILED),
+                'pending': file_count - len(records),
+                'tables': sum(r['tables'] for r in converted),
+                'rows': sum(r['rows'] for r in converted),
+                'rows_removed': sum(r.get('rows_removed', 0) for r in converted),
+            },
+            'files': records,
+        }
+        tmp_path = self.report_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.report_path)
@@ -0,0 +1,191 @@
+"""
+PDF Studio - Tipos das Células
+Converte as colunas extraídas em números, percentuais e datas nos formatos brasileiros
+(1.234,56 / 12,5% / dd/mm/aaaa), com operações vetorizadas do pandas sobre várias tabelas de uma vez
+"""
+
+import logging
+import re
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# A number as printed in Brazilian documents: '.' groups thousands, ',' starts the
+# decimals. Leading zeros mark codes (0042), which stay text
+_NUMBER = r'[-+]?(?:[1-9]\d{0,2}(?:\.\d{3})+|0|[1-9]\d*)(?:,\d+)?'
+# At most 15 digits, Excel's precision
+INTEGER_PATTERN = r'[-+]?(?:0|[1-9]\d{0,14})'
+DECIMAL_PATTERN = rf'(?:R\$\s*)?{_NUMBER}'
+PERCENT_PATTERN = rf'{_NUMBER}\s*%'
+DATE_PATTERN = r'\d{2}/\d{2}/\d{4}'
+
+# Tried in this order; DECIMAL_PATTERN also matches every integer
+COLUMN_PATTERNS = [
+    ('date', re.compile(DATE_PATTERN)),
+    ('percent', re.compile(PERCENT_PATTERN)),
+    ('integer', re.compile(INTEGER_PATTERN)),
+    ('decimal', re.compile(DECIMAL_PATTERN)),
+]
+
+INTEGER_FORMAT = '0'
+PERCENT_FORMAT = '0.00%'
+DATE_FORMAT = 'DD/MM/YYYY'
+
+# Cells typed together by iter_typed_tables: enough to amortize pandas' per-call cost
+BATCH_CELLS = 50_000
+
+
+def _parse_numbers(values):
+    """Series of Brazilian-formatted number strings to floats (NaN where unparseable)"""
+    import pandas as pd
+
+    values = values.str.replace(r'^R\$\s*', '', regex=True).str.rstrip('%').str.strip()
+    values = values.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    return pd.to_numeric(values, errors='coerce')
+
+
+def _decimal_format(decimals):
+    """'#,##0.00'-like format showing that many decimals"""
+    return '#,##0' + ('.' + '0' * decimals if decimals else '')
+
+
+def _parse_column_values(kind, values):
+    """Series of cell strings already matching kind's pattern to parsed values (NaN/NaT where invalid)"""
+    import pandas as pd
+
+    if kind == 'date':
+        return pd.to_datetime(values, format='%d/%m/%Y', errors='coerce')  # NaT for 31/02/2024
+    if kind == 'integer':
+        return pd.to_numeric(values, errors='coerce')
+    parsed = _parse_numbers(values)
+    return parsed / 100 if kind == 'percent' else parsed
+
+
+def type_tables(tables):
+    """type_table for a list of tables (lists of rows) in one vectorized pass
+
+    The data cells of all the tables are checked together, each (table,
+    column) pair on its own, so typing many small tables costs a few pandas
+    operations instead of a few per column. Returns a list of (rows,
+    number_formats), see type_table.
+    """
+    results = [(rows, {}) for rows in tables]
+    width = max((len(row) for rows in tables for row in rows[1:]), default=0)
+    if not width:
+        return results
+    import numpy as np
+    import pandas as pd
+
+    with metrics.timer('cell_types'):
+        # One flat list of the cells below the headers; a cell's group is its
+        # table and column (table * width + column)
+        cells = []
+        groups = []
+        starts = []
+        for table_id, rows in enumerate(tables):
+            starts.append(len(cells))
+            base = table_id * width
+            for row in rows[1:]:
+                cells.extend(row)
+                groups.extend(range(base, base + len(row)))
+        groups = np.asarray(groups, dtype=np.int64)
+        values = pd.Series(cells, dtype=object).fillna('').astype(str).str.strip()
+        filled = (values != '').to_numpy()
+
+        # Each pattern is checked only on the columns no earlier pattern fitted
+        kinds = {}
+        undecided = np.unique(groups[filled])
+        for kind, pattern in COLUMN_PATTERNS:
+            if not len(undecided):
+                break
+            checked = filled & np.isin(groups, undecided)
+            fits = values[checked].str.fullmatch(pattern).groupby(groups[checked]).all()
+            kinds.update(dict.fromkeys(fits.index[fits.to_numpy()].tolist(), kind))
+            undecided = fits.index[~fits.to_numpy()].to_numpy()
+        if not kinds:
+            return results
+
+        # An object array, so the empty cells become None instead of NaN
+        converted = np.array(cells, dtype=object)
+        number_formats = {}
+        for kind, _ in COLUMN_PATTERNS:
+            kind_groups = [group for group, group_kind in kinds.items() if group_kind == kind]
+            if not kind_groups:
+                continue
+            present = np.flatnonzero(filled & np.isin(groups, kind_groups))
+            parsed = _parse_column_values(kind, values.iloc[present])
+            invalid = np.unique(groups[present][parsed.isna().to_numpy()])
+            if len(invalid):
+                valid = ~np.isin(groups[present], invalid)
+                present, parsed = present[valid], parsed[valid]
+                invalid = set(invalid.tolist())
+                kind_groups = [group for group in kind_groups if group not in invalid]
+            if not kind_groups:
+                continue
+
+            if kind == 'date':
+                converted[present] = parsed.dt.to_pydatetime()
+                number_formats.update(dict.fromkeys(kind_groups, DATE_FORMAT))
+            elif kind == 'integer':
+                converted[present] = parsed.astype('int64').tolist()
+                number_formats.update(dict.fromkeys(kind_groups, INTEGER_FORMAT))
+            elif kind == 'percent':
+                converted[present] = parsed.tolist()
+                number_formats.update(dict.fromkeys(kind_groups, PERCENT_FORMAT))
+            else:
+                converted[present] = parsed.tolist()
+                decimals = values.iloc[present].str.extract(r',(\d+)', expand=False).str.len()
+                decimals = decimals.groupby(groups[present]).max().fillna(0).astype(int)
+                number_formats.update({group: _decimal_format(count) for group, count in decimals.items()})
+        if not number_formats:
+            return results
+        typed_groups = np.fromiter(number_formats, dtype=np.int64)
+        converted[np.isin(groups, typed_groups) & ~filled] = None
+
+        table_formats = {}
+        for group, number_format in number_formats.items():
+            table_formats.setdefault(group // width, {})[group % width] = number_format
+        for table_id, formats in table_formats.items():
+            rows = tables[table_id]
+            position = starts[table_id]
+            typed_rows = [rows[0]]
+            for row in rows[1:]:
+                typed_rows.append(converted[position:position + len(row)].tolist())
+                position += len(row)
+            results[table_id] = (typed_rows, formats)
+    metrics.inc('typed_columns', len(number_formats))
+    return results
+
+
+def type_table(rows):
+    """Typed copy of a table's rows and the Excel number format of each typed column
+
+    The first row is the header and stays as it is, as do the columns that
+    are not entirely numbers, percentages or dates. Returns (rows,
+    number_formats), number_formats mapping 0-based column indexes to formats.
+    """
+    return type_tables([rows])[0]
+
+
+def iter_typed_tables(tables, batch_cells=BATCH_CELLS):
+    """(table_info, number_formats) for each table dict of an iterable, with typed 'data'
+
+    Tables are typed in batches of about batch_cells cells (see type_tables),
+    so a generator of tables is only read that far ahead.
+    """
+    batch = []
+    batch_size = 0
+    for table_info in tables:
+        batch.append(table_info)
+        batch_size += sum(len(row) for row in table_info['data'])
+        if batch_size >= batch_cells:
+            yield from _typed_batch(batch)
+            batch = []
+            batch_size = 0
+    yield from _typed_batch(batch)
+
+
+def _typed_batch(batch):
+    typed = type_tables([table_info['data'] for table_info in batch])
+    for table_info, (rows, number_formats) in zip(batch, typed):
+        yield (dict(table_info, data=rows) if number_formats else table_info), number_formats
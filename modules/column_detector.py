@@ -0,0 +1,130 @@
+"""
+PDF Studio - Detecção Geométrica de Colunas
+Encontra as colunas de tabelas sem linhas pelas posições x dos caracteres: um histograma
+dos espaços em branco de todas as linhas da página, calculado com NumPy
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Chars whose tops are this close (in PDF points) are on the same line, as in pdfplumber
+Y_TOLERANCE = 3
+# Gaps wider than this fraction of the text height separate words (a space is ~0.28)
+SPACE_RATIO = 0.15
+# Gaps at least this wide (fraction of the text height, ~2 spaces) may separate columns
+COLUMN_GAP_RATIO = 0.6
+# A column gutter may be crossed by this fraction of the table lines (a wide header cell)
+CROSSING_RATIO = 0.05
+MIN_ROWS = 3
+MIN_COLUMNS = 2
+
+
+def _char_arrays(chars):
+    """x0, x1, top, bottom and text of the visible upright chars, ordered by line then x"""
+    import numpy as np
+
+    visible = [char for char in chars if char.get('upright', True) and char['text'].strip()]
+    if not visible:
+        return None
+    x0 = np.fromiter((char['x0'] for char in visible), dtype=float, count=len(visible))
+    x1 = np.fromiter((char['x1'] for char in visible), dtype=float, count=len(visible))
+    top = np.fromiter((char['top'] for char in visible), dtype=float, count=len(visible))
+    bottom = np.fromiter((char['bottom'] for char in visible), dtype=float, count=len(visible))
+    text = np.array([char['text'] for char in visible], dtype=object)
+
+    # Lines: a new one starts where the sorted tops jump by more than Y_TOLERANCE
+    by_top = np.argsort(top, kind='stable')
+    line_of = np.empty(len(visible), dtype=np.int64)
+    line_of[by_top] = np.concatenate(([0], np.cumsum(np.diff(top[by_top]) > Y_TOLERANCE)))
+    order = np.lexsort((x0, line_of))
+    return x0[order], x1[order], top[order], bottom[order], text[order], line_of[order]
+
+
+def detect_columns(chars):
+    """Rows and column boundaries of the borderless table found in a page's chars
+
+    Chars are grouped into lines (tops within Y_TOLERANCE) and, inside each
+    line, into runs split by gaps of at least COLUMN_GAP_RATIO times the text
+    height. Lines with two or more runs are table lines; the x coverage of
+    their runs is summed in a 1pt histogram, and the x ranges (as wide as a
+    column gap) that almost no table line covers are the column gutters.
+    Every line between the first and last table lines is then cut at the
+    gutters in one pass (np.searchsorted of the runs' left x), each run
+    going whole to one cell, and the chars of each cell are joined, with a
+    space where words are apart.
+    Returns (rows, edges), edges being each column's left x and then the
+    table's right x, or (None, None) when there is no table of MIN_ROWS rows
+    and MIN_COLUMNS columns.
+    """
+    import numpy as np
+
+    arrays = _char_arrays(chars)
+    if arrays is None:
+        return None, None
+    x0, x1, top, bottom, text, line_of = arrays
+    height = float(np.median(bottom - top)) or 1.0
+    same_line = line_of[1:] == line_of[:-1]
+    gaps = np.where(same_line, x0[1:] - x1[:-1], np.inf)
+
+    # Runs of chars separated by column-wide gaps (or a line change)
+    starts_run = np.concatenate(([True], gaps >= COLUMN_GAP_RATIO * height))
+    run_starts = np.flatnonzero(starts_run)
+    run_ends = np.concatenate((run_starts[1:], [len(x0)])) - 1
+    run_lines = line_of[run_starts]
+    runs_per_line = np.bincount(run_lines)
+    table_runs = runs_per_line[run_lines] >= MIN_COLUMNS
+    table_lines = np.flatnonzero(runs_per_line >= MIN_COLUMNS)
+    if len(table_lines) < MIN_ROWS:
+        return None, None
+
+    # Coverage histogram of the table lines' runs, by difference array
+    left = np.floor(x0[run_starts[table_runs]]).astype(np.int64)
+    right = np.ceil(x1[run_ends[table_runs]]).astype(np.int64)
+    origin = left.min()
+    diff = np.zeros(right.max() - origin + 1, dtype=np.int64)
+    np.add.at(diff, left - origin, 1)
+    np.add.at(diff, right - origin, -1)
+    coverage = np.cumsum(diff)[:-1]
+
+    # Gutters: runs of open bins with covered bins on both sides, at least a
+    # column gap wide. Padding with open bins makes the outer runs the first
+    # and last, each with one transition only
+    padded = np.concatenate(([True], coverage <= CROSSING_RATIO * len(table_lines), [True]))
+    steps = np.diff(padded.astype(np.int8))
+    opens, closes = np.flatnonzero(steps == 1), np.flatnonzero(steps == -1)
+    gutters = [(start, end) for start, end in zip(opens.tolist(), closes[1:].tolist())
+               if end - start >= COLUMN_GAP_RATIO * height]
+    if len(gutters) < MIN_COLUMNS - 1:
+        return None, None
+    boundaries = np.array([origin + (start + end) / 2 for start, end in gutters])
+
+    # A run goes whole to the column where it starts: a line of text crossing a
+    # gutter (a note between the rows) is not cut in the middle of a word
+    column_of = np.searchsorted(boundaries, x0[run_starts])[np.cumsum(starts_run) - 1]
+
+    # The table spans the lines from its first to its last table line
+    lo = np.searchsorted(line_of, table_lines[0])
+    hi = np.searchsorted(line_of, table_lines[-1], side='right')
+    text, line_of, column_of, gaps = text[lo:hi], line_of[lo:hi], column_of[lo:hi], gaps[lo:hi - 1]
+    x0, x1 = x0[lo:hi], x1[lo:hi]
+
+    # One slice per (line, column) cell; words inside a cell keep a space
+    new_cell = np.concatenate(([True], (line_of[1:] != line_of[:-1]) | (column_of[1:] != column_of[:-1])))
+    spaced = np.concatenate(([False], gaps > SPACE_RATIO * height)) & ~new_cell
+    pieces = np.char.add(np.where(spaced, ' ', ''), text.astype(str)).tolist()
+    cell_starts = np.flatnonzero(new_cell).tolist()
+    cell_ends = cell_starts[1:] + [len(pieces)]
+    line_list, column_list = line_of.tolist(), column_of.tolist()
+
+    width = len(boundaries) + 1
+    rows = {}
+    for start, end in zip(cell_starts, cell_ends):
+        row = rows.get(line_list[start])
+        if row is None:
+            row = rows[line_list[start]] = [''] * width
+        row[column_list[start]] = ''.join(pieces[start:end])
+
+    edges = [float(x0.min())] + boundaries.tolist() + [float(x1.max())]
+    logger.debug("Geometric columns: %d rows, %d columns", len(rows), width)
+    return [rows[line] for line in sorted(rows)], edges
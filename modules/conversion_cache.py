@@ -0,0 +1,194 @@
+"""
+PDF Studio - Cache de Conversões
+Guarda workbooks e tabelas já extraídas, endereçados pelo hash do PDF
+"""
+
+import os
+import json
+import hashlib
+import shutil
+import tempfile
+import threading
+
+# Files making up one entry
+ENTRY_EXTENSIONS = ('xlsx', 'json', 'meta')
+
+
+class ConversionCache:
+    """Disk cache of conversions keyed on SHA-256(PDF bytes + extraction settings).
+
+    Each entry is a `<key>.xlsx` workbook plus a `<key>.json` table list, and a
+    `<key>.meta` dict of facts about the conversion (rows removed). Hits
+    refresh the entry mtime and eviction removes the least recently used entries
+    until the folder fits in `max_bytes`.
+    """
+
+    def __init__(self, cache_folder, max_bytes=200 * 1024 * 1024):
+        self.cache_folder = cache_folder
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_folder, exist_ok=True)
+
+    def make_key(self, pdf_source, settings):
+        """Hash the PDF bytes (path or open binary file) together with the extraction settings"""
+        digest = hashlib.sha256()
+        if hasattr(pdf_source, 'read'):
+            pdf_source.seek(0)
+            for chunk in iter(lambda: pdf_source.read(1024 * 1024), b''):
+                digest.update(chunk)
+            pdf_source.seek(0)
+        else:
+            with open(pdf_source, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        digest.update(json.dumps(settings, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key, extension):
+        return os.path.join(self.cache_folder, f"{key}.{extension}")
+
+    def get_workbook(self, key, dest):
+        """Copy the cached workbook to dest (path or writable file). Returns True on a hit"""
+        path = self._path(key, 'xlsx')
+        with self._lock:
+            try:
+                if hasattr(dest, 'write'):
+                    with open(path, 'rb') as f:
+                        shutil.copyfileobj(f, dest)
+                else:
+                    shutil.copyfile(path, dest)
+            except OSError:
+                self.misses += 1
+                return False
+            self._touch(key)
+            self.hits += 1
+        return True
+
+    def get_tables(self, key):
+        """Return the cached table list, or None on a miss"""
+        path = self._path(key, 'json')
+        with self._lock:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    tables = json.load(f)
+            except (OSError, ValueError):
+                self.misses += 1
+                return None
+            self._touch(key)
+            self.hits += 1
+        return tables
+
+    def get_meta(self, key):
+        """Return the dict stored with the entry by put(meta=...), or {} without one"""
+        try:
+            with open(self._path(key, 'meta'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def put(self, key, tables, workbook=None, meta=None):
+        """Store a conversion result and evict old entries if over the size limit
+
+        workbook is the built .xlsx, as a path or a seekable binary file.
+        tables is None when they were already stored by record_tables.
+        meta is an optional JSON-friendly dict returned by get_meta on later hits.
+        """
+        with self._lock:
+            if tables is not None:
+                tmp_path = self._path(key, 'json.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(tables, f, ensure_ascii=False)
+                os.replace(tmp_path, self._path(key, 'json'))
+
+            if workbook is not None:
+                tmp_path = self._path(key, 'xlsx.tmp')
+                if hasattr(workbook, 'read'):
+                    position = workbook.tell()
+                    workbook.seek(0)
+                    with open(tmp_path, 'wb') as f:
+                        shutil.copyfileobj(workbook, f)
+                    workbook.seek(position)
+                else:
+                    shutil.copyfile(workbook, tmp_path)
+                os.replace(tmp_path, self._path(key, 'xlsx'))
+
+            if meta:
+                tmp_path = self._path(key, 'meta.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(meta, f)
+                os.replace(tmp_path, self._path(key, 'meta'))
+
+            self._evict()
+
+    def record_tables(self, key, tables):
+        """Pass an iterator of tables through, writing them to the entry's table list
+        
+        For conversions that never hold all the tables at once. The list is only
+        stored once the iterator is exhausted; call put(key, None, workbook)
+        afterwards to add the workbook and apply the size limit.
+        """
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_folder)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write('[')
+                for idx, table in enumerate(tables):
+                    if idx:
+                        f.write(', ')
+                    json.dump(table, f, ensure_ascii=False)
+                    yield table
+                f.write(']')
+            with self._lock:
+                os.replace(tmp_path, self._path(key, 'json'))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _touch(self, key):
+        for extension in ENTRY_EXTENSIONS:
+            try:
+                os.utime(self._path(key, extension))
+            except OSError:
+                pass
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = {}
+        total_size = 0
+        for entry in os.scandir(self.cache_folder):
+            if not entry.is_file() or entry.name.endswith('.tmp'):
+                continue
+            key = entry.name.split('.', 1)[0]
+            stat = entry.stat()
+            size, mtime = entries.get(key, (0, 0))
+            entries[key] = (size + stat.st_size, max(mtime, stat.st_mtime))
+            total_size += stat.st_size
+
+        for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if total_size <= self.max_bytes:
+                break
+            for extension in ENTRY_EXTENSIONS:
+                try:
+                    os.remove(self._path(key, extension))
+                except OSError:
+                    pass
+            total_size -= size
+
+    def stats(self):
+        """Hit/miss counters and current disk usage"""
+        with self._lock:
+            entries = 0
+            size_bytes = 0
+            for entry in os.scandir(self.cache_folder):
+                if entry.is_file():
+                    size_bytes += entry.stat().st_size
+                    if entry.name.endswith('.json'):
+                        entries += 1
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': entries,
+                'size_bytes': size_bytes,
+                'max_bytes': self.max_bytes
+            }
@@ -0,0 +1,95 @@
+"""
+PDF Studio - Corrida entre Motores de Extração
+Executa pdfplumber e tabula ao mesmo tempo, fica com o primeiro resultado aceitável
+e cancela o outro
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# A result is good enough to win when one of its tables has this many rows
+# (header included) and columns
+MIN_ROWS = 2
+MIN_COLUMNS = 2
+
+
+class EngineCancelled(Exception):
+    """Raised inside an engine that lost the race (or timed out) and was told to stop"""
+
+
+def tables_look_good(tables, min_rows=MIN_ROWS, min_columns=MIN_COLUMNS):
+    """True when at least one table has min_rows rows and min_columns columns"""
+    return any(
+        len(table_info['data']) >= min_rows
+        and max((len(row) for row in table_info['data']), default=0) >= min_columns
+        for table_info in tables or []
+    )
+
+
+def _run_engine(function, cancel):
+    """Engine thread: the engine's result and the counters and timings it recorded"""
+    with metrics.request_scope() as scope:
+        try:
+            return function(cancel), scope
+        except EngineCancelled:
+            return None, scope
+
+
+def race_engines(engines, timeout=None, accept=tables_look_good):
+    """Run engines concurrently and return (name, tables) of the winner
+
+    engines is a list of (name, function) in order of preference; each
+    function gets a threading.Event that is set when it should stop (it lost
+    or ran out of time) and returns a list of tables or None. The first
+    result `accept` approves wins and the others are cancelled without being
+    waited for. When none is approved, the first engine in preference order
+    that found any table wins; (None, None) when none did. `timeout` bounds
+    each engine, in seconds from the start of the race. An engine that
+    ignores its event (tabula-py without the warm backend) keeps running in
+    its thread until it returns on its own.
+    """
+    cancels = {name: threading.Event() for name, _ in engines}
+    executor = ThreadPoolExecutor(max_workers=len(engines), thread_name_prefix='engine-race')
+    futures = {executor.submit(_run_engine, function, cancels[name]): name for name, function in engines}
+    order = {future: index for index, future in enumerate(futures)}
+    executor.shutdown(wait=False)
+    deadline = time.monotonic() + timeout if timeout else None
+
+    results = {}
+    winner = None
+    pending = set(futures)
+    while pending and winner is None:
+        remaining = deadline - time.monotonic() if deadline else None
+        if remaining is not None and remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        # Engines that finished together are judged in order of preference
+        for future in sorted(done, key=order.__getitem__):
+            name = futures[future]
+            try:
+                tables, scope = future.result()
+            except Exception as e:
+                logger.warning("Engine %s failed: %s", name, e)
+                continue
+            metrics.add_scope(scope)
+            results[name] = tables
+            logger.info("Engine %s finished with %d tables", name, len(tables) if tables else 0)
+            if winner is None and accept(tables):
+                winner = name
+
+    for future in pending:
+        name = futures[future]
+        cancels[name].set()
+        if winner is None:
+            logger.warning("Engine %s timed out after %ss", name, timeout)
+            metrics.inc('engine_timeouts', engine=name)
+
+    if winner is None:
+        winner = next((name for name, _ in engines if results.get(name)), None)
+    metrics.inc('engine_wins', engine=winner or 'none')
+    return winner, results.get(winner)
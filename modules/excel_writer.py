@@ -0,0 +1,140 @@
+"""
+PDF Studio - Escrita de Excel em Streaming
+Gera planilhas no modo write-only do openpyxl, linha a linha
+"""
+
+import logging
+from itertools import islice
+
+INVALID_SHEET_CHARS = '/\\?*[]:'
+
+logger = logging.getLogger(__name__)
+
+
+def sanitize_sheet_name(sheet_name):
+    """Truncate to Excel's 31 chars and replace the characters it rejects"""
+    sheet_name = sheet_name[:31]
+    for char in INVALID_SHEET_CHARS:
+        sheet_name = sheet_name.replace(char, '_')
+    return sheet_name
+
+
+def unique_sheet_name(sheet_name, used_names):
+    """Append a counter until the name is not in used_names, then record it"""
+    original_name = sheet_name
+    counter = 1
+    while sheet_name in used_names:
+        sheet_name = f"{original_name}_{counter}"[:31]
+        counter += 1
+    used_names.add(sheet_name)
+    return sheet_name
+
+
+def column_width(max_length):
+    """Column width for the longest value, with reasonable limits (min 10, max 50)"""
+    return min(max(max_length + 2, 10), 50)
+
+
+class StreamingExcelWriter:
+    """Write-only workbook that appends rows as they arrive.
+
+    openpyxl needs column widths before the first row of a sheet is written, so
+    the first `width_sample_rows` rows are buffered to size the columns; the
+    rest are streamed straight to disk. Peak memory is bounded by that sample,
+    not by the size of the table.
+    """
+
+    def __init__(self, output_path, width_sample_rows=1000):
+        self.output_path = output_path
+        self.width_sample_rows = width_sample_rows
+        # openpyxl is only loaded once a workbook is written
+        from openpyxl import Workbook
+        self.workbook = Workbook(write_only=True)
+        self.sheet_names = set()
+        self.sheet_count = 0
+
+    @staticmethod
+    def clean_row(row):
+        # Empty values are written as missing cells, like ws.cell(value='') does
+        return [str(value).strip() or None if value else None for value in row]
+
+    @staticmethod
+    def typed_row(ws, row, number_formats):
+        """clean_row, except that values in number_formats' columns become cells with that format"""
+        from openpyxl.cell import WriteOnlyCell
+        
+        cells = []
+        for col_idx, value in enumerate(row):
+            number_format = number_formats.get(col_idx)
+            if number_format is None or value is None or isinstance(value, str):
+                cells.append(str(value).strip() or None if value else None)
+            else:
+                cell = WriteOnlyCell(ws, value=value)
+                cell.number_format = number_format
+                cells.append(cell)
+        return cells
+
+    def add_sheet(self, sheet_name, rows, number_formats=None):
+        """Write rows (any iterable of lists) to a new sheet. Returns the sheet name
+        
+        number_formats optionally maps 0-based column indexes to Excel number
+        formats for the typed values (numbers, dates) below the header; see
+        cell_types.type_tables.
+        """
+        from openpyxl.utils import get_column_letter
+        
+        sheet_name = unique_sheet_name(sanitize_sheet_name(sheet_name), self.sheet_names)
+        ws = self.workbook.create_sheet(title=sheet_name)
+        rows = iter(rows)
+
+        # Size the columns from the buffered sample in the same pass that cleans it
+        sample = []
+        widths = []
+        for row in islice(rows, self.width_sample_rows):
+            cleaned_row = self.clean_row(row)
+            if len(cleaned_row) > len(widths):
+                widths.extend([0] * (len(cleaned_row) - len(widths)))
+            for col_idx, value in enumerate(cleaned_row):
+                if value and len(value) > widths[col_idx]:
+                    widths[col_idx] = len(value)
+            sample.append(self.typed_row(ws, row, number_formats) if number_formats and sample else cleaned_row)
+
+        for col_idx, max_length in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = column_width(max_length)
+        ws.freeze_panes = 'A2'
+
+        row_count = 0
+        if sample:
+            ws.append(self._header_cells(ws, sample[0], len(widths)))
+            row_count = 1
+            for cleaned_row in sample[1:]:
+                ws.append(cleaned_row)
+                row_count += 1
+        del sample
+
+        for row in rows:
+            ws.append(self.typed_row(ws, row, number_formats) if number_formats else self.clean_row(row))
+            row_count += 1
+
+        self.sheet_count += 1
+        logger.debug("Streamed sheet '%s' with %d rows", sheet_name, row_count)
+        return sheet_name
+
+    @staticmethod
+    def _header_cells(ws, header_row, max_cols):
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill, Alignment
+        
+        cells = []
+        for col_idx in range(max_cols):
+            value = header_row[col_idx] if col_idx < len(header_row) else None
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font = Font(bold=True)
+            cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+            cell.alignment = Alignment(horizontal="center", vertical="center")
+            cells.append(cell)
+        return cells
+
+    def close(self):
+        """Finish the workbook on disk"""
+        self.workbook.save(self.output_path)
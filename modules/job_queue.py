@@ -0,0 +1,361 @@
+"""
+PDF Studio - Fila de Conversões
+Executa conversões em segundo plano, com estado guardado em SQLite
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+# Oldest queued or running job with a dedupe_key
+_FIND_ACTIVE_SQL = "SELECT id FROM jobs WHERE dedupe_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1"
+
+# Idle workers look for jobs orphaned by a dead process at most this often (seconds)
+ORPHAN_CHECK_INTERVAL = 10
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobQueue:
+    """Background job queue stored in a local SQLite database.
+
+    `handler(payload, report_progress, report_event)` runs each job and
+    returns a JSON-serializable result; an exception marks the job as failed.
+    `report_progress(pages_done, pages_total)` updates the job's page counters
+    and `report_event(event)` appends a JSON-serializable dict to the job's
+    event log, which `events`/`wait_events` read back in order, so a client can
+    follow a job (or resume following it) from any process. The queue itself
+    logs 'job_started', 'job_done' and 'job_failed'.
+    Worker threads claim queued rows from the database, so several processes
+    can share the same file; a claimed row records its process ("host:pid"),
+    and the jobs of a process that exited mid-job are failed by the others
+    (see fail_orphaned_jobs). With `max_workers=0` jobs run inline in `submit`,
+    for platforms that freeze the process after the response (serverless).
+    """
+
+    def __init__(self, db_path, handler, max_workers=2, poll_interval=1.0):
+        self.db_path = db_path
+        self.handler = handler
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._threads_lock = threading.Lock()
+        # Wakes local wait_events callers; other processes' events are polled
+        self._events_cond = threading.Condition()
+        self._events_version = 0
+        # The pid is read at claim time: the queue may be created before a fork
+        self._host = socket.gethostname()
+        self._last_orphan_check = 0.0
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    pages_done INTEGER NOT NULL DEFAULT 0,
+                    pages_total INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            # Databases created before job deduplication lack the column
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'dedupe_key' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN dedupe_key TEXT")
+            if 'owner' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, status)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_events (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    event TEXT NOT NULL,
+                    PRIMARY KEY (job_id, seq)
+                )
+            """)
+        finally:
+            conn.close()
+
+    def _execute(self, sql, params=()):
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).rowcount
+        finally:
+            conn.close()
+
+    def submit(self, payload, dedupe_key=None):
+        """Queue a job and return its id
+        
+        dedupe_key identifies the work (see find_active), so a resubmitted
+        request can be attached to the job already in flight; submit_or_join
+        does both at once.
+        """
+        conn = self._connect()
+        try:
+            job_id = self._insert(conn, payload, dedupe_key)
+        finally:
+            conn.close()
+        self._dispatch(job_id)
+        return job_id
+
+    def submit_or_join(self, payload, dedupe_key):
+        """(job_id, joined): the active job submitted with dedupe_key (see find_active), or a new one
+        
+        The lookup and the insert run in one write transaction, so identical
+        requests arriving together, in any process, queue a single job.
+        """
+        # A job whose process died would otherwise be joined and never finish
+        self.fail_orphaned_jobs()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(_FIND_ACTIVE_SQL, (dedupe_key, JOB_QUEUED, JOB_RUNNING)).fetchone()
+            job_id = row['id'] if row else self._insert(conn, payload, dedupe_key)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        if row:
+            return job_id, True
+        self._dispatch(job_id)
+        return job_id, False
+
+    @staticmethod
+    def _insert(conn, payload, dedupe_key):
+        job_id = str(uuid.uuid4())
+        now = datetime.now().isoformat()
+        conn.execute(
+            "INSERT INTO jobs (id, status, payload, dedupe_key, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, JOB_QUEUED, json.dumps(payload), dedupe_key, now, now)
+        )
+        return job_id
+
+    def _dispatch(self, job_id):
+        """Run a new job inline, or wake the worker threads"""
+        if self.max_workers <= 0:
+            self._run(self._claim(job_id))
+        else:
+            self.start()
+            self._wakeup.set()
+
+    def get(self, job_id):
+        """Job status as a dict, or None if the id is unknown"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        # Clients polling a job whose process died see it fail instead of waiting forever
+        if self._orphaned(row) and self._fail_orphan(row):
+            return self.get(job_id)
+
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def find_active(self, dedupe_key):
+        """Id of the oldest queued or running job submitted with dedupe_key, or None"""
+        # A job whose process died would otherwise be joined and never finish
+        self.fail_orphaned_jobs()
+        conn = self._connect()
+        try:
+            row = conn.execute(_FIND_ACTIVE_SQL, (dedupe_key, JOB_QUEUED, JOB_RUNNING)).fetchone()
+        finally:
+            conn.close()
+        return row['id'] if row else None
+
+    def add_event(self, job_id, seq, event):
+        self._execute("INSERT INTO job_events (job_id, seq, event) VALUES (?, ?, ?)",
+                      (job_id, seq, json.dumps(event)))
+        with self._events_cond:
+            self._events_version += 1
+            self._events_cond.notify_all()
+
+    def events(self, job_id, after=0):
+        """[(seq, event)] of a job with seq > after, oldest first"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT seq, event FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [(row['seq'], json.loads(row['event'])) for row in rows]
+
+    def wait_events(self, job_id, after=0, timeout=None):
+        """events(), waiting up to timeout (default poll_interval) while there are none"""
+        deadline = time.monotonic() + (self.poll_interval if timeout is None else timeout)
+        while True:
+            with self._events_cond:
+                version = self._events_version
+            events = self.events(job_id, after)
+            remaining = deadline - time.monotonic()
+            if events or remaining <= 0:
+                return events
+            with self._events_cond:
+                if self._events_version == version:
+                    self._events_cond.wait(min(remaining, self.poll_interval))
+
+    def update_progress(self, job_id, pages_done, pages_total):
+        self._execute(
+            "UPDATE jobs SET pages_done = ?, pages_total = ?, updated_at = ? WHERE id = ?",
+            (pages_done, pages_total, datetime.now().isoformat(), job_id)
+        )
+
+    def _claim(self, job_id=None):
+        """Atomically move one queued job (the oldest, or job_id) to running"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if job_id:
+                row = conn.execute(
+                    "SELECT id, payload FROM jobs WHERE id = ? AND status = ?", (job_id, JOB_QUEUED)
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT id, payload FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (JOB_QUEUED,)
+                ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, updated_at = ? WHERE id = ?",
+                    (JOB_RUNNING, f"{self._host}:{os.getpid()}", datetime.now().isoformat(), row['id'])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return row
+
+    def _run(self, row):
+        if row is None:
+            return
+        job_id = row['id']
+
+        seq = [0]
+
+        def report_progress(pages_done, pages_total):
+            self.update_progress(job_id, pages_done, pages_total)
+
+        def report_event(event):
+            seq[0] += 1
+            self.add_event(job_id, seq[0], event)
+
+        report_event({'event': 'job_started'})
+        try:
+            result = self.handler(json.loads(row['payload']), report_progress, report_event)
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            self._execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (JOB_FAILED, str(e), datetime.now().isoformat(), job_id)
+            )
+            report_event({'event': 'job_failed', 'error': str(e)})
+            return
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, updated_at = ? WHERE id = ?",
+            (JOB_DONE, json.dumps(result), datetime.now().isoformat(), job_id)
+        )
+        report_event({'event': 'job_done'})
+
+    def start(self):
+        """Start the worker threads on first use"""
+        with self._threads_lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._worker_loop, name='job-worker', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker_loop(self):
+        while True:
+            row = self._claim()
+            if row is None:
+                # Wait for a local submit, or poll for jobs queued by other processes
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                if time.monotonic() - self._last_orphan_check >= ORPHAN_CHECK_INTERVAL:
+                    self.fail_orphaned_jobs()
+                continue
+            self._run(row)
+
+    def fail_stale_jobs(self, message="Conversão interrompida"):
+        """Mark jobs left running by a previous process as failed"""
+        return self._execute(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status = ?",
+            (JOB_FAILED, message, datetime.now().isoformat(), JOB_RUNNING)
+        )
+
+    def fail_orphaned_jobs(self, message="Conversão interrompida"):
+        """Mark as failed the running jobs of processes of this host that have exited
+
+        A server worker recycled or killed mid-job leaves its job running, and
+        clients following it would wait forever. Jobs of live processes, and of
+        other hosts sharing the database, are left alone.
+        """
+        self._last_orphan_check = time.monotonic()
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT id, status, owner FROM jobs WHERE status = ? AND owner IS NOT NULL",
+                                (JOB_RUNNING,)).fetchall()
+        finally:
+            conn.close()
+
+        return sum(self._fail_orphan(row, message) for row in rows if self._orphaned(row))
+
+    def _orphaned(self, row):
+        """True for a running job claimed by a process of this host that no longer exists"""
+        if row['status'] != JOB_RUNNING or not row['owner']:
+            return False
+        owner_host, _, pid = row['owner'].rpartition(':')
+        return owner_host == self._host and not _process_alive(int(pid))
+
+    def _fail_orphan(self, row, message="Conversão interrompida"):
+        failed = self._execute(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ? AND status = ?",
+            (JOB_FAILED, message, datetime.now().isoformat(), row['id'], JOB_RUNNING)
+        )
+        if failed:
+            logger.warning("Job %s failed: its process %s exited", row['id'], row['owner'])
+        return failed
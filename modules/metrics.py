@@ -0,0 +1,144 @@
+"""
+PDF Studio - Métricas
+Contadores e tempos por etapa da conversão, exportados no formato texto do Prometheus
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+METRIC_PREFIX = 'pdfstudio'
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(label_key):
+    if not label_key:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in label_key) + '}'
+
+
+class Metrics:
+    """Process-wide registry of counters and stage timers.
+
+    Counters and stage timings also go to the request scope opened by
+    `request_scope()` in the current thread, which is how a single conversion
+    gets its own timing breakdown while the registry keeps the totals.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timers = {}
+        self._local = threading.local()
+
+    def inc(self, name, value=1, **labels):
+        """Increment a counter"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+        scope = getattr(self._local, 'scope', None)
+        if scope is not None:
+            scope['counters'][key] = scope['counters'].get(key, 0) + value
+
+    def observe(self, stage, seconds, count=1, **labels):
+        """Record time spent in a stage"""
+        key = (stage, _label_key(labels))
+        with self._lock:
+            total, calls = self._timers.get(key, (0.0, 0))
+            self._timers[key] = (total + seconds, calls + count)
+
+        scope = getattr(self._local, 'scope', None)
+        if scope is not None:
+            total, calls = scope['timers'].get(key, (0.0, 0))
+            scope['timers'][key] = (total + seconds, calls + count)
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """Time the body of a with block as a stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def request_scope(self):
+        """Collect the counters and stage timings of this thread, for one request"""
+        previous = getattr(self._local, 'scope', None)
+        scope = {'counters': {}, 'timers': {}}
+        self._local.scope = scope
+        try:
+            yield scope
+        finally:
+            self._local.scope = previous
+
+    def current_scope(self):
+        """The scope opened by the innermost request_scope() of this thread, or None"""
+        return getattr(self._local, 'scope', None)
+
+    def merge_scope(self, scope):
+        """Add counters and timings collected in another process (see request_scope)"""
+        for (name, label_key), value in scope['counters'].items():
+            self.inc(name, value, **dict(label_key))
+        for (stage, label_key), (seconds, calls) in scope['timers'].items():
+            self.observe(stage, seconds, count=calls, **dict(label_key))
+
+    def add_scope(self, scope):
+        """Add counters and timings collected by another thread of this process (or a
+        nested scope) to the current request scope; the registry totals already have them"""
+        current = getattr(self._local, 'scope', None)
+        if current is None:
+            return
+        for key, value in scope['counters'].items():
+            current['counters'][key] = current['counters'].get(key, 0) + value
+        for key, (seconds, calls) in scope['timers'].items():
+            total, count = current['timers'].get(key, (0.0, 0))
+            current['timers'][key] = (total + seconds, count + calls)
+
+    @staticmethod
+    def format_scope(scope):
+        """Request timings as JSON-friendly {'stage[.label]': {'seconds', 'calls'}}"""
+        timings = {}
+        for (stage, label_key), (seconds, calls) in sorted(scope['timers'].items()):
+            name = '.'.join([stage] + [str(value) for _, value in label_key])
+            timings[name] = {'seconds': round(seconds, 4), 'calls': calls}
+        return timings
+
+    def render_prometheus(self, gauges=None):
+        """Prometheus text exposition of every counter, stage timer and extra gauge"""
+        with self._lock:
+            counters = dict(self._counters)
+            timers = dict(self._timers)
+
+        lines = []
+        by_name = {}
+        for (name, label_key), value in counters.items():
+            by_name.setdefault(name, []).append((label_key, value))
+        for name in sorted(by_name):
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for label_key, value in sorted(by_name[name]):
+                lines.append(f"{metric}{_format_labels(label_key)} {value}")
+
+        if timers:
+            metric = f"{METRIC_PREFIX}_stage_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for (stage, label_key), (seconds, calls) in sorted(timers.items()):
+                labels = _format_labels((('stage', stage),) + label_key)
+                lines.append(f"{metric}_sum{labels} {seconds:.6f}")
+                lines.append(f"{metric}_count{labels} {calls}")
+
+        for name, value in sorted((gauges or {}).items()):
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+
+# Shared registry used by the converter and exported by /metrics
+metrics = Metrics()
@@ -0,0 +1,141 @@
+"""
+PDF Studio - Formatos de Saída
+Escreve as tabelas extraídas em CSV, JSON Lines ou Parquet, um arquivo por tabela dentro de um ZIP
+"""
+
+import csv
+import importlib.util
+import io
+import json
+import zipfile
+from functools import partial
+from .excel_writer import unique_sheet_name
+
+# Extension of the generated file for each output format
+OUTPUT_FORMATS = {
+    'xlsx': 'xlsx',
+    'csv': 'zip',
+    'jsonl': 'zip',
+    'parquet': 'zip',
+}
+
+MIMETYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'zip': 'application/zip',
+}
+
+
+def parquet_available():
+    """pandas writes Parquet through pyarrow or fastparquet, neither is a hard dependency"""
+    return any(importlib.util.find_spec(engine) for engine in ('pyarrow', 'fastparquet'))
+
+
+def validate_output_format(output_format):
+    """Normalized format name; ValueError with a user-facing message when unusable"""
+    output_format = (output_format or 'xlsx').lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Formato de saída inválido: {output_format}. Use: {', '.join(OUTPUT_FORMATS)}")
+    if output_format == 'parquet' and not parquet_available():
+        raise ValueError("O formato parquet requer o pacote pyarrow instalado no servidor")
+    return output_format
+
+
+def clean_cell(value):
+    # Same cleaning as the Excel backends, without the empty-cell special case
+    return str(value).strip() if value else ''
+
+
+def column_names(header_row, width):
+    """Unique, non-empty column names from the first row of a table"""
+    names = []
+    used = set()
+    for col_idx in range(width):
+        name = clean_cell(header_row[col_idx]) if col_idx < len(header_row) else ''
+        name = name or f"Coluna {col_idx + 1}"
+        original_name = name
+        counter = 2
+        while name in used:
+            name = f"{original_name}_{counter}"
+            counter += 1
+        used.add(name)
+        names.append(name)
+    return names
+
+
+def write_csv(f, rows):
+    """UTF-8 CSV, rows as extracted (the first row is the header)"""
+    text = io.TextIOWrapper(f, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    for row in rows:
+        writer.writerow([clean_cell(value) for value in row])
+    text.flush()
+    text.detach()
+
+
+def write_jsonl(f, rows):
+    """One JSON object per data row, keyed by the header row"""
+    rows = iter(rows)
+    header_row = next(rows, None)
+    if header_row is None:
+        return
+    names = column_names(header_row, len(header_row))
+    for row in rows:
+        # Rows wider than the header get "Coluna N" keys for the extra cells
+        if len(row) > len(names):
+            names = column_names(header_row, len(row))
+        record = {name: clean_cell(value) for name, value in zip(names, row)}
+        f.write(json.dumps(record, ensure_ascii=False).encode('utf-8'))
+        f.write(b'\n')
+
+
+def write_parquet(f, rows):
+    """Parquet file per table, string columns named after the header row"""
+    import pandas as pd
+
+    rows = list(rows)
+    if not rows:
+        return
+    width = max(len(row) for row in rows)
+    names = column_names(rows[0], width)
+    data = [[clean_cell(value) for value in row] + [''] * (width - len(row)) for row in rows[1:]]
+    buffer = io.BytesIO()
+    pd.DataFrame(data, columns=names, dtype='string').to_parquet(buffer, index=False)
+    f.write(buffer.getbuffer())
+
+
+class ZipTableWriter:
+    """One file per table inside a ZIP archive (path or writable binary file).
+
+    serializer(f, rows) writes one table to f, a binary file open inside the
+    archive; rows are written as they are read, so a table is never copied
+    into another in-memory structure.
+    """
+
+    def __init__(self, output, extension, serializer, compression=zipfile.ZIP_DEFLATED):
+        self.archive = zipfile.ZipFile(output, 'w', compression=compression)
+        self.extension = extension
+        self.serializer = serializer
+        self.names = set()
+        self.table_count = 0
+
+    def add_table(self, table_name, rows):
+        """Write a table as <table_name>.<extension>. Returns the member name"""
+        table_name = unique_sheet_name(table_name, self.names)
+        member_name = f"{table_name}.{self.extension}"
+        with self.archive.open(member_name, 'w') as f:
+            self.serializer(f, rows)
+        self.table_count += 1
+        return member_name
+
+    def close(self):
+        self.archive.close()
+
+
+# Writer factory for each ZIP output format, called with the output path or file
+TABLE_WRITERS = {
+    'csv': partial(ZipTableWriter, extension='csv', serializer=write_csv),
+    'jsonl': partial(ZipTableWriter, extension='jsonl', serializer=write_jsonl),
+    # Parquet pages are already compressed
+    'parquet': partial(ZipTableWriter, extension='parquet', serializer=write_parquet,
+                       compression=zipfile.ZIP_STORED),
+}
@@ -0,0 +1,272 @@
+"""
+PDF Studio - Análise de Página
+Avalia as estratégias de extração de tabelas sobre a geometria da página calculada uma única vez
+"""
+
+import logging
+import re
+from bisect import bisect_left
+from pdfminer.pdftypes import resolve1
+from pdfplumber import utils
+from pdfplumber.table import TableSettings
+from .column_detector import detect_columns
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# pdfplumber table_settings for each strategy of the extraction cascade
+TABLE_STRATEGIES = {
+    'default': None,
+    'lines_strict': {
+        "vertical_strategy": "lines_strict",
+        "horizontal_strategy": "lines_strict",
+        "snap_tolerance": 5,
+        "join_tolerance": 5,
+    },
+    'text': {
+        "vertical_strategy": "text",
+        "horizontal_strategy": "text",
+    },
+}
+# Not a pdfplumber setting: columns found from the char positions (see column_detector)
+GEOMETRIC_STRATEGY = 'geometric'
+
+
+def count_rows(tables):
+    """Total number of rows over a list of extracted tables"""
+    return sum(len(t) for t in tables if t) if tables else 0
+
+
+# Path construction operators for straight lines and rectangles
+_RULING_OPERATORS = re.compile(rb'(?<![\w.])(?:l|re)\s')
+
+
+def draws_rulings(page, min_operators=4):
+    """True when the raw content stream draws enough lines/rectangles for a ruled table
+
+    Reads the operators without interpreting the page, so it costs a fraction
+    of the layout parse. Drawings inside form XObjects are not seen.
+    """
+    count = 0
+    for stream in page.page_obj.contents:
+        count += len(_RULING_OPERATORS.findall(resolve1(stream).get_data()))
+        if count >= min_operators:
+            return True
+    return False
+
+
+class PageAnalysis:
+    """Shared view of one pdfplumber page for all the table-finding strategies.
+
+    The page objects (chars, lines, rects) are parsed once and the edge list is
+    derived once. Strategies that cannot produce a table on this geometry are
+    answered without running pdfplumber: the line strategies need both vertical
+    and horizontal edges, the text strategy and extract_text need chars. Every
+    result is memoized, so the cascade never evaluates a strategy twice.
+
+    Cell text is read through a char index sorted by vertical midpoint, shared
+    by all strategies, instead of pdfplumber's Table.extract, which scans every
+    char of the page once per row.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        with metrics.timer('page_parse'):
+            self.chars = page.chars
+            edges = page.edges
+        self.has_edges = self._has_both_orientations(edges)
+        self.has_line_edges = self._has_both_orientations(e for e in edges if e['object_type'] == 'line')
+        self._tables = {}
+        self._found = {}
+        self._edges = {}
+        self._text = None
+        self._v_mids = None
+
+    @staticmethod
+    def _has_both_orientations(edges):
+        orientations = set()
+        for edge in edges:
+            orientations.add(edge['orientation'])
+            if len(orientations) == 2:
+                return True
+        return False
+
+    def can_find_tables(self, strategy):
+        """False when the page geometry rules the strategy out"""
+        if strategy == 'default':
+            return self.has_edges
+        if strategy == 'lines_strict':
+            return self.has_line_edges
+        return bool(self.chars)
+
+    def looks_tabular(self, min_rows=3, min_columns=3):
+        """Cheap check for a table on the page, without running any strategy
+
+        True when the page has ruling lines in both orientations, when at least
+        min_columns column starts (words after a gap wider than the text height)
+        line up over min_rows lines, or when min_rows lines start like the
+        "ID + number" rows that parse_text_to_table reads.
+        """
+        if self.has_edges:
+            return True
+        if not self.chars:
+            return False
+        with metrics.timer('detect'):
+            lines = utils.cluster_objects(utils.extract_words(self.chars), 'top', 1)
+            rows_by_x = {}
+            id_rows = 0
+            for words in lines:
+                words.sort(key=lambda word: word['x0'])
+                if len(words) >= 2 and words[0]['text'].isdigit() and words[1]['text'].isdigit():
+                    id_rows += 1
+                previous = None
+                for word in words:
+                    if previous is None or word['x0'] - previous['x1'] >= word['bottom'] - word['top']:
+                        rows_by_x.setdefault(round(word['x0']), set()).add(round(word['top']))
+                    previous = word
+            if id_rows >= min_rows:
+                return True
+
+            # The aligned columns must share rows, not just each repeat somewhere
+            row_hits = {}
+            for rows in rows_by_x.values():
+                if len(rows) >= min_rows:
+                    for top in rows:
+                        row_hits[top] = row_hits.get(top, 0) + 1
+            return sum(1 for hits in row_hits.values() if hits >= min_columns) >= min_rows
+
+    def extract_tables(self, strategy):
+        """page.extract_tables() for a strategy of TABLE_STRATEGIES (or GEOMETRIC_STRATEGY), memoized"""
+        if strategy not in self._tables:
+            if strategy == GEOMETRIC_STRATEGY:
+                rows = None
+                if self.chars:
+                    with metrics.timer('strategy', strategy=strategy):
+                        rows, edges = detect_columns(self.chars)
+                self._tables[strategy] = [rows] if rows else []
+                self._edges[strategy] = [edges] if rows else []
+            elif self.can_find_tables(strategy):
+                with metrics.timer('strategy', strategy=strategy):
+                    settings = TableSettings.resolve(TABLE_STRATEGIES[strategy])
+                    text_settings = settings.text_settings or {}
+                    self._found[strategy] = self.page.find_tables(settings)
+                    self._tables[strategy] = [
+                        self._extract_table(table, dict(text_settings))
+                        for table in self._found[strategy]
+                    ]
+            else:
+                self._tables[strategy] = []
+        return self._tables[strategy]
+
+    def column_edges(self, strategy):
+        """x of the column boundaries (each column's left edge, then the table's
+        right edge) of every table extract_tables(strategy) found, in order"""
+        if strategy in self._edges:
+            return self._edges[strategy]
+        return [
+            [column.bbox[0] for column in table.columns] + [table.bbox[2]]
+            for table in self._found.get(strategy, [])
+        ]
+
+    def _build_char_index(self):
+        # Midpoints as Table.extract computes them, chars ordered by v_mid
+        v_mids = [(char["top"] + char["bottom"]) / 2 for char in self.chars]
+        self._h_mids = [(char["x0"] + char["x1"]) / 2 for char in self.chars]
+        self._by_v_mid = sorted(range(len(self.chars)), key=v_mids.__getitem__)
+        self._sorted_v_mids = [v_mids[i] for i in self._by_v_mid]
+        self._v_mids = v_mids
+
+    def _char_indexes_in_bbox(self, bbox, candidates=None):
+        """Indexes (in page order) of the chars whose midpoint lies in bbox"""
+        x0, top, x1, bottom = bbox
+        v_mids, h_mids = self._v_mids, self._h_mids
+        if candidates is None:
+            lo = bisect_left(self._sorted_v_mids, top)
+            hi = bisect_left(self._sorted_v_mids, bottom)
+            candidates = sorted(self._by_v_mid[lo:hi])
+        return [
+            i for i in candidates
+            if x0 <= h_mids[i] < x1 and top <= v_mids[i] < bottom
+        ]
+
+    def _extract_table(self, table, text_settings):
+        """Same output as pdfplumber's Table.extract, using the shared char index"""
+        if self._v_mids is None:
+            self._build_char_index()
+        chars = self.chars
+        table_arr = []
+        for row in table.rows:
+            arr = []
+            row_chars = self._char_indexes_in_bbox(row.bbox)
+            for cell in row.cells:
+                if cell is None:
+                    cell_text = None
+                else:
+                    cell_chars = self._char_indexes_in_bbox(cell, row_chars)
+                    if cell_chars:
+                        if "layout" in text_settings:
+                            text_settings["layout_width"] = cell[2] - cell[0]
+                            text_settings["layout_height"] = cell[3] - cell[1]
+                            text_settings["layout_bbox"] = cell
+                        cell_text = utils.extract_text([chars[i] for i in cell_chars], **text_settings)
+                    else:
+                        cell_text = ""
+                arr.append(cell_text)
+            table_arr.append(arr)
+        return table_arr
+
+    def extract_text(self):
+        """page.extract_text(), memoized"""
+        if self._text is None:
+            with metrics.timer('text_extract'):
+                self._text = self.page.extract_text() if self.chars else ''
+        return self._text
+
+    def choose_tables(self, geometric=False):
+        """Run the strategy cascade and return (tables, strategy name).
+
+        Same rules as always: default first; lines_strict when default found
+        fewer than 5 rows; text when the best so far has fewer than 3 rows.
+        The strategy with more rows wins. With geometric, the column detector
+        runs before text and, when it finds a table of at least 3 rows with
+        more rows than the line strategies, wins without running text.
+        """
+        # Strategy 1: Try with default settings first (most reliable)
+        page_tables = self.extract_tables('default')
+        strategy = 'default'
+        total_rows = count_rows(page_tables)
+        logger.debug("Default extraction: Found %d tables", len(page_tables))
+
+        # Strategy 2: If default finds tables but they seem incomplete, try with lines strategy
+        if page_tables:
+            logger.debug("Total rows found: %d", total_rows)
+            if total_rows < 5:
+                logger.debug("Few rows detected, trying alternative extraction...")
+                alt_tables = self.extract_tables('lines_strict')
+                if alt_tables:
+                    alt_total_rows = count_rows(alt_tables)
+                    logger.debug("Alternative extraction found %d rows", alt_total_rows)
+                    if alt_total_rows > total_rows:
+                        page_tables, strategy, total_rows = alt_tables, 'lines_strict', alt_total_rows
+                        logger.debug("Using alternative extraction (more rows)")
+
+        # Strategy 3: Columns from the char positions, much cheaper than text-based
+        if geometric and (not page_tables or total_rows < 3):
+            geometric_tables = self.extract_tables(GEOMETRIC_STRATEGY)
+            geometric_rows = count_rows(geometric_tables)
+            if geometric_rows >= 3 and geometric_rows > total_rows:
+                page_tables, strategy, total_rows = geometric_tables, GEOMETRIC_STRATEGY, geometric_rows
+                logger.debug("Using geometric column detection (%d rows)", geometric_rows)
+
+        # Strategy 4: If still no tables or very few, try text-based
+        if not page_tables or total_rows < 3:
+            logger.debug("Trying text-based extraction...")
+            text_tables = self.extract_tables('text')
+            if text_tables:
+                text_total_rows = count_rows(text_tables)
+                logger.debug("Text-based extraction found %d rows", text_total_rows)
+                if not page_tables or text_total_rows > total_rows:
+                    page_tables, strategy = text_tables, 'text'
+                    logger.debug("Using text-based extraction")
+
+        return page_tables, strategy
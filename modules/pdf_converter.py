@@ -4,363 +4,650 @@ Funcionalidades para extração de tabelas e conversão para Excel
 """
 
 import os
-import pdfplumber
-import tabula
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-import re
+import shutil
+import tempfile
+import logging
+import threading
+import time
+from itertools import chain, islice
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
 from .pdf_utils import generate_unique_filename, cleanup_file
+from .text_parser import parse_text_to_table, parse_generic_text_to_table, parse_text_pages
+from .output_writers import OUTPUT_FORMATS, TABLE_WRITERS
+from .strategy_planner import StrategyPlanner, document_fingerprint
+from .table_stitcher import stitch_tables
+from .row_dedup import dedupe_tables
+from .cell_types import iter_typed_tables
+from .engine_race import EngineCancelled, race_engines
+from .pdf_screening import screen_pdf, NO_TEXT_MESSAGE
+from .metrics import metrics
+from .excel_writer import StreamingExcelWriter, sanitize_sheet_name, unique_sheet_name, column_width
+
+# Bump whenever a change to the extraction code alters its output, so cached
+# conversions made by older code stop matching
+EXTRACTION_SETTINGS_VERSION = 1
+
+# Leading rows of each table carried by the 'table_preview' progress events
+PREVIEW_ROWS = 5
+
+# pdfplumber, pandas, openpyxl and tabula are imported where they are used, so
+# importing this module (and the web app) stays cheap; prewarm() loads them
+# ahead of the first conversion
+BACKEND_MODULES = ['pdfplumber', 'modules.page_analysis', 'openpyxl', 'pandas']
+
+logger = logging.getLogger(__name__)
+
+
+def prewarm(tabula=False):
+    """Import the extraction and export backends now instead of on the first conversion
+    
+    With tabula=True also imports tabula-py (the JVM itself starts on its first
+    call; see TabulaBackend). Returns the seconds each import took, 0 for
+    modules that were already loaded; a backend that fails to import is
+    logged and skipped.
+    """
+    import importlib
+    import sys
+    
+    seconds = {}
+    for name in BACKEND_MODULES + (['tabula'] if tabula else []):
+        already_loaded = name in sys.modules
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning("Could not prewarm %s: %s", name, e)
+            continue
+        seconds[name] = 0.0 if already_loaded else round(time.perf_counter() - start, 4)
+    logger.info("Backends prewarmed: %s", seconds)
+    return seconds
+
+
+def _page_pool_context(start_method):
+    """multiprocessing context of the page extraction workers (None: the platform default)
+    
+    'forkserver' avoids forking a process that runs other threads (a threaded
+    web server, the job workers), whose copy could inherit a lock one of them
+    held and deadlock. The fork server is a clean process, started once, that
+    imports the extraction backends before forking the workers.
+    """
+    if not start_method:
+        return None
+    import multiprocessing
+    
+    context = multiprocessing.get_context(start_method)
+    if start_method == 'forkserver':
+        context.set_forkserver_preload([__name__] + BACKEND_MODULES)
+    return context
+
+
+# How often a cancellable parallel extraction checks its cancel event (seconds)
+CANCEL_POLL_SECONDS = 0.1
+
+
+def _terminate_pool(executor):
+    """Stop a process pool without waiting for the page ranges it is running
+    
+    shutdown(wait=False) only cancels the ranges not started yet; the running
+    ones keep their CPUs until they finish, so their processes are terminated.
+    ProcessPoolExecutor has no public way to do it before Python 3.14.
+    """
+    terminate_workers = getattr(executor, 'terminate_workers', None)
+    if terminate_workers is not None:
+        terminate_workers()
+        return
+    processes = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+def _extract_page_range(converter, pdf_path, page_numbers, plan=None):
+    """Worker entry point: open a private pdfplumber handle and extract some pages
+    
+    page_numbers are 1-based. plan is None without adaptive planning, else the
+    (strategy, rows) the range's StrategyPlanner starts from (strategy None to
+    learn). Returns (tables, strategies, learned_plan, scope): strategies maps
+    each page number to its winning strategy, learned_plan is the planner's
+    plan at the end of the range, and the scope is merged into the parent's metrics.
+    """
+    import pdfplumber
+    
+    tables = []
+    strategies = {}
+    planner = StrategyPlanner(*plan) if plan else None
+    with metrics.request_scope() as scope:
+        with metrics.timer('open'):
+            pdf = pdfplumber.open(pdf_path, pages=page_numbers)
+        with pdf:
+            for page in pdf.pages:
+                page_tables, strategies[page.page_number] = converter.extract_page(page, page.page_number - 1,
+                                                                                   planner)
+                tables.extend(page_tables)
+    return tables, strategies, planner.plan() if planner else None, scope
+
 
 class PDFConverter:
-    def __init__(self, upload_folder, output_folder):
+    def __init__(self, upload_folder, output_folder, max_workers=1, parallel_min_pages=8, cache=None,
+                 excel_backend='standard', tabula_backend=None, low_memory=False, adaptive=False,
+                 strategy_store=None, output_storage=None, stitch_pages=False, typed_cells=False,
+                 engine_race=False, engine_timeout=None, start_method=None, screening=False,
+                 dedupe_rows=False, geometric_columns=False):
+        """
+        Args:
+            upload_folder: Pasta dos PDFs enviados
+            output_folder: Pasta dos arquivos Excel gerados
+            max_workers: Processos usados na extração por página (1 = serial)
+            parallel_min_pages: PDFs com menos páginas são sempre extraídos em série
+            cache: ConversionCache opcional para reaproveitar conversões
+            excel_backend: 'standard' (Workbook em memória) ou 'streaming' (write-only)
+            tabula_backend: TabulaBackend opcional que mantém a JVM do tabula aquecida
+            low_memory: Extrai uma página por vez, liberando-a em seguida, e grava cada
+                tabela assim que ela sai (sempre em série, Excel em modo streaming)
+            adaptive: Aprende a estratégia vencedora nas primeiras páginas e a tenta
+                primeiro nas demais, voltando à cascata quando o resultado piora
+            strategy_store: StrategyStore opcional (com adaptive) que guarda o plano
+                aprendido por layout de documento (produtor e tamanho da página)
+            output_storage: StorageManager opcional da pasta de saída, onde
+                convert_pdf_to_excel grava e registra os arquivos gerados
+            stitch_pages: Une as tabelas que continuam na página seguinte em uma só
+                (ver table_stitcher); no modo low_memory a tabela unida fica em
+                memória até a sua última página
+            typed_cells: Grava no Excel as colunas de números (1.234,56), percentuais
+                e datas (dd/mm/aaaa) como células numéricas e de data, e não texto
+            engine_race: Executa pdfplumber e tabula ao mesmo tempo e fica com o primeiro
+                resultado aceitável, cancelando o outro (ver engine_race); não se
+                aplica ao modo low_memory
+            engine_timeout: Segundos que cada motor tem na corrida (None = sem limite)
+            start_method: Como os processos da extração paralela são criados: 'fork',
+                'forkserver' ou 'spawn' (None = padrão da plataforma). Em servidores
+                com threads, 'forkserver' evita copiar travas de outras threads
+            screening: Faz a triagem do PDF antes da extração (ver pdf_screening):
+                recusa de imediato arquivos ilegíveis, protegidos por senha ou sem
+                nenhum texto (digitalizados) e pula as páginas sem texto
+            dedupe_rows: Remove as linhas repetidas entre as tabelas do documento e os
+                cabeçalhos repetidos no meio dos dados (ver row_dedup)
+            geometric_columns: Nas páginas sem linhas de tabela, tenta antes da estratégia
+                'text' do pdfplumber as colunas encontradas pelas posições dos
+                caracteres (ver column_detector), bem mais rápidas
+        """
         self.upload_folder = upload_folder
         self.output_folder = output_folder
+        self.max_workers = max(1, int(max_workers or 1))
+        self.parallel_min_pages = parallel_min_pages
+        self.cache = cache
+        self.excel_backend = excel_backend
+        self.tabula_backend = tabula_backend
+        self.low_memory = low_memory
+        self.adaptive = adaptive
+        self.strategy_store = strategy_store
+        self.output_storage = output_storage
+        self.stitch_pages = stitch_pages
+        self.typed_cells = typed_cells
+        self.engine_race = engine_race
+        self.engine_timeout = engine_timeout
+        self.start_method = start_method
+        self.screening = screening
+        self.dedupe_rows = dedupe_rows
+        self.geometric_columns = geometric_columns
+    
+    def __getstate__(self):
+        # Worker processes only extract pages; the cache, tabula backend and stores stay here
+        state = self.__dict__.copy()
+        state['output_storage'] = None
+        state['cache'] = None
+        state['tabula_backend'] = None
+        state['strategy_store'] = None
+        return state
+    
+    def cache_settings(self):
+        """Settings that change the extraction output and so belong in the cache key"""
+        settings = {'version': EXTRACTION_SETTINGS_VERSION}
+        if self.adaptive:
+            settings['adaptive'] = True
+        if self.stitch_pages:
+            settings['stitch'] = True
+        if self.typed_cells:
+            settings['typed_cells'] = True
+        if self.engine_race and not self.low_memory:
+            settings['engine_race'] = True
+        if self.screening:
+            settings['screening'] = True
+        if self.dedupe_rows:
+            settings['dedupe_rows'] = True
+        if self.geometric_columns:
+            settings['geometric_columns'] = True
+        return settings
+    
+    def screen_pages(self, pdf_source, pages=None):
+        """Pages worth extracting according to screen_pdf, and an error message when none is
+        
+        Pages without a single text character (scans, blank pages, bare ruling
+        grids) are dropped: every strategy would at best find empty cells there.
+        Returns (pages, error); pages stays None when every page has text.
+        """
+        verdict = screen_pdf(pdf_source)
+        if not verdict['ok']:
+            return pages, verdict['error']
+        if not verdict['empty_pages']:
+            return pages, None
+        empty = set(verdict['empty_pages'])
+        wanted = pages or range(1, verdict['pages'] + 1)
+        selected = [page for page in wanted if page not in empty]
+        if not selected:
+            return pages, NO_TEXT_MESSAGE
+        skipped = len(wanted) - len(selected)
+        if skipped:
+            logger.info("Screening skipped %d pages without text", skipped)
+            metrics.inc('pages_screened_out', skipped)
+        return selected, None
+    
+    def _start_planner(self, pdf):
+        """(StrategyPlanner, layout fingerprint) for an open PDF; (None, None) unless adaptive"""
+        if not self.adaptive:
+            return None, None
+        fingerprint = document_fingerprint(pdf) if self.strategy_store else None
+        stored = self.strategy_store.get(fingerprint) if fingerprint else None
+        if stored:
+            logger.debug("Stored strategy plan for layout %s: %s", fingerprint, stored[0])
+        return StrategyPlanner(*stored) if stored else StrategyPlanner(), fingerprint
+    
+    def _save_plan(self, fingerprint, plan, from_store):
+        """Remember the plan learned for a layout, or drop a stored one that stopped working"""
+        if fingerprint is None:
+            return
+        try:
+            if plan:
+                self.strategy_store.put(fingerprint, *plan)
+            elif from_store:
+                self.strategy_store.forget(fingerprint)
+        except OSError as e:
+            logger.warning("Could not save the strategy plan: %s", e)
     
     def parse_text_to_table(self, text):
-        """Parse text content to extract structured data as table"""
-        lines = text.strip().split('\n')
-        table_data = []
+        """Parse text content to extract structured data as table (see text_parser)"""
+        return parse_text_to_table(text)
+    
+    def parse_generic_text_to_table(self, text):
+        """Generic text parsing for any structured data (see text_parser)"""
+        return parse_generic_text_to_table(text)
+    
+    def extract_page_tables(self, page, page_num):
+        """Extract the tables of a single pdfplumber page (page_num is 0-based)"""
+        return self.extract_page(page, page_num)[0]
+    
+    def extract_page(self, page, page_num, planner=None):
+        """extract_page_tables plus the strategy that produced the tables (None if none did)
         
-        # Try to detect patterns like the example shown
-        # Pattern: ID + Description + Unit + Value + Date
-        # Followed by: Company + Unit + Value + Value + Percentages
+        With a StrategyPlanner holding a plan, the planned strategy runs alone and
+        the cascade only when its result falls short of the planner's quality bar.
+        """
+        from .page_analysis import PageAnalysis, count_rows
         
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            # Skip empty lines
-            if not line:
-                i += 1
-                continue
-                
-            # Check if this line starts with a pattern like "10 13866" (ID + number)
-            if re.match(r'^\d+\s+\d+', line):
-                # This looks like a main item line
-                parts = line.split()
-                
-                if len(parts) >= 5:
-                    # Extract ID, description, unit, value, date
-                    item_id = f"{parts[0]} {parts[1]}"
-                    
-                    # Find description (everything between ID and the last 3 parts)
-                    desc_parts = parts[2:-3]
-                    description = ' '.join(desc_parts)
-                    
-                    # Last 3 parts should be unit, value, date
-                    unit = parts[-3]
-                    value = parts[-2]
-                    date = parts[-1]
-                    
-                    # Look for the next line (company info)
-                    company_info = ""
-                    if i + 1 < len(lines):
-                        next_line = lines[i + 1].strip()
-                        if next_line and not re.match(r'^\d+\s+\d+', next_line):
-                            company_info = next_line
-                            i += 1  # Skip the next line as we processed it
-                    
-                    # Create table row
-                    if company_info:
-                        # Split company info into parts
-                        company_parts = company_info.split()
-                        if len(company_parts) >= 5:
-                            company_name = ' '.join(company_parts[:-4])  # Everything except last 4 parts
-                            company_unit = company_parts[-4]
-                            company_value1 = company_parts[-3]
-                            company_value2 = company_parts[-2]
-                            percentages = company_parts[-1]
-                            
-                            table_data.append([
-                                item_id,
-                                description,
-                                unit,
-                                value,
-                                date,
-                                company_name,
-                                company_unit,
-                                company_value1,
-                                company_value2,
-                                percentages
-                            ])
-                        else:
-                            # Fallback: just add company info as one field
-                            table_data.append([
-                                item_id,
-                                description,
-                                unit,
-                                value,
-                                date,
-                                company_info,
-                                "", "", "", ""
-                            ])
-                    else:
-                        # No company info, just main item
-                        table_data.append([
-                            item_id,
-                            description,
-                            unit,
-                            value,
-                            date,
-                            "", "", "", "", ""
-                        ])
-            else:
-                # If line doesn't match pattern, try to extract as generic data
-                # Split by multiple spaces or tabs
-                parts = re.split(r'\s{2,}|\t', line)
-                if len(parts) >= 3:  # At least 3 columns
-                    cleaned_parts = [p.strip() for p in parts if p.strip()]
-                    if len(cleaned_parts) >= 3:
-                        table_data.append(cleaned_parts)
-            
-            i += 1
-        
-        # If we found data with specific pattern, add headers
-        if table_data:
-            # Check if we used the specific pattern (10 columns) or generic
-            if len(table_data) > 0 and len(table_data[0]) == 10:
-                headers = [
-                    "ID",
-                    "Descrição",
-                    "Unidade",
-                    "Valor",
-                    "Data",
-                    "Empresa",
-                    "Unidade Empresa",
-                    "Valor 1",
-                    "Valor 2",
-                    "Percentagens"
-                ]
-                return [headers] + table_data
-            else:
-                # Generic data - use generic headers
-                max_cols = max(len(row) for row in table_data) if table_data else 0
-                if max_cols > 0:
-                    headers = [f"Coluna {i+1}" for i in range(max_cols)]
-                    # Pad rows
-                    padded_data = []
-                    for row in table_data:
-                        padded_row = row + [""] * (max_cols - len(row))
-                        padded_data.append(padded_row)
-                    return [headers] + padded_data
+        logger.debug("=== Processing Page %d ===", page_num + 1)
         
-        # If no structured data found, try a more generic approach
-        return self.parse_generic_text_to_table(text)
-    
-    def parse_generic_text_to_table(self, text):
-        """Generic text parsing for any structured data"""
-        lines = text.strip().split('\n')
-        table_data = []
-        
-        # Look for any lines that contain multiple data points separated by spaces
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Split by multiple spaces to find data columns
-            parts = re.split(r'\s{2,}', line)  # Split by 2 or more spaces
-            
-            if len(parts) >= 2:  # At least 2 columns of data (reduced from 3)
-                # Clean up each part
-                cleaned_parts = [part.strip() for part in parts if part.strip()]
-                if len(cleaned_parts) >= 2:  # At least 2 columns
-                    table_data.append(cleaned_parts)
-            else:
-                # Try splitting by single spaces if multiple spaces didn't work
-                parts = line.split()
-                if len(parts) >= 3:  # At least 3 words/columns
-                    table_data.append(parts)
+        # Evaluate the strategies against the page geometry, parsed once; a
+        # fallback to the cascade reuses the planned strategy's memoized result
+        analysis = PageAnalysis(page)
+        plan = planner.strategy if planner else None
+        planned = False
+        if plan == 'text_parse':
+            # No table strategy runs, the text fallback alone is the plan
+            tables, strategy = self._build_page_tables(analysis, page_num, [], None)
+            planned = strategy == 'text_parse' and planner.accepts(count_rows([t['data'] for t in tables]))
+        elif plan:
+            page_tables = analysis.extract_tables(plan)
+            if planner.accepts(count_rows(page_tables)):
+                tables, strategy = self._build_page_tables(analysis, page_num, page_tables, plan)
+                planned = True
+        if not planned:
+            page_tables, strategy = analysis.choose_tables(self.geometric_columns)
+            tables, strategy = self._build_page_tables(analysis, page_num, page_tables, strategy)
         
-        # If we found data, create headers
-        if table_data:
-            max_cols = max(len(row) for row in table_data) if table_data else 0
-            if max_cols > 0:
-                headers = [f"Coluna {i+1}" for i in range(max_cols)]
-                
-                # Pad rows to have same number of columns
-                padded_data = []
-                for row in table_data:
-                    padded_row = row + [""] * (max_cols - len(row))
-                    padded_data.append(padded_row)
-                
-                return [headers] + padded_data
+        if self.stitch_pages and tables and strategy != 'text_parse':
+            # Column boundaries for the cross-page stitcher; merged tables take the first part's
+            edges = analysis.column_edges(strategy)
+            for table_info in tables:
+                if table_info['table'] <= len(edges):
+                    table_info['columns'] = edges[table_info['table'] - 1]
         
-        return None
+        metrics.inc('pages_processed')
+        if tables:
+            metrics.inc('strategy_wins', strategy=strategy)
+        if planner:
+            planner.record(strategy if tables else None, count_rows([t['data'] for t in tables]), planned)
+        logger.debug("Page %d complete: %d table(s) added", page_num + 1, len(tables))
+        
+        return tables, strategy if tables else None
     
-    def extract_tables_pdfplumber(self, pdf_path):
-        """Extract tables using pdfplumber - primary method"""
+    def _build_page_tables(self, analysis, page_num, page_tables, strategy):
+        """Clean (and maybe merge) the tables a strategy found, with the text parse as fallback
+        
+        Returns (tables, strategy), strategy becoming 'text_parse' when the
+        parsed text is used.
+        """
         tables = []
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page_num, page in enumerate(pdf.pages):
-                    print(f"\n=== Processing Page {page_num + 1} ===")
-                    
-                    # Strategy 1: Try with default settings first (most reliable)
-                    page_tables = page.extract_tables()
-                    print(f"Default extraction: Found {len(page_tables) if page_tables else 0} tables")
+        structured_tables_found = False
+        
+        if page_tables:
+            logger.debug("Processing %d table(s)...", len(page_tables))
+            
+            # If multiple small tables, try to merge them (might be one table split)
+            if len(page_tables) > 1:
+                total_rows_all = sum(len(t) for t in page_tables if t)
+                logger.debug("Multiple tables detected (%d), total rows: %d", len(page_tables), total_rows_all)
+                
+                # Check if tables have similar column structure (likely parts of same table)
+                if total_rows_all > 0:
+                    first_table_cols = len(page_tables[0][0]) if page_tables[0] and page_tables[0][0] else 0
+                    similar_cols = all(
+                        len(t[0]) == first_table_cols 
+                        for t in page_tables 
+                        if t and t[0] and len(t[0]) > 0
+                    ) if first_table_cols > 0 else False
                     
-                    # Strategy 2: If default finds tables but they seem incomplete, try with lines strategy
-                    if page_tables:
-                        total_rows = sum(len(t) for t in page_tables if t)
-                        print(f"Total rows found: {total_rows}")
+                    if similar_cols and first_table_cols >= 5:  # Likely same table split
+                        logger.debug("Tables appear to have same structure, merging...")
+                        merged_table = []
+                        max_cols = 0
                         
-                        # If very few rows, try alternative strategies
-                        if total_rows < 5:
-                            print("Few rows detected, trying alternative extraction...")
-                            # Try with explicit line detection
-                            alt_tables = page.extract_tables(table_settings={
-                                "vertical_strategy": "lines_strict",
-                                "horizontal_strategy": "lines_strict",
-                                "snap_tolerance": 5,
-                                "join_tolerance": 5,
-                            })
-                            if alt_tables:
-                                alt_total_rows = sum(len(t) for t in alt_tables if t)
-                                print(f"Alternative extraction found {alt_total_rows} rows")
-                                if alt_total_rows > total_rows:
-                                    page_tables = alt_tables
-                                    print("Using alternative extraction (more rows)")
-                    
-                    # Strategy 3: If still no tables or very few, try text-based
-                    if not page_tables or (page_tables and sum(len(t) for t in page_tables if t) < 3):
-                        print("Trying text-based extraction...")
-                        text_tables = page.extract_tables(table_settings={
-                            "vertical_strategy": "text",
-                            "horizontal_strategy": "text",
-                        })
-                        if text_tables:
-                            text_total_rows = sum(len(t) for t in text_tables if t)
-                            print(f"Text-based extraction found {text_total_rows} rows")
-                            if not page_tables or text_total_rows > sum(len(t) for t in page_tables if t):
-                                page_tables = text_tables
-                                print("Using text-based extraction")
-                    
-                    structured_tables_found = False
-                    
-                    if page_tables:
-                        print(f"Processing {len(page_tables)} table(s)...")
+                        for table in page_tables:
+                            if table:
+                                for row in table:
+                                    if row:
+                                        cleaned_row = [str(cell).strip() if cell else '' for cell in row]
+                                        # ALWAYS add row - don't filter!
+                                        merged_table.append(cleaned_row)
+                                        max_cols = max(max_cols, len(cleaned_row))
                         
-                        # If multiple small tables, try to merge them (might be one table split)
-                        if len(page_tables) > 1:
-                            total_rows_all = sum(len(t) for t in page_tables if t)
-                            print(f"Multiple tables detected ({len(page_tables)}), total rows: {total_rows_all}")
+                        if merged_table:
+                            # Normalize columns
+                            for i, row in enumerate(merged_table):
+                                while len(row) < max_cols:
+                                    row.append('')
+                                merged_table[i] = row
                             
-                            # Check if tables have similar column structure (likely parts of same table)
-                            if total_rows_all > 0:
-                                first_table_cols = len(page_tables[0][0]) if page_tables[0] and page_tables[0][0] else 0
-                                similar_cols = all(
-                                    len(t[0]) == first_table_cols 
-                                    for t in page_tables 
-                                    if t and t[0] and len(t[0]) > 0
-                                ) if first_table_cols > 0 else False
+                            logger.debug("Merged table: %d rows, %d columns", len(merged_table), max_cols)
+                            structured_tables_found = True
+                            tables.append({
+                                'page': page_num + 1,
+                                'table': 1,
+                                'data': merged_table
+                            })
+            
+            # If not merged, process tables individually
+            if not structured_tables_found:
+                for table_num, table in enumerate(page_tables):
+                    if table and len(table) > 0:
+                        # Clean the table data
+                        cleaned_table = []
+                        max_cols = 0
+                        
+                        for row_idx, row in enumerate(table):
+                            if row:  # Row exists
+                                # Clean all cells
+                                cleaned_row = []
+                                for cell in row:
+                                    if cell:
+                                        cleaned_cell = str(cell).strip()
+                                        cleaned_row.append(cleaned_cell)
+                                    else:
+                                        cleaned_row.append('')
                                 
-                                if similar_cols and first_table_cols >= 5:  # Likely same table split
-                                    print("Tables appear to have same structure, merging...")
-                                    merged_table = []
-                                    max_cols = 0
-                                    
-                                    for table in page_tables:
-                                        if table:
-                                            for row in table:
-                                                if row:
-                                                    cleaned_row = [str(cell).strip() if cell else '' for cell in row]
-                                                    # ALWAYS add row - don't filter!
-                                                    merged_table.append(cleaned_row)
-                                                    max_cols = max(max_cols, len(cleaned_row))
-                                    
-                                    if merged_table:
-                                        # Normalize columns
-                                        for i, row in enumerate(merged_table):
-                                            while len(row) < max_cols:
-                                                row.append('')
-                                            merged_table[i] = row
-                                        
-                                        print(f"Merged table: {len(merged_table)} rows, {max_cols} columns")
-                                        structured_tables_found = True
-                                        tables.append({
-                                            'page': page_num + 1,
-                                            'table': 1,
-                                            'data': merged_table
-                                        })
+                                # ALWAYS add row - don't filter!
+                                cleaned_table.append(cleaned_row)
+                                max_cols = max(max_cols, len(cleaned_row))
                         
-                        # If not merged, process tables individually
-                        if not structured_tables_found:
-                            for table_num, table in enumerate(page_tables):
-                                if table and len(table) > 0:
-                                    # Clean the table data
-                                    cleaned_table = []
-                                    max_cols = 0
-                                    
-                                    for row_idx, row in enumerate(table):
-                                        if row:  # Row exists
-                                            # Clean all cells
-                                            cleaned_row = []
-                                            for cell in row:
-                                                if cell:
-                                                    cleaned_cell = str(cell).strip()
-                                                    cleaned_row.append(cleaned_cell)
-                                                else:
-                                                    cleaned_row.append('')
-                                            
-                                            # ALWAYS add row - don't filter!
-                                            cleaned_table.append(cleaned_row)
-                                            max_cols = max(max_cols, len(cleaned_row))
-                                    
-                                    # Normalize all rows to have the same number of columns
-                                    if cleaned_table:
-                                        for i, row in enumerate(cleaned_table):
-                                            while len(row) < max_cols:
-                                                row.append('')
-                                            cleaned_table[i] = row
-                                        
-                                        structured_tables_found = True
-                                        print(f"  Table {table_num + 1}: {len(cleaned_table)} rows, {max_cols} columns")
-                                        if len(cleaned_table) > 0:
-                                            print(f"    First row: {cleaned_table[0][:5]}...")  # Show first 5 columns
-                                            if len(cleaned_table) > 1:
-                                                print(f"    Last row: {cleaned_table[-1][:5]}...")
-                                        
-                                        tables.append({
-                                            'page': page_num + 1,
-                                            'table': table_num + 1,
-                                            'data': cleaned_table
-                                        })
-                    
-                    # If no structured tables found or too few rows, try text extraction as fallback
-                    if not structured_tables_found or (structured_tables_found and len(tables) > 0 and len(tables[-1]['data']) < 3):
-                        print("Trying full text extraction as fallback...")
-                        text = page.extract_text()
-                        if text:
-                            print(f"Extracted text length: {len(text)} characters")
-                            parsed_data = self.parse_text_to_table(text)
-                            if parsed_data and len(parsed_data) > 1:
-                                print(f"Text parsing found {len(parsed_data)} rows")
-                                # Only add if we don't have tables or if text parsing found more rows
-                                if not structured_tables_found or (parsed_data and len(parsed_data) > len(tables[-1]['data']) if tables else False):
-                                    print("Using text-parsed data")
-                                    tables.append({
-                                        'page': page_num + 1,
-                                        'table': len(page_tables) + 1 if page_tables else 1,
-                                        'data': parsed_data
-                                    })
-                    
-                    print(f"Page {page_num + 1} complete: {len([t for t in tables if t['page'] == page_num + 1])} table(s) added")
-                    
+                        # Normalize all rows to have the same number of columns
+                        if cleaned_table:
+                            for i, row in enumerate(cleaned_table):
+                                while len(row) < max_cols:
+                                    row.append('')
+                                cleaned_table[i] = row
+                            
+                            structured_tables_found = True
+                            logger.debug("  Table %d: %d rows, %d columns", table_num + 1, len(cleaned_table), max_cols)
+                            logger.debug("    First row: %s...", cleaned_table[0][:5])  # Show first 5 columns
+                            if len(cleaned_table) > 1:
+                                logger.debug("    Last row: %s...", cleaned_table[-1][:5])
+                            
+                            tables.append({
+                                'page': page_num + 1,
+                                'table': table_num + 1,
+                                'data': cleaned_table
+                            })
+        
+        # If no structured tables found or too few rows, try text extraction as fallback
+        if not structured_tables_found or (structured_tables_found and len(tables) > 0 and len(tables[-1]['data']) < 3):
+            logger.debug("Trying full text extraction as fallback...")
+            text = analysis.extract_text()
+            if text:
+                logger.debug("Extracted text length: %d characters", len(text))
+                with metrics.timer('text_parse'):
+                    parsed_data = self.parse_text_to_table(text)
+                if parsed_data and len(parsed_data) > 1:
+                    logger.debug("Text parsing found %d rows", len(parsed_data))
+                    # Only add if we don't have tables or if text parsing found more rows
+                    if not structured_tables_found or (parsed_data and len(parsed_data) > len(tables[-1]['data']) if tables else False):
+                        logger.debug("Using text-parsed data")
+                        strategy = 'text_parse'
+                        tables.append({
+                            'page': page_num + 1,
+                            'table': len(page_tables) + 1 if page_tables else 1,
+                            'data': parsed_data
+                        })
+        
+        return tables, strategy
+    
+    def extract_tables_pdfplumber(self, pdf_path, progress_callback=None, pages=None, cancel=None):
+        """Extract tables using pdfplumber - primary method
+        
+        pdf_path may also be an open binary file object. pages is an optional
+        list of 1-based page numbers; the other pages are never parsed.
+        progress_callback, if given, receives one dict per event, in order:
+        
+            {'event': 'page_started', 'page', 'pages_done', 'pages_total'}
+            {'event': 'table_preview', 'page', 'table', 'rows', 'preview'}  (per table)
+            {'event': 'page_finished', 'page', 'pages_done', 'pages_total',
+             'strategy', 'tables', 'rows'}
+        
+        preview holds the first PREVIEW_ROWS rows. Parallel extraction reports
+        whole page ranges as they finish, without the page_started events.
+        cancel is an optional threading.Event checked between pages (between
+        page ranges when parallel); once set, extraction stops and returns None.
+        """
+        import pdfplumber
+        
+        try:
+            with metrics.timer('open'):
+                pdf = pdfplumber.open(pdf_path, pages=pages)
+            with pdf:
+                page_numbers = [page.page_number for page in pdf.pages]
+                page_count = len(page_numbers)
+                # Worker processes reopen the file, so in-memory streams stay serial
+                if (self.max_workers <= 1 or page_count < self.parallel_min_pages
+                        or not isinstance(pdf_path, (str, os.PathLike))):
+                    planner, fingerprint = self._start_planner(pdf)
+                    tables = []
+                    for pages_done, page in enumerate(pdf.pages, 1):
+                        if cancel is not None and cancel.is_set():
+                            raise EngineCancelled()
+                        tables.extend(self._extract_reported_page(page, pages_done, page_count, progress_callback,
+                                                                  planner))
+                    if planner:
+                        self._save_plan(fingerprint, planner.plan(), planner.from_store)
+                    return tables
+                planner, fingerprint = self._start_planner(pdf)
+            return self._extract_tables_parallel(pdf_path, page_numbers, progress_callback, planner, fingerprint,
+                                                 cancel)
         except Exception as e:
-            print(f"Error with pdfplumber: {e}")
-            import traceback
-            traceback.print_exc()
+            if cancel is not None and cancel.is_set():
+                logger.debug("pdfplumber stopped: %s", type(e).__name__)
+                return None
+            logger.exception("Error with pdfplumber: %s", e)
             return None
+    
+    def iter_tables_pdfplumber(self, pdf_path, progress_callback=None, pages=None):
+        """Generator version of extract_tables_pdfplumber for low-memory mode
+        
+        Pages are extracted one at a time, always serially, and every page is
+        closed right after, dropping the characters, layout and text map
+        pdfplumber cached while parsing it. Tables are yielded as soon as their
+        page is done, so only the current page is ever held in memory. Errors
+        are raised, not logged.
+        """
+        import pdfplumber
+        
+        with metrics.timer('open'):
+            pdf = pdfplumber.open(pdf_path, pages=pages)
+        with pdf:
+            page_count = len(pdf.pages)
+            planner, fingerprint = self._start_planner(pdf)
+            for pages_done, page in enumerate(pdf.pages, 1):
+                try:
+                    page_tables = self._extract_reported_page(page, pages_done, page_count, progress_callback,
+                                                              planner)
+                finally:
+                    page.close()
+                yield from page_tables
+            if planner:
+                self._save_plan(fingerprint, planner.plan(), planner.from_store)
+    
+    def _extract_reported_page(self, page, pages_done, pages_total, progress_callback, planner=None):
+        """extract_page_tables wrapped in the page events (see extract_tables_pdfplumber)"""
+        if progress_callback:
+            progress_callback({
+                'event': 'page_started',
+                'page': page.page_number,
+                'pages_done': pages_done - 1,
+                'pages_total': pages_total
+            })
+        page_tables, strategy = self.extract_page(page, page.page_number - 1, planner)
+        if progress_callback:
+            self._report_page(progress_callback, page.page_number, pages_done, pages_total, page_tables, strategy)
+        return page_tables
+    
+    @staticmethod
+    def _report_previews(progress_callback, tables):
+        for table_info in tables:
+            progress_callback({
+                'event': 'table_preview',
+                'page': table_info['page'],
+                'table': table_info['table'],
+                'rows': len(table_info['data']),
+                'preview': table_info['data'][:PREVIEW_ROWS]
+            })
+    
+    def _report_page(self, progress_callback, page_number, pages_done, pages_total, page_tables, strategy):
+        """Send the table previews and the page_finished event of a finished page"""
+        self._report_previews(progress_callback, page_tables)
+        progress_callback({
+            'event': 'page_finished',
+            'page': page_number,
+            'pages_done': pages_done,
+            'pages_total': pages_total,
+            'strategy': strategy,
+            'tables': len(page_tables),
+            'rows': sum(len(table_info['data']) for table_info in page_tables)
+        })
+    
+    def _extract_tables_parallel(self, pdf_path, page_numbers, progress_callback=None, planner=None,
+                                 fingerprint=None, cancel=None):
+        """Split the pages in contiguous ranges and extract them in worker processes
+        
+        With a planner, every range starts from its plan (or learns its own), and
+        the layout's plan is saved when the ranges that locked one agree.
+        """
+        page_count = len(page_numbers)
+        workers = min(self.max_workers, page_count)
+        # A few ranges per worker keeps the pool busy when page costs are uneven
+        chunk_count = min(page_count, workers * 4)
+        bounds = [page_count * i // chunk_count for i in range(chunk_count + 1)]
+        ranges = [page_numbers[bounds[i]:bounds[i + 1]] for i in range(chunk_count)]
+        logger.debug("Extracting %d pages with %d workers (%d ranges)", page_count, workers, chunk_count)
+        
+        results = [None] * chunk_count
+        learned_plans = []
+        initial_plan = (planner.strategy, planner.reference_rows) if planner else None
+        pages_done = 0
+        # Not a with block: its exit waits for the running ranges, which a
+        # cancelled extraction (the losing engine of a race) must not do
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=_page_pool_context(self.start_method))
+        try:
+            futures = {
+                executor.submit(_extract_page_range, self, pdf_path, page_range, initial_plan): idx
+                for idx, page_range in enumerate(ranges)
+            }
+            for future in self._completed(futures, cancel):
+                idx = futures[future]
+                results[idx], strategies, learned_plan, scope = future.result()
+                metrics.merge_scope(scope)
+                if learned_plan:
+                    learned_plans.append(learned_plan)
+                if not progress_callback:
+                    continue
+                tables_by_page = {}
+                for table_info in results[idx]:
+                    tables_by_page.setdefault(table_info['page'], []).append(table_info)
+                for page_number in ranges[idx]:
+                    pages_done += 1
+                    self._report_page(progress_callback, page_number, pages_done, page_count,
+                                      tables_by_page.get(page_number, []), strategies[page_number])
+        except EngineCancelled:
+            _terminate_pool(executor)
+            raise
+        finally:
+            # Returns at once after _terminate_pool; otherwise waits as the with block would
+            executor.shutdown(wait=True)
+        
+        if planner:
+            plan = None
+            if learned_plans and len({strategy for strategy, _ in learned_plans}) == 1:
+                plan = (learned_plans[0][0], sum(rows for _, rows in learned_plans) / len(learned_plans))
+            self._save_plan(fingerprint, plan, planner.from_store)
+        
+        # Merge the ranges back in page order
+        tables = []
+        for range_tables in results:
+            tables.extend(range_tables)
         return tables
     
-    def extract_tables_tabula(self, pdf_path):
-        """Extract tables using tabula-py - fallback method"""
+    @staticmethod
+    def _completed(futures, cancel=None):
+        """as_completed, raising EngineCancelled once cancel is set; checked every
+        CANCEL_POLL_SECONDS, so a cancel is seen during a long page range"""
+        if cancel is None:
+            yield from as_completed(futures)
+            return
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            if cancel.is_set():
+                raise EngineCancelled()
+            yield from done
+    
+    def extract_tables_tabula(self, pdf_path, pages=None, text_fallback=True, cancel=None):
+        """Extract tables using tabula-py - fallback method
+        
+        pages is an optional list of 1-based page numbers (default: all pages).
+        When tabula fails, the page text is parsed instead, unless text_fallback
+        is False (the engine race, where pdfplumber already parses it). cancel
+        stops a call to the warm backend (see TabulaBackend.read_pdf).
+        """
+        import pdfplumber
+        
         tables = []
         try:
-            # Try to extract all tables from all pages
-            dfs = tabula.read_pdf(pdf_path, pages='all', multiple_tables=True)
+            import pandas as pd
+            
+            # Try to extract all tables from the selected pages
+            with metrics.timer('tabula'):
+                if self.tabula_backend:
+                    dfs = self._read_pdf_warm(pdf_path, pages, cancel)
+                else:
+                    import tabula
+                    dfs = tabula.read_pdf(pdf_path, pages=pages or 'all', multiple_tables=True)
             
             for page_num, df in enumerate(dfs):
                 if not df.empty:
@@ -378,77 +665,103 @@ class PDFConverter:
                         'table': 1,
                         'data': cleaned_table
                     })
+        except EngineCancelled:
+            return None
         except Exception as e:
-            print(f"Error with tabula: {e}")
+            logger.warning("Error with tabula: %s", e)
+            if not text_fallback:
+                return None
             # If tabula fails due to Java issues, try text extraction as fallback
             try:
-                with pdfplumber.open(pdf_path) as pdf:
-                    for page_num, page in enumerate(pdf.pages):
-                        text = page.extract_text()
-                        if text:
-                            parsed_data = self.parse_text_to_table(text)
-                            if parsed_data:
-                                tables.append({
-                                    'page': page_num + 1,
-                                    'table': 1,
-                                    'data': parsed_data
-                                })
+                if hasattr(pdf_path, 'seek'):
+                    pdf_path.seek(0)
+                with pdfplumber.open(pdf_path, pages=pages) as pdf:
+                    page_numbers = [page.page_number for page in pdf.pages]
+                    texts = [page.extract_text() for page in pdf.pages]
+                with metrics.timer('text_parse'):
+                    parsed_pages = parse_text_pages(texts)
+                for page_number, parsed_data in zip(page_numbers, parsed_pages):
+                    if parsed_data:
+                        tables.append({
+                            'page': page_number,
+                            'table': 1,
+                            'data': parsed_data
+                        })
             except Exception as e2:
-                print(f"Error with text extraction fallback: {e2}")
+                logger.error("Error with text extraction fallback: %s", e2)
                 return None
         return tables
     
+    def _read_pdf_warm(self, pdf_path, pages, cancel=None):
+        """tabula.read_pdf through the warm backend, which needs a path on disk"""
+        if not hasattr(pdf_path, 'read'):
+            return self.tabula_backend.read_pdf(pdf_path, pages, cancel=cancel, multiple_tables=True)
+        
+        tmp = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+        try:
+            with tmp:
+                pdf_path.seek(0)
+                shutil.copyfileobj(pdf_path, tmp)
+            return self.tabula_backend.read_pdf(tmp.name, pages, cancel=cancel, multiple_tables=True)
+        finally:
+            cleanup_file(tmp.name)
+    
+    def sheet_name_for(self, table_info, table_count):
+        """Sheet name for a table, before sanitizing and de-duplication"""
+        if table_info.get('last_page'):
+            pages = f"Pages_{table_info['page']}-{table_info['last_page']}"
+            return pages if table_count == 1 else f"{pages}_Table_{table_info['table']}"
+        if table_count == 1:
+            return f"Page_{table_info['page']}"
+        return f"Page_{table_info['page']}_Table_{table_info['table']}"
+    
     def create_excel_file(self, tables, output_path):
         """Create Excel file with proper formatting"""
+        if self.excel_backend == 'streaming' or self.low_memory:
+            return self.create_excel_file_streaming(tables, output_path)
+        
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, PatternFill, Alignment
+        
         wb = Workbook()
         
         # Remove default sheet
         wb.remove(wb.active)
+        sheet_names = set()
         
-        for table_info in tables:
+        typed_tables = iter_typed_tables(tables) if self.typed_cells else ((table_info, {}) for table_info in tables)
+        for table_info, number_formats in typed_tables:
             table_data = table_info['data']
             page_num = table_info['page']
             table_num = table_info['table']
             
             if not table_data or len(table_data) == 0:
-                print(f"Skipping empty table on page {page_num}, table {table_num}")
+                logger.debug("Skipping empty table on page %s, table %s", page_num, table_num)
                 continue
             
-            # Create sheet name
-            if len(tables) == 1:
-                sheet_name = f"Page_{page_num}"
-            else:
-                sheet_name = f"Page_{page_num}_Table_{table_num}"
-            
-            # Ensure sheet name is valid (max 31 chars, no invalid chars)
-            sheet_name = sheet_name[:31]
-            sheet_name = sheet_name.replace('/', '_').replace('\\', '_').replace('?', '_').replace('*', '_').replace('[', '_').replace(']', '_').replace(':', '_')
-            
-            # If sheet name already exists, append number
-            original_name = sheet_name
-            counter = 1
-            while sheet_name in [ws.title for ws in wb.worksheets]:
-                sheet_name = f"{original_name}_{counter}"[:31]
-                counter += 1
+            # Ensure sheet name is valid (max 31 chars, no invalid chars) and unique
+            sheet_name = sanitize_sheet_name(self.sheet_name_for(table_info, len(tables)))
+            sheet_name = unique_sheet_name(sheet_name, sheet_names)
             
             ws = wb.create_sheet(title=sheet_name)
             
-            print(f"Creating sheet '{sheet_name}' with {len(table_data)} rows")
+            logger.debug("Creating sheet '%s' with %d rows", sheet_name, len(table_data))
             
             # Add data to worksheet
             for row_idx, row in enumerate(table_data, 1):
                 for col_idx, cell_value in enumerate(row, 1):
-                    # Handle None values
-                    if cell_value is None:
-                        cell_value = ''
-                    
-                    # Convert to string and clean
-                    cell_value = str(cell_value).strip() if cell_value else ''
+                    # Typed values (numbers, dates) keep their type; the rest is written as clean text
+                    number_format = number_formats.get(col_idx - 1) if row_idx > 1 else None
+                    if number_format is None or cell_value is None or isinstance(cell_value, str):
+                        number_format = None
+                        cell_value = str(cell_value).strip() if cell_value else ''
                     
                     try:
-                        ws.cell(row=row_idx, column=col_idx, value=cell_value)
+                        cell = ws.cell(row=row_idx, column=col_idx, value=cell_value)
+                        if number_format:
+                            cell.number_format = number_format
                     except Exception as e:
-                        print(f"Error writing cell ({row_idx}, {col_idx}): {e}")
+                        logger.warning("Error writing cell (%d, %d): %s", row_idx, col_idx, e)
                         ws.cell(row=row_idx, column=col_idx, value='')
             
             # Format header row (first row)
@@ -479,62 +792,362 @@ class PDFConverter:
                         pass
                 
                 # Set width with reasonable limits
-                adjusted_width = min(max(max_length + 2, 10), 50)  # Min 10, Max 50
-                ws.column_dimensions[column_letter].width = adjusted_width
+                ws.column_dimensions[column_letter].width = column_width(max_length)
             
             # Freeze header row
             ws.freeze_panes = 'A2'
         
         # Save Excel file
         wb.save(output_path)
-        print(f"Excel file saved: {output_path}")
+        logger.debug("Excel file saved: %s", output_path)
     
-    def convert_pdf_to_excel(self, pdf_path):
+    def create_excel_file_streaming(self, tables, output_path, table_count=None):
+        """Create Excel file with the write-only backend, one pass per table
+        
+        tables may be any iterable; table_count is then needed for the sheet names.
+        """
+        if table_count is None:
+            table_count = len(tables)
+        writer = StreamingExcelWriter(output_path)
+        typed_tables = iter_typed_tables(tables) if self.typed_cells else ((table_info, None) for table_info in tables)
+        for table_info, number_formats in typed_tables:
+            if not table_info['data']:
+                logger.debug("Skipping empty table on page %s, table %s", table_info['page'], table_info['table'])
+                continue
+            writer.add_sheet(self.sheet_name_for(table_info, table_count), table_info['data'], number_formats)
+        writer.close()
+        logger.debug("Excel file saved: %s", output_path)
+    
+    def create_output(self, tables, output, output_format='xlsx', table_count=None):
+        """Write the tables as an Excel workbook or, for csv/jsonl/parquet, a ZIP with one file per table
+        
+        tables may be any iterable when table_count is given (see create_excel_file_streaming).
+        """
+        if table_count is not None:
+            if output_format == 'xlsx':
+                return self.create_excel_file_streaming(tables, output, table_count)
+        elif output_format == 'xlsx':
+            return self.create_excel_file(tables, output)
+        else:
+            table_count = len(tables)
+        
+        writer = TABLE_WRITERS[output_format](output)
+        for table_info in tables:
+            if not table_info['data']:
+                logger.debug("Skipping empty table on page %s, table %s", table_info['page'], table_info['table'])
+                continue
+            writer.add_table(self.sheet_name_for(table_info, table_count), table_info['data'])
+        writer.close()
+        logger.debug("%s export saved: %s", output_format, output)
+    
+    def detect_table_pages(self, pdf_path, pages=None):
+        """Lightweight pass listing the 1-based pages that appear to hold a table
+        
+        Pages whose content stream draws rulings are accepted without being
+        parsed; the others get the geometric check of PageAnalysis.looks_tabular.
+        No extraction strategy runs, so the result is a cheap way to pick the
+        pages for a follow-up conversion. Returns (table_pages, pages_scanned).
+        """
+        import pdfplumber
+        from .page_analysis import PageAnalysis, draws_rulings
+        
+        table_pages = []
+        with metrics.timer('open'):
+            pdf = pdfplumber.open(pdf_path, pages=pages)
+        with pdf:
+            page_count = len(pdf.pages)
+            for page in pdf.pages:
+                if draws_rulings(page) or PageAnalysis(page).looks_tabular():
+                    table_pages.append(page.page_number)
+                page.close()
+        return table_pages, page_count
+    
+    def extract_tables(self, pdf_source, progress_callback=None, pages=None):
+        """Tables of the PDF: pdfplumber first, tabula-py when it finds nothing
+        
+        progress_callback gets the page events of extract_tables_pdfplumber, then,
+        if tabula runs, {'event': 'fallback', 'engine': 'tabula'} and its previews.
+        With engine_race both engines run at once instead (see extract_tables_racing).
+        """
+        if self.engine_race:
+            tables = self.extract_tables_racing(pdf_source, progress_callback, pages)
+            return list(dedupe_tables(tables)) if tables and self.dedupe_rows else tables
+        
+        # Extract tables using pdfplumber first
+        logger.info("Extracting tables from: %s", pdf_source if isinstance(pdf_source, str) else '<stream>')
+        tables = self.extract_tables_pdfplumber(pdf_source, progress_callback, pages)
+        logger.info("Found %d tables with pdfplumber", len(tables) if tables else 0)
+        if tables and self.stitch_pages:
+            tables = list(stitch_tables(tables))
+        
+        # If pdfplumber fails or returns empty, try tabula
+        if not tables:
+            logger.info("Trying tabula-py as fallback...")
+            if progress_callback:
+                progress_callback({'event': 'fallback', 'engine': 'tabula'})
+            if hasattr(pdf_source, 'seek'):
+                pdf_source.seek(0)
+            tables = self.extract_tables_tabula(pdf_source, pages)
+            logger.info("Found %d tables with tabula", len(tables) if tables else 0)
+            if progress_callback and tables:
+                self._report_previews(progress_callback, tables)
+        
+        if tables and self.dedupe_rows:
+            tables = list(dedupe_tables(tables))
+        return tables
+    
+    def extract_tables_racing(self, pdf_source, progress_callback=None, pages=None):
+        """extract_tables with pdfplumber and tabula-py running concurrently
+        
+        The first result with a real table wins (see engine_race) and the other
+        engine is cancelled, so a PDF pdfplumber cannot read costs the slower
+        engine's time instead of the sum of both. pdfplumber's page events are
+        forwarded while the race runs; then progress_callback gets
+        {'event': 'engine_won', 'engine'} and, when tabula won, its previews.
+        A stream source is copied to a temporary file for tabula, so the two
+        engines never share a file position.
+        """
+        logger.info("Racing pdfplumber and tabula on: %s",
+                    pdf_source if isinstance(pdf_source, str) else '<stream>')
+        lock = threading.Lock()
+        racing = [True]
+        
+        def forward(event):
+            # A losing pdfplumber may finish its current page after the race is over
+            with lock:
+                if racing[0]:
+                    progress_callback(event)
+        
+        tabula_source, tmp_path = pdf_source, None
+        if hasattr(pdf_source, 'read'):
+            tmp = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+            with tmp:
+                pdf_source.seek(0)
+                shutil.copyfileobj(pdf_source, tmp)
+                pdf_source.seek(0)
+            tabula_source = tmp_path = tmp.name
+        
+        engines = [
+            ('pdfplumber', lambda cancel: self.extract_tables_pdfplumber(
+                pdf_source, forward if progress_callback else None, pages, cancel)),
+            ('tabula', lambda cancel: self.extract_tables_tabula(tabula_source, pages, text_fallback=False,
+                                                                  cancel=cancel)),
+        ]
+        try:
+            engine, tables = race_engines(engines, self.engine_timeout)
+        finally:
+            with lock:
+                racing[0] = False
+            if tmp_path:
+                cleanup_file(tmp_path)
+        logger.info("Engine race won by %s with %d tables", engine, len(tables) if tables else 0)
+        
+        if tables and engine == 'pdfplumber' and self.stitch_pages:
+            tables = list(stitch_tables(tables))
+        if progress_callback and engine:
+            progress_callback({'event': 'engine_won', 'engine': engine})
+            if engine == 'tabula':
+                self._report_previews(progress_callback, tables)
+        return tables
+    
+    def iter_tables(self, pdf_source, progress_callback=None, pages=None):
+        """Generator version of extract_tables for low-memory mode
+        
+        pdfplumber tables are yielded page by page. tabula-py, which returns the
+        whole document at once, only runs when pdfplumber yields nothing; a
+        pdfplumber error after tables were yielded is raised, since those tables
+        are already written.
+        """
+        logger.info("Extracting tables (low memory) from: %s", pdf_source if isinstance(pdf_source, str) else '<stream>')
+        found = 0
+        try:
+            pdfplumber_tables = self.iter_tables_pdfplumber(pdf_source, progress_callback, pages)
+            if self.stitch_pages:
+                pdfplumber_tables = stitch_tables(pdfplumber_tables)
+            if self.dedupe_rows:
+                pdfplumber_tables = dedupe_tables(pdfplumber_tables)
+            for table in pdfplumber_tables:
+                found += 1
+                yield table
+        except Exception as e:
+            if found:
+                raise
+            logger.exception("Error with pdfplumber: %s", e)
+        logger.info("Found %d tables with pdfplumber", found)
+        
+        if not found:
+            logger.info("Trying tabula-py as fallback...")
+            if progress_callback:
+                progress_callback({'event': 'fallback', 'engine': 'tabula'})
+            if hasattr(pdf_source, 'seek'):
+                pdf_source.seek(0)
+            tables = self.extract_tables_tabula(pdf_source, pages)
+            logger.info("Found %d tables with tabula", len(tables) if tables else 0)
+            if progress_callback and tables:
+                self._report_previews(progress_callback, tables)
+            if tables and self.dedupe_rows:
+                tables = dedupe_tables(tables)
+            yield from tables or []
+    
+    def convert_pdf_to_excel(self, pdf_path, progress_callback=None, pages=None, output_format='xlsx'):
         """
         Converte PDF para Excel
         
         Args:
             pdf_path: Caminho do PDF
+            progress_callback: Função opcional chamada com o progresso por página
+            pages: Lista opcional de páginas (1-based) a converter; None = todas
+            output_format: 'xlsx' (padrão), 'csv', 'jsonl' ou 'parquet' (ZIP com um arquivo por tabela)
             
         Returns:
             tuple: (success, excel_path, error_message)
         """
-        try:
-            # Gerar nome único para arquivo Excel
-            excel_filename, file_id = generate_unique_filename("converted.xlsx")
+        # Gerar nome único para arquivo de saída
+        excel_filename, file_id = generate_unique_filename(f"converted.{OUTPUT_FORMATS[output_format]}")
+        if self.output_storage:
+            excel_path = self.output_storage.path_for(excel_filename)
+        else:
             excel_path = os.path.join(self.output_folder, excel_filename)
+        
+        success, error = self.convert_pdf(pdf_path, excel_path, progress_callback, pages, output_format)
+        if not success:
+            cleanup_file(excel_path)
+        elif self.output_storage:
+            self.output_storage.add(excel_filename, excel_path)
+        return success, excel_path if success else None, error
+    
+    def convert_pdf(self, pdf_source, excel_output, progress_callback=None, pages=None, output_format='xlsx'):
+        """
+        Converte PDF para Excel sem passar pelas pastas de upload/saída
+        
+        Args:
+            pdf_source: Caminho do PDF ou arquivo binário aberto (seekable)
+            excel_output: Caminho do arquivo de saída ou arquivo binário aberto para escrita
+            progress_callback: Função opcional chamada com o progresso por página
+            pages: Lista opcional de páginas (1-based) a converter; None = todas
+            output_format: 'xlsx' (padrão), 'csv', 'jsonl' ou 'parquet' (ZIP com um arquivo por tabela)
             
-            # Extract tables using pdfplumber first
-            print(f"Extracting tables from: {pdf_path}")
-            tables = self.extract_tables_pdfplumber(pdf_path)
-            print(f"Found {len(tables) if tables else 0} tables with pdfplumber")
+        Returns:
+            tuple: (success, error_message)
+        """
+        # A scope of its own, so the cache entry can record this conversion's
+        # counters; they are added to the caller's scope afterwards
+        with metrics.request_scope() as scope:
+            result = self._convert_pdf(pdf_source, excel_output, progress_callback, pages, output_format)
+        metrics.add_scope(scope)
+        return result
+    
+    def _convert_pdf(self, pdf_source, excel_output, progress_callback, pages, output_format):
+        """convert_pdf body, run in the conversion's own metrics scope"""
+        try:
+            cache_key = None
+            if self.cache:
+                settings = self.cache_settings()
+                if pages:
+                    settings['pages'] = list(pages)
+                cache_key = self.cache.make_key(pdf_source, settings)
+                if output_format == 'xlsx':
+                    cached = self.cache.get_workbook(cache_key, excel_output)
+                else:
+                    # Other formats are rebuilt from the cached tables, skipping extraction
+                    tables = self.cache.get_tables(cache_key)
+                    if tables:
+                        with metrics.timer('export_write', format=output_format):
+                            self.create_output(tables, excel_output, output_format)
+                    cached = bool(tables)
+                if cached:
+                    logger.info("Conversion cache hit: %s", cache_key[:12])
+                    # Report the rows deduplication removed as if extracting again
+                    meta = self.cache.get_meta(cache_key)
+                    for reason, count in meta.get('rows_deduplicated', {}).items():
+                        metrics.inc('rows_deduplicated', count, reason=reason)
+                    metrics.inc('cache_hits')
+                    metrics.inc('conversions', status='success')
+                    return True, None
+                metrics.inc('cache_misses')
             
-            # If pdfplumber fails or returns empty, try tabula
-            if not tables:
-                print("Trying tabula-py as fallback...")
-                tables = self.extract_tables_tabula(pdf_path)
-                print(f"Found {len(tables) if tables else 0} tables with tabula")
+            if self.screening:
+                pages, error = self.screen_pages(pdf_source, pages)
+                if error:
+                    metrics.inc('conversions', status='rejected')
+                    return False, error
+            
+            if self.low_memory:
+                return self._convert_low_memory(pdf_source, excel_output, progress_callback, pages, output_format,
+                                                cache_key)
+            
+            tables = self.extract_tables(pdf_source, progress_callback, pages)
             
             if not tables:
-                return False, None, "Nenhuma tabela encontrada no PDF. Certifique-se de que o PDF contém dados tabulares."
+                metrics.inc('conversions', status='empty')
+                return False, "Nenhuma tabela encontrada no PDF. Certifique-se de que o PDF contém dados tabulares."
             
-            # Debug: print table info
-            total_rows = 0
-            for table in tables:
-                rows = len(table.get('data', []))
-                total_rows += rows
-                print(f"Table on page {table['page']}: {rows} rows")
+            total_rows = sum(len(table.get('data', [])) for table in tables)
+            metrics.inc('tables_extracted', len(tables))
+            metrics.inc('rows_extracted', total_rows)
+            logger.info("Total rows to export: %d", total_rows)
             
-            print(f"Total rows to export: {total_rows}")
+            # Create the output file
+            if output_format == 'xlsx':
+                with metrics.timer('workbook_write'):
+                    self.create_excel_file(tables, excel_output)
+            else:
+                with metrics.timer('export_write', format=output_format):
+                    self.create_output(tables, excel_output, output_format)
             
-            # Create Excel file
-            self.create_excel_file(tables, excel_path)
+            if cache_key:
+                self.cache.put(cache_key, tables, excel_output if output_format == 'xlsx' else None,
+                               meta=self._cache_meta())
             
-            return True, excel_path, None
+            metrics.inc('conversions', status='success')
+            return True, None
             
         except Exception as e:
             import traceback
             error_msg = f"Erro ao converter PDF: {str(e)}\n{traceback.format_exc()}"
-            print(error_msg)
-            return False, None, error_msg
-
+            logger.error(error_msg)
+            metrics.inc('conversions', status='error')
+            return False, error_msg
+    
+    @staticmethod
+    def _cache_meta():
+        """Facts about the running conversion stored with its cache entry: the rows
+        deduplication removed, by reason, read from the conversion's metrics scope"""
+        removed = {dict(labels)['reason']: value
+                   for (name, labels), value in metrics.current_scope()['counters'].items()
+                   if name == 'rows_deduplicated'}
+        return {'rows_deduplicated': removed} if removed else None
+    
+    def _convert_low_memory(self, pdf_source, output, progress_callback, pages, output_format, cache_key):
+        """convert_pdf body for low-memory mode: tables flow from the page generator
+        straight into the writer (and the cache), never collected in a list"""
+        # Sheet names only tell one table from many, so two tables of lookahead are enough
+        tables = self.iter_tables(pdf_source, progress_callback, pages)
+        head = list(islice(tables, 2))
+        if not head:
+            metrics.inc('conversions', status='empty')
+            return False, "Nenhuma tabela encontrada no PDF. Certifique-se de que o PDF contém dados tabulares."
+        
+        counts = {'tables': 0, 'rows': 0}
+        
+        def counted(tables):
+            for table in tables:
+                counts['tables'] += 1
+                counts['rows'] += len(table.get('data', []))
+                yield table
+        
+        tables = counted(chain(head, tables))
+        if cache_key:
+            tables = self.cache.record_tables(cache_key, tables)
+        # Extraction and writing are interleaved, so a single timer covers both
+        with metrics.timer('stream_write', format=output_format):
+            self.create_output(tables, output, output_format, table_count=len(head))
+        
+        metrics.inc('tables_extracted', counts['tables'])
+        metrics.inc('rows_extracted', counts['rows'])
+        logger.info("Total rows exported: %d", counts['rows'])
+        if cache_key:
+            self.cache.put(cache_key, None, output if output_format == 'xlsx' else None, meta=self._cache_meta())
+        
+        metrics.inc('conversions', status='success')
+        return True, None
@@ -0,0 +1,171 @@
+"""
+PDF Studio - Triagem de PDFs
+Leitura rápida do cabeçalho, da criptografia, do número de páginas e da quantidade de
+texto de cada página, antes da extração completa
+"""
+
+import logging
+import threading
+import time
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# '%PDF-' may come after some junk, within the first 1024 bytes
+HEADER_WINDOW = 1024
+# A page with fewer characters has no text to extract (a scan, a blank page)
+MIN_PAGE_CHARS = 1
+# PDFium is not thread-safe: one document at a time per process
+_pdfium_lock = threading.Lock()
+
+NOT_PDF_MESSAGE = "O arquivo não é um PDF"
+PASSWORD_MESSAGE = "O PDF é protegido por senha; remova a proteção e envie novamente"
+UNREADABLE_MESSAGE = "O PDF está corrompido ou não pôde ser lido"
+NO_TEXT_MESSAGE = ("O PDF não tem texto para extrair (documento digitalizado ou só com imagens); "
+                   "converta-o com OCR antes")
+
+
+def _read_header(source):
+    if hasattr(source, 'read'):
+        source.seek(0)
+        head = source.read(HEADER_WINDOW)
+        source.seek(0)
+        return head
+    with open(source, 'rb') as f:
+        return f.read(HEADER_WINDOW)
+
+
+def _scan_pdfium(source, verdict):
+    """Page count, encryption and characters per page through PDFium (pypdfium2)"""
+    import pypdfium2
+    import pypdfium2.raw as pdfium_c
+
+    with _pdfium_lock:
+        try:
+            pdf = pypdfium2.PdfDocument(source)
+        except pypdfium2.PdfiumError as e:
+            if e.err_code == pdfium_c.FPDF_ERR_PASSWORD:
+                verdict.update(encrypted=True, error=PASSWORD_MESSAGE)
+            else:
+                verdict['error'] = UNREADABLE_MESSAGE
+            return
+        try:
+            verdict['encrypted'] = pdfium_c.FPDF_GetSecurityHandlerRevision(pdf.raw) != -1
+            page_chars = []
+            for index in range(len(pdf)):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                page_chars.append(textpage.count_chars())
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+    verdict['pages'] = len(page_chars)
+    verdict['page_chars'] = page_chars
+
+
+def _scan_pdfminer(source, verdict):
+    """Page count and encryption when pypdfium2 is missing; no character counts"""
+    from pdfminer.pdfdocument import PDFDocument, PDFPasswordIncorrect
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+
+    stream = source if hasattr(source, 'read') else open(source, 'rb')
+    try:
+        document = PDFDocument(PDFParser(stream))
+        verdict['encrypted'] = document.encryption is not None
+        verdict['pages'] = sum(1 for _ in PDFPage.create_pages(document))
+    except PDFPasswordIncorrect:
+        verdict.update(encrypted=True, error=PASSWORD_MESSAGE)
+    except Exception:
+        verdict['error'] = UNREADABLE_MESSAGE
+    finally:
+        if stream is not source:
+            stream.close()
+
+
+def page_count(source):
+    """Number of pages of a PDF path or seekable binary file, without reading them; None
+    when the file cannot be opened (not a PDF, damaged, password-protected)"""
+    try:
+        import pypdfium2
+    except ImportError:
+        verdict = {'error': None, 'pages': 0}
+        _scan_pdfminer(source, verdict)
+        return None if verdict['error'] else verdict['pages']
+
+    with _pdfium_lock:
+        try:
+            pdf = pypdfium2.PdfDocument(source)
+        except pypdfium2.PdfiumError:
+            return None
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+            if hasattr(source, 'seek'):
+                source.seek(0)
+
+
+def check_page_range(source, pages):
+    """User-facing error when pages (see parse_page_ranges) go past the last page of
+    the PDF, else None; an unreadable PDF is left to the conversion to report"""
+    if not pages:
+        return None
+    count = page_count(source)
+    if count is None or pages[-1] <= count:
+        return None
+    return (f"Intervalo de páginas fora do documento: o PDF tem {count} "
+            f"página{'s' if count != 1 else ''} e foi pedida a página {pages[-1]}")
+
+
+def screen_pdf(source):
+    """Quick verdict on a PDF path or seekable binary file, before any extraction
+
+    Checks the header, then reads the document structure and counts the text
+    characters of every page without laying them out, in a few milliseconds
+    per page. Returns a JSON-friendly dict:
+
+        ok            False for non-PDFs, unreadable files and those needing a password
+        error         why it is not ok (Portuguese, for the user)
+        version       '1.7' from the header
+        encrypted     True for encrypted files, openable (owner password only) or not
+        pages         page count
+        page_chars    characters on each page (None without pypdfium2)
+        empty_pages   1-based pages with less than MIN_PAGE_CHARS characters
+        kind          'text', 'mixed', 'scanned' (no page has text) or 'unknown'
+        seconds       time spent
+    """
+    start = time.perf_counter()
+    verdict = {'ok': False, 'error': None, 'version': None, 'encrypted': False, 'pages': 0,
+               'page_chars': None, 'empty_pages': [], 'kind': 'unknown'}
+    with metrics.timer('screening'):
+        head = _read_header(source)
+        offset = head.find(b'%PDF-')
+        if offset < 0:
+            verdict['error'] = NOT_PDF_MESSAGE
+        else:
+            verdict['version'] = head[offset + 5:offset + 8].decode('latin-1')
+            try:
+                scan = _scan_pdfium
+                import pypdfium2  # noqa: F401 (a dependency of pdfplumber)
+            except ImportError:
+                scan = _scan_pdfminer
+            scan(source, verdict)
+            if hasattr(source, 'seek'):
+                source.seek(0)
+
+    if verdict['error'] is None:
+        verdict['ok'] = True
+        if verdict['page_chars'] is not None:
+            verdict['empty_pages'] = [number for number, chars in enumerate(verdict['page_chars'], 1)
+                                      if chars < MIN_PAGE_CHARS]
+            if not verdict['empty_pages']:
+                verdict['kind'] = 'text'
+            elif len(verdict['empty_pages']) == verdict['pages']:
+                verdict['kind'] = 'scanned'
+            else:
+                verdict['kind'] = 'mixed'
+    verdict['seconds'] = round(time.perf_counter() - start, 4)
+    metrics.inc('pdfs_screened', kind=verdict['kind'] if verdict['ok'] else 'rejected')
+    return verdict
@@ -69,3 +69,31 @@ def create_response(success=True, message="", data=None, error_code=None):
     
     return response
 
+MAX_PAGE_NUMBER = 100000
+
+def parse_page_ranges(spec):
+    """Converte "1-3,5" (ou uma lista de inteiros) em páginas 1-based ordenadas; None/'' = todas"""
+    if spec is None or spec == '' or spec == 'all':
+        return None
+    
+    if isinstance(spec, int):
+        spec = [spec]
+    if isinstance(spec, str):
+        parts = [part.strip() for part in spec.split(',') if part.strip()]
+    else:
+        parts = list(spec)
+    
+    pages = set()
+    for part in parts:
+        try:
+            if isinstance(part, str) and '-' in part:
+                first, last = (int(value) for value in part.split('-', 1))
+            else:
+                first = last = int(part)
+        except (TypeError, ValueError):
+            raise ValueError(f"Intervalo de páginas inválido: {part}")
+        if first < 1 or last < first or last > MAX_PAGE_NUMBER:
+            raise ValueError(f"Intervalo de páginas inválido: {part}")
+        pages.update(range(first, last + 1))
+    
+    return sorted(pages) or None
@@ -0,0 +1,86 @@
+"""
+PDF Studio - Remoção de Linhas Duplicadas
+Remove as linhas repetidas entre as tabelas de um documento (a mesma linha extraída
+como tabela e pelo parsing de texto) e os cabeçalhos repetidos no meio das tabelas unidas
+entre páginas, com um índice de hashes das linhas normalizadas
+"""
+
+import hashlib
+import logging
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+def _row_key(row):
+    """Row text compared across extraction methods: the non-empty cells joined by
+    a space, whitespace collapsed, so ['Codigo', '', 'Produto '] == ['Codigo', 'Produto']"""
+    return ' '.join(' '.join(str(value) for value in row if value is not None).split())
+
+
+def _row_digest(key):
+    # 16 bytes per row instead of its text: the index of a 100k-row document stays small
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+
+
+def dedupe_tables(tables):
+    """Drop duplicate and repeated header rows across tables; an iterable in, a generator out
+
+    Rows are compared by their normalized text (see _row_key), so the same
+    row read from ruling lines and by text parsing, with different cell
+    splits, still matches. The first row of each table is its header and is
+    always kept: the writers name the columns after it. Below it, a row is
+    dropped when the same row was already seen in any table of the
+    document and, in a table spanning several pages (see stitch_tables),
+    when it repeats (case-insensitive) the header of this or of an earlier
+    table: the header printed again at the top of each page. Empty rows are
+    kept. A table left with only its header is dropped whole. Each row is
+    hashed once into a set, so the cost is linear in the number of cells
+    and only the digests are held, not the tables: a generator of tables is
+    deduplicated page by page. The removed rows are counted in the
+    'rows_deduplicated' metric, by reason.
+    """
+    counts = dict.fromkeys(('duplicate', 'header', 'tables'), 0)
+    seen = set()
+    headers = set()
+
+    for table_info in tables:
+        rows = table_info['data']
+        if len(rows) < 2:
+            yield table_info
+            continue
+        header = _row_key(rows[0]).casefold()
+        if header:
+            headers.add(header)
+        # Only a table joined from several pages has headers inside its data
+        multi_page = bool(table_info.get('last_page'))
+
+        kept = [rows[0]]
+        for row in rows[1:]:
+            key = _row_key(row)
+            if not key:
+                kept.append(row)
+                continue
+            if multi_page and key.casefold() in headers:
+                counts['header'] += 1
+                continue
+            digest = _row_digest(key)
+            if digest in seen:
+                counts['duplicate'] += 1
+                continue
+            seen.add(digest)
+            kept.append(row)
+
+        if len(kept) == 1:
+            counts['tables'] += 1
+            counts['header'] += 1
+            continue
+        yield table_info if len(kept) == len(rows) else dict(table_info, data=kept)
+
+    for reason in ('duplicate', 'header'):
+        if counts[reason]:
+            metrics.inc('rows_deduplicated', counts[reason], reason=reason)
+    if counts['tables']:
+        metrics.inc('tables_deduplicated', counts['tables'])
+    if counts['duplicate'] or counts['header']:
+        logger.info("Deduplication removed %d duplicate rows, %d repeated headers and %d tables",
+                    counts['duplicate'], counts['header'], counts['tables'])
@@ -0,0 +1,305 @@
+"""
+PDF Studio - Armazenamento de Arquivos
+Controla uploads e arquivos gerados com prazo de validade (TTL) e cota de espaço,
+removendo os mais antigos em segundo plano
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class StorageManager:
+    """Files of one folder (uploads or generated outputs) tracked in a SQLite index.
+
+    Every artifact is registered with `add` after it is written; `resolve`
+    finds it again and counts as an access. An artifact expires `ttl_seconds`
+    after its last access, and while the folder holds more than `max_bytes`
+    the least recently accessed artifacts are evicted too, except those
+    accessed in the last `grace_seconds` (a conversion may still be reading
+    them). `sweep` applies both rules; `start_sweeper` runs it periodically in
+    a daemon thread. With `hashed_dirs`, files live in two levels of
+    subfolders named after the hash of the file name (`ab/cd/<name>`), so no
+    single directory grows to hundreds of thousands of entries; files already
+    stored flat keep being found. Several processes can share the index, which
+    is keyed by `area` so one database serves several folders.
+    """
+
+    def __init__(self, folder, index_path, area=None, ttl_seconds=24 * 3600, max_bytes=None, hashed_dirs=False,
+                 grace_seconds=300):
+        self.folder = folder
+        self.index_path = index_path
+        self.area = area or os.path.basename(os.path.normpath(folder))
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hashed_dirs = hashed_dirs
+        self.grace_seconds = grace_seconds
+        self._sweeper = None
+        self._stop = threading.Event()
+        os.makedirs(folder, exist_ok=True)
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    area TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (area, name)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS artifacts_accessed ON artifacts (area, accessed_at)")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _check_name(name):
+        if not name or os.path.basename(name) != name or name in ('.', '..'):
+            raise ValueError(f"Nome de arquivo inválido: {name}")
+
+    def _stored_path(self, name):
+        if not self.hashed_dirs:
+            return os.path.join(self.folder, name)
+        digest = hashlib.sha1(name.encode('utf-8')).hexdigest()
+        return os.path.join(self.folder, digest[:2], digest[2:4], name)
+
+    def path_for(self, name):
+        """Where a new artifact called name is written (its subfolder is created)"""
+        self._check_name(name)
+        path = self._stored_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def add(self, name, path=None):
+        """Register an artifact written to path_for(name) (or to path). Returns its path"""
+        path = path or self.path_for(name)
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (area, name, path, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.area, name, os.path.relpath(path, self.folder), os.path.getsize(path), now, now)
+            )
+            over_quota = self.max_bytes is not None and self._total_size(conn) > self.max_bytes
+        finally:
+            conn.close()
+        if over_quota:
+            self.sweep()
+        return path
+
+    def resolve(self, name):
+        """Path of a stored artifact, refreshing its last access; None if missing or expired"""
+        try:
+            self._check_name(name)
+        except ValueError:
+            return None
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT path, accessed_at FROM artifacts WHERE area = ? AND name = ?",
+                               (self.area, name)).fetchone()
+            if row is not None:
+                path = os.path.join(self.folder, row['path'])
+                expired = self.ttl_seconds and row['accessed_at'] + self.ttl_seconds < now
+                if expired or not os.path.exists(path):
+                    return None
+                conn.execute("UPDATE artifacts SET accessed_at = ? WHERE area = ? AND name = ?",
+                             (now, self.area, name))
+                return path
+        finally:
+            conn.close()
+
+        # Not indexed yet (written before the index existed); adopted by the next sweep
+        for path in (self._stored_path(name), os.path.join(self.folder, name)):
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def remove(self, name):
+        """Delete an artifact and its index entry"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT path FROM artifacts WHERE area = ? AND name = ?",
+                               (self.area, name)).fetchone()
+            conn.execute("DELETE FROM artifacts WHERE area = ? AND name = ?", (self.area, name))
+        finally:
+            conn.close()
+        if row is not None:
+            self._delete_file(row['path'])
+
+    def _delete_file(self, relative_path):
+        path = os.path.join(self.folder, relative_path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("Could not remove %s: %s", path, e)
+            return
+        # Drop the hash subfolders once they are empty
+        folder = os.path.dirname(path)
+        while os.path.normpath(folder) != os.path.normpath(self.folder):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                break
+            folder = os.path.dirname(folder)
+
+    def _total_size(self, conn):
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts WHERE area = ?",
+                            (self.area,)).fetchone()[0]
+
+    def sweep(self):
+        """Remove expired artifacts, then the least recently accessed ones past the quota
+
+        Returns {'expired': n, 'evicted': n, 'bytes_freed': n}.
+        """
+        now = time.time()
+        expired = []
+        evicted = []
+        conn = self._connect()
+        try:
+            if self.ttl_seconds:
+                expired = conn.execute(
+                    "SELECT name, path, size FROM artifacts WHERE area = ? AND accessed_at < ?",
+                    (self.area, now - self.ttl_seconds)
+                ).fetchall()
+                self._forget(conn, expired)
+
+            if self.max_bytes is not None:
+                excess = self._total_size(conn) - self.max_bytes
+                if excess > 0:
+                    candidates = conn.execute(
+                        "SELECT name, path, size FROM artifacts WHERE area = ? AND accessed_at < ? "
+                        "ORDER BY accessed_at",
+                        (self.area, now - self.grace_seconds)
+                    )
+                    for row in candidates:
+                        if excess <= 0:
+                            break
+                        evicted.append(row)
+                        excess -= row['size']
+                    self._forget(conn, evicted)
+        finally:
+            conn.close()
+
+        for row in expired + evicted:
+            self._delete_file(row['path'])
+        if expired:
+            metrics.inc('storage_evicted', len(expired), area=self.area, reason='ttl')
+        if evicted:
+            metrics.inc('storage_evicted', len(evicted), area=self.area, reason='quota')
+            if excess > 0:
+                logger.warning("Storage '%s' still %d bytes over quota: remaining files are in use",
+                               self.area, excess)
+        return {
+            'expired': len(expired),
+            'evicted': len(evicted),
+            'bytes_freed': sum(row['size'] for row in expired + evicted),
+        }
+
+    def _forget(self, conn, rows):
+        conn.executemany("DELETE FROM artifacts WHERE area = ? AND name = ?",
+                         [(self.area, row['name']) for row in rows])
+
+    def reconcile(self):
+        """Index files found on disk but not tracked, and drop entries whose file is gone
+
+        Untracked files (left by older versions or copied in by hand) get their
+        mtime as last access, so the TTL applies to them as well.
+        """
+        conn = self._connect()
+        try:
+            indexed = {row['path']: row['name'] for row in
+                       conn.execute("SELECT name, path FROM artifacts WHERE area = ?", (self.area,))}
+            found = set()
+            adopted = []
+            for folder, dirs, files in os.walk(self.folder):
+                for filename in files:
+                    path = os.path.join(folder, filename)
+                    relative_path = os.path.relpath(path, self.folder)
+                    found.add(relative_path)
+                    if relative_path in indexed or filename.startswith('.'):
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    adopted.append((self.area, filename, relative_path, stat.st_size, stat.st_mtime,
+                                    stat.st_mtime))
+            conn.executemany(
+                "INSERT OR IGNORE INTO artifacts (area, name, path, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", adopted
+            )
+            missing = [(self.area, name) for path, name in indexed.items() if path not in found]
+            conn.executemany("DELETE FROM artifacts WHERE area = ? AND name = ?", missing)
+        finally:
+            conn.close()
+        if adopted or missing:
+            logger.info("Storage '%s': %d untracked files indexed, %d missing entries dropped",
+                        self.area, len(adopted), len(missing))
+        return {'adopted': len(adopted), 'missing': len(missing)}
+
+    def start_sweeper(self, interval=300):
+        """Reconcile once, then sweep every interval seconds in a daemon thread"""
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, args=(interval,),
+                                         name=f'storage-sweeper-{self.area}', daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+
+    def _sweep_loop(self, interval):
+        try:
+            self.reconcile()
+        except Exception:
+            logger.exception("Storage '%s' reconcile failed", self.area)
+        while True:
+            try:
+                result = self.sweep()
+                if result['expired'] or result['evicted']:
+                    logger.info("Storage '%s': %d expired, %d evicted, %d bytes freed", self.area,
+                                result['expired'], result['evicted'], result['bytes_freed'])
+            except Exception:
+                logger.exception("Storage '%s' sweep failed", self.area)
+            if self._stop.wait(interval):
+                return
+
+    def stats(self):
+        """Tracked files and bytes, with the configured limits"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0), MIN(accessed_at) FROM artifacts "
+                               "WHERE area = ?", (self.area,)).fetchone()
+        finally:
+            conn.close()
+        return {
+            'area': self.area,
+            'files': row[0],
+            'size_bytes': row[1],
+            'oldest_access': row[2],
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl_seconds,
+            'hashed_dirs': self.hashed_dirs,
+        }
@@ -0,0 +1,159 @@
+"""
+PDF Studio - Planejador de Estratégias
+Aprende qual estratégia de extração vence nas primeiras páginas de um documento,
+tenta essa primeiro nas demais e lembra a escolha por layout de documento
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def document_fingerprint(pdf):
+    """Layout fingerprint of an open pdfplumber PDF: producer, creator and first page size
+
+    Documents exported by the same tool on the same paper size tend to share a
+    layout, which is all a stored plan needs: a wrong guess costs one fallback.
+    """
+    metadata = pdf.metadata or {}
+    size = (round(pdf.pages[0].width), round(pdf.pages[0].height)) if pdf.pages else None
+    parts = [str(metadata.get('Producer', '')), str(metadata.get('Creator', '')), str(size)]
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+class StrategyPlanner:
+    """Per-document memory of the winning extraction strategy.
+
+    While learning, every page runs the full cascade and its winner is
+    recorded (pages without tables are ignored). Once `warmup_pages` pages in
+    a row were won by the same strategy the plan is locked: later pages try
+    that strategy alone and keep its result when it has at least `min_ratio`
+    of the rows the learning pages averaged, and never fewer than `min_rows`;
+    otherwise the page falls back to the cascade. `max_misses` fallbacks in a
+    row unlock the plan and learning starts over. A planner built with a
+    strategy (from a StrategyStore entry) starts locked.
+    """
+
+    def __init__(self, strategy=None, rows=0, warmup_pages=3, min_ratio=0.5, min_rows=3, max_misses=2):
+        self.strategy = strategy
+        self.reference_rows = rows
+        self.warmup_pages = warmup_pages
+        self.min_ratio = min_ratio
+        self.min_rows = min_rows
+        self.max_misses = max_misses
+        self.from_store = strategy is not None
+        self._history = []
+        self._misses = 0
+
+    def accepts(self, rows):
+        """True when the locked strategy's result is good enough to skip the cascade"""
+        return rows >= max(self.min_rows, int(self.reference_rows * self.min_ratio))
+
+    def record(self, strategy, rows, planned):
+        """Result of a page: winning strategy (None without tables), its rows,
+        and whether the locked plan served it without the cascade"""
+        if self.strategy is not None:
+            if planned:
+                self._misses = 0
+                metrics.inc('planner_pages', result='planned')
+                return
+            metrics.inc('planner_pages', result='fallback')
+            self._misses += 1
+            if self._misses >= self.max_misses:
+                logger.debug("Strategy plan '%s' dropped after %d fallbacks", self.strategy, self._misses)
+                self.strategy = None
+                self._history = []
+                self._misses = 0
+            return
+
+        metrics.inc('planner_pages', result='learning')
+        if strategy is None:
+            return
+        self._history.append((strategy, rows))
+        recent = self._history[-self.warmup_pages:]
+        if len(recent) == self.warmup_pages and all(s == strategy for s, _ in recent):
+            self.strategy = strategy
+            self.reference_rows = sum(r for _, r in recent) / len(recent)
+            logger.debug("Strategy plan locked: '%s' (~%d rows per page)", strategy, self.reference_rows)
+
+    def plan(self):
+        """(strategy, reference_rows) locked at the end of the document, or None"""
+        return (self.strategy, self.reference_rows) if self.strategy else None
+
+
+class StrategyStore:
+    """Plans learned per layout fingerprint, kept in a JSON file.
+
+    Each entry is {'strategy', 'rows', 'documents', 'updated_at'}. The file is
+    re-read when another process changed it and replaced atomically on every
+    write; past `max_entries`, the least recently updated layouts are dropped.
+    """
+
+    def __init__(self, path, max_entries=1000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._plans = {}
+        self._mtime = None
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._plans = json.load(f)
+            except (OSError, ValueError):
+                logger.warning("Unreadable strategy plans file, starting over: %s", self.path)
+                self._plans = {}
+            self._mtime = mtime
+
+    def _save(self):
+        if len(self._plans) > self.max_entries:
+            oldest = sorted(self._plans, key=lambda key: self._plans[key]['updated_at'])
+            for key in oldest[:len(self._plans) - self.max_entries]:
+                del self._plans[key]
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._plans, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def get(self, fingerprint):
+        """(strategy, rows) stored for a layout, or None"""
+        with self._lock:
+            self._refresh()
+            entry = self._plans.get(fingerprint)
+        return (entry['strategy'], entry['rows']) if entry else None
+
+    def put(self, fingerprint, strategy, rows):
+        with self._lock:
+            self._refresh()
+            documents = self._plans.get(fingerprint, {}).get('documents', 0)
+            self._plans[fingerprint] = {
+                'strategy': strategy,
+                'rows': rows,
+                'documents': documents + 1,
+                'updated_at': datetime.now().isoformat(),
+            }
+            self._save()
+
+    def forget(self, fingerprint):
+        with self._lock:
+            self._refresh()
+            if self._plans.pop(fingerprint, None) is not None:
+                self._save()
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            return {'layouts': len(self._plans), 'path': self.path}
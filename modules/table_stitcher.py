@@ -0,0 +1,85 @@
+"""
+PDF Studio - Junção de Tabelas entre Páginas
+Une as tabelas que continuam na página seguinte (mesmas colunas, cabeçalho
+repetido ou mesmas divisões de coluna) em uma única tabela lógica
+"""
+
+import logging
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Column boundaries closer than this (in PDF points) are the same boundary
+X_TOLERANCE = 3.0
+
+
+def _header_key(row):
+    """Header row compared ignoring case and runs of whitespace"""
+    return tuple(' '.join(str(value or '').split()).casefold() for value in row)
+
+
+def _table_width(rows):
+    return max((len(row) for row in rows), default=0)
+
+
+def columns_match(edges, other_edges, x_tolerance=X_TOLERANCE):
+    """True when two tables split their columns at the same x coordinates"""
+    return len(edges) == len(other_edges) and all(
+        abs(x - other_x) <= x_tolerance for x, other_x in zip(edges, other_edges)
+    )
+
+
+def stitch_tables(tables, x_tolerance=X_TOLERANCE):
+    """Merge tables that continue across pages; an iterable in, a generator out
+
+    A table continues the one before it when it is the first table of the
+    next page, the previous one was the last of its page, both have the same
+    number of columns (at least 2), and either its first row repeats the
+    header of the logical table or both have the same column boundaries
+    (the optional 'columns' key, see PageAnalysis.column_edges). A repeated
+    header row is dropped. A stitched table keeps the page and number of its
+    first part and gets 'last_page'; the 'columns' keys are removed.
+    Tables must come in page order, so a page with two tables never has its
+    first table joined to the next page, nor its second one to the page
+    before. Only the logical table being built is held, so a generator of tables can
+    be stitched page by page.
+    """
+    current = None
+    current_edges = None
+    current_header = None
+    current_width = 0
+    # Page of the table just before this one, stitched or not
+    previous_page = None
+    stitched = 0
+
+    for table_info in tables:
+        table_info = dict(table_info)
+        edges = table_info.pop('columns', None)
+        rows = table_info['data']
+        width = _table_width(rows)
+        # The previous table is the last of its page and this one the first of
+        # the next page exactly when their pages are consecutive
+        follows = previous_page is not None and table_info['page'] == previous_page + 1
+        previous_page = table_info['page']
+
+        if current is not None and follows and rows and width == current_width and width >= 2:
+            repeats_header = _header_key(rows[0]) == current_header
+            if repeats_header or (edges and current_edges and columns_match(current_edges, edges, x_tolerance)):
+                current['data'].extend(rows[1:] if repeats_header else rows)
+                current['last_page'] = table_info['page']
+                current_edges = edges or current_edges
+                stitched += 1
+                continue
+
+        if current is not None:
+            yield current
+        current = dict(table_info, data=list(rows))
+        current_edges = edges
+        current_header = _header_key(rows[0]) if rows else None
+        current_width = width
+
+    if current is not None:
+        yield current
+    if stitched:
+        metrics.inc('tables_stitched', stitched)
+        logger.info("Stitched %d continuation table(s) across pages", stitched)
@@ -0,0 +1,245 @@
+"""
+PDF Studio - Backend Tabula Persistente
+Mantém a JVM do tabula aquecida em um processo dedicado, reutilizado entre conversões
+"""
+
+import importlib.util
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import weakref
+from multiprocessing.connection import Client, Listener
+from .engine_race import EngineCancelled
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUTHKEY_ENV = 'PDFSTUDIO_TABULA_AUTHKEY'
+# How often a request waiting for the worker checks whether it was cancelled
+CANCEL_POLL_SECONDS = 0.1
+
+logger = logging.getLogger(__name__)
+
+
+def _serve(conn):
+    """Worker loop: one tabula.read_pdf call per request, in a process that keeps its JVM
+
+    With jpype installed tabula-py starts the JVM inside this process on the
+    first request and reuses it afterwards; without it every call still
+    launches java, so the backend saves nothing.
+    """
+    import tabula
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        pdf_path, pages, options = request
+        try:
+            dfs = tabula.read_pdf(pdf_path, pages=pages or 'all', **options)
+            conn.send(('ok', dfs))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+
+
+def main():
+    """Worker process entry point
+
+    Prints the address of a private listener on stdout, then points stdout at
+    stderr so nothing tabula or the JVM prints can block on the unread pipe.
+    """
+    authkey = bytes.fromhex(os.environ.pop(AUTHKEY_ENV))
+    with Listener(authkey=authkey) as listener:
+        print(listener.address, flush=True)
+        os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+        conn = listener.accept()
+    with conn:
+        _serve(conn)
+
+
+class TabulaBackend:
+    """Client of a long-lived tabula worker process.
+
+    The worker is a fresh interpreter running main(), spawned on the first
+    request, so the cost is only paid when the tabula fallback is used and the
+    web app is never re-imported in it. Requests are serialized on one JVM; a
+    request carries every page it needs, so a conversion is a single round
+    trip. A worker that crashes or exceeds `timeout` is killed and respawned,
+    and the request is retried once on the new worker. A cancelled request
+    is left to finish in the worker and its response is dropped before the
+    next request, so the JVM stays warm.
+    """
+
+    def __init__(self, timeout=120):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._process = None
+        self._conn = None
+        # Deadline of a cancelled request whose response is still to be read
+        self._abandoned_until = None
+        self.started_at = None
+        self.requests = 0
+        self.failures = 0
+        self.restarts = 0
+        self.total_seconds = 0.0
+        self.last_seconds = None
+        # A forked child (a prefork server worker) must not talk to the parent's worker
+        if hasattr(os, 'register_at_fork'):
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: ref() and ref()._after_fork())
+
+    def _after_fork(self):
+        """In a forked child: forget the parent's worker process, pipe and lock"""
+        self._lock = threading.Lock()
+        self._process = None
+        self._conn = None
+        self._abandoned_until = None
+        self.started_at = None
+
+    def _alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def _start(self):
+        authkey = os.urandom(16)
+        process = subprocess.Popen(
+            [sys.executable, '-c', f'from {__name__} import main; main()'], cwd=ROOT, stdout=subprocess.PIPE, text=True,
+            env=dict(os.environ, **{AUTHKEY_ENV: authkey.hex()})
+        )
+        address = process.stdout.readline().strip()
+        process.stdout.close()
+        if not address:
+            process.wait()
+            raise RuntimeError(f"Backend tabula não iniciou (código {process.returncode})")
+        self._process, self._conn = process, Client(address, authkey=authkey)
+        self.started_at = time.time()
+        logger.info("Tabula backend started (pid %d)", process.pid)
+
+    def _stop(self):
+        if self._process is None:
+            return
+        try:
+            self._conn.send(None)
+        except (OSError, ValueError):
+            pass
+        try:
+            self._process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._conn.close()
+        self._process, self._conn = None, None
+        self._abandoned_until = None
+
+    def _restart(self, reason):
+        logger.warning("Restarting tabula backend: %s", reason)
+        self._stop()
+        self.restarts += 1
+        self._start()
+
+    def _acquire(self, cancel):
+        """Take the lock, giving up with EngineCancelled once cancel is set"""
+        if cancel is None:
+            self._lock.acquire()
+            return
+        while not self._lock.acquire(timeout=CANCEL_POLL_SECONDS):
+            if cancel.is_set():
+                raise EngineCancelled()
+        if cancel.is_set():
+            self._lock.release()
+            raise EngineCancelled()
+
+    def _drain(self):
+        """Wait for the response of a cancelled request still running in the worker and drop it"""
+        if self._abandoned_until is None:
+            return
+        remaining = self._abandoned_until - time.monotonic()
+        if remaining <= 0 or not self._conn.poll(remaining):
+            raise TimeoutError(f"tabula não respondeu em {self.timeout}s")
+        self._conn.recv()
+        self._abandoned_until = None
+
+    def _call(self, request, cancel=None):
+        self._drain()
+        self._conn.send(request)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"tabula não respondeu em {self.timeout}s")
+            if self._conn.poll(min(remaining, CANCEL_POLL_SECONDS) if cancel is not None else remaining):
+                return self._conn.recv()
+            if cancel is not None and cancel.is_set():
+                self._abandoned_until = deadline
+                raise EngineCancelled()
+
+    def read_pdf(self, pdf_path, pages=None, cancel=None, **options):
+        """tabula.read_pdf in the warm worker. pages: list of 1-based pages or None for all
+
+        cancel is an optional threading.Event; once it is set EngineCancelled is
+        raised, without sending the request when it is still waiting for the
+        worker. A request already sent keeps running in the worker, and the
+        next request first waits for it (up to its timeout, after which the
+        worker is restarted) and drops its response.
+        """
+        request = (pdf_path, list(pages) if pages else None, options)
+        if cancel is not None and cancel.is_set():
+            raise EngineCancelled()
+        self._acquire(cancel)
+        try:
+            if not self._alive():
+                if self._process is not None:
+                    self.restarts += 1
+                    self._stop()
+                self._start()
+
+            start = time.perf_counter()
+            try:
+                try:
+                    status, result = self._call(request, cancel)
+                except (EOFError, OSError, TimeoutError) as e:
+                    self._restart(e)
+                    status, result = self._call(request, cancel)
+            except EngineCancelled:
+                logger.info("Tabula request cancelled, its response will be dropped")
+                raise
+            except (EOFError, OSError, TimeoutError) as e:
+                self.failures += 1
+                self._restart(e)
+                raise RuntimeError(f"Backend tabula indisponível: {e}")
+            finally:
+                self.last_seconds = time.perf_counter() - start
+                self.total_seconds += self.last_seconds
+                self.requests += 1
+        finally:
+            self._lock.release()
+
+        if status != 'ok':
+            self.failures += 1
+            raise RuntimeError(result)
+        return result
+
+    def health(self):
+        """Worker state and request timing"""
+        with self._lock:
+            alive = self._alive()
+            return {
+                'alive': alive,
+                'pid': self._process.pid if alive else None,
+                'jpype': importlib.util.find_spec('jpype') is not None,
+                'uptime_seconds': round(time.time() - self.started_at, 1) if alive else 0,
+                'requests': self.requests,
+                'failures': self.failures,
+                'restarts': self.restarts,
+                'last_seconds': round(self.last_seconds, 4) if self.last_seconds is not None else None,
+                'avg_seconds': round(self.total_seconds / self.requests, 4) if self.requests else None,
+            }
+
+    def close(self):
+        """Stop the worker process"""
+        with self._lock:
+            self._stop()
+
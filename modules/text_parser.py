@@ -0,0 +1,154 @@
+"""
+PDF Studio - Parser de Texto para Tabela
+Converte o texto extraído de páginas sem tabelas detectáveis em linhas de planilha
+"""
+
+import re
+
+# "10 13866 ..." - main line of the ID + description + unit + value + date layout
+ITEM_LINE = re.compile(r'^\d+\s+\d+')
+# Column separators: 2+ whitespace chars or a tab (specific parser), 2+ whitespace (generic)
+COLUMN_GAP = re.compile(r'\s{2,}|\t')
+WIDE_GAP = re.compile(r'\s{2,}')
+
+ITEM_HEADERS = [
+    "ID",
+    "Descrição",
+    "Unidade",
+    "Valor",
+    "Data",
+    "Empresa",
+    "Unidade Empresa",
+    "Valor 1",
+    "Valor 2",
+    "Percentagens"
+]
+ITEM_COLUMNS = len(ITEM_HEADERS)
+
+
+def split_lines(text):
+    """Stripped lines of the text, as both parsers see them"""
+    return [line.strip() for line in text.strip().split('\n')]
+
+
+def _is_item(line):
+    # \d is a Unicode decimal digit, so a line not starting with one cannot match
+    return line[0].isdecimal() and ITEM_LINE.match(line) is not None
+
+
+def _split_columns(line, pattern):
+    """Non-empty, stripped parts of pattern.split(line)
+
+    For printable ASCII lines the only whitespace is ' ', tabs are absent, and
+    both separators reduce to runs of 2+ spaces, so str.split gives the same
+    parts without the regex engine.
+    """
+    if line.isascii() and line.isprintable():
+        if '  ' not in line:
+            return [line]
+        return [part for part in map(str.strip, line.split('  ')) if part]
+    return [part for part in map(str.strip, pattern.split(line)) if part]
+
+
+def _generic_headers(max_cols):
+    return [f"Coluna {i+1}" for i in range(max_cols)]
+
+
+def _pad_rows(rows):
+    """Headers plus the rows padded in place to the widest row"""
+    max_cols = max(map(len, rows))
+    for row in rows:
+        missing = max_cols - len(row)
+        if missing:
+            row.extend([""] * missing)
+    return [_generic_headers(max_cols)] + rows
+
+
+def _parse_item_lines(lines):
+    """Rows of the ID layout and of 3+ column lines, in line order"""
+    table_data = []
+    append = table_data.append
+    line_count = len(lines)
+
+    i = 0
+    while i < line_count:
+        line = lines[i]
+        i += 1
+        if not line:
+            continue
+
+        if _is_item(line):
+            parts = line.split()
+            if len(parts) < 5:
+                continue
+            row = [f"{parts[0]} {parts[1]}", ' '.join(parts[2:-3]), parts[-3], parts[-2], parts[-1]]
+
+            # The following line, unless it is another item, holds the company info
+            company_info = lines[i] if i < line_count else ""
+            if company_info and not _is_item(company_info):
+                i += 1
+                company_parts = company_info.split()
+                if len(company_parts) >= 5:
+                    row.append(' '.join(company_parts[:-4]))
+                    row.extend(company_parts[-4:])
+                else:
+                    row.extend((company_info, "", "", "", ""))
+            else:
+                row.extend(("", "", "", "", ""))
+            append(row)
+        else:
+            # The line is stripped, so no separator sits at its ends and every
+            # part of the split is non-empty: counting the cleaned parts is enough
+            cleaned_parts = _split_columns(line, COLUMN_GAP)
+            if len(cleaned_parts) >= 3:
+                append(cleaned_parts)
+
+    return table_data
+
+
+def _parse_generic_lines(lines):
+    table_data = []
+    append = table_data.append
+
+    for line in lines:
+        if not line:
+            continue
+
+        cleaned_parts = _split_columns(line, WIDE_GAP)
+        if len(cleaned_parts) >= 2:
+            append(cleaned_parts)
+        else:
+            parts = line.split()
+            if len(parts) >= 3:
+                append(parts)
+
+    return _pad_rows(table_data) if table_data else None
+
+
+def parse_generic_text_to_table(text):
+    """Generic text parsing for any structured data: columns split on 2+ spaces"""
+    return _parse_generic_lines(split_lines(text))
+
+
+def parse_text_to_table(text):
+    """Parse text content to extract structured data as table
+
+    Recognizes the "ID + description + unit + value + date" line followed by a
+    "company + unit + value + value + percentages" line, plus lines with 3+
+    columns; falls back to parse_generic_text_to_table when nothing matches.
+    """
+    lines = split_lines(text)
+    table_data = _parse_item_lines(lines)
+
+    if table_data:
+        # The first row decides between the specific (10 column) and generic headers
+        if len(table_data[0]) == ITEM_COLUMNS:
+            return [list(ITEM_HEADERS)] + table_data
+        return _pad_rows(table_data)
+
+    return _parse_generic_lines(lines)
+
+
+def parse_text_pages(texts):
+    """Batch mode: parse the text of many pages, one result (or None) per text"""
+    return [parse_text_to_table(text or '') for text in texts]
@@ -3,6 +3,8 @@
 
 // Global variables
 let selectedFile = null;
+let progressInterval = null;
+let warmedUp = false;
 
 // DOM elements
 const uploadArea = document.getElementById('uploadArea');
@@ -13,6 +15,7 @@ const fileSize = document.getElementById('fileSize');
 const progressSection = document.getElementById('progressSection');
 const progressFill = document.getElementById('progressFill');
 const progressText = document.getElementById('progressText');
+const previewTable = document.getElementById('previewTable');
 const resultsSection = document.getElementById('resultsSection');
 const resultMessage = document.getElementById('resultMessage');
 const downloadButtons = document.getElementById('downloadButtons');
@@ -63,6 +66,7 @@ function handleDrop(event) {
 
 function processFile(file) {
     selectedFile = file;
+    warmUp();
     
     // Show file info
     fileName.textContent = file.name;
@@ -70,6 +74,13 @@ function processFile(file) {
     fileInfo.style.display = 'block';
 }
 
+// Ask the server to load its PDF libraries while the user is still choosing options
+function warmUp() {
+    if (warmedUp) return;
+    warmedUp = true;
+    fetch('/warmup', { method: 'POST' }).catch(() => {});
+}
+
 function formatFileSize(bytes) {
     if (bytes === 0) return '0 Bytes';
     const k = 1024;
@@ -97,24 +108,15 @@ function convertPDF() {
     .then(response => response.json())
     .then(data => {
         if (data.success) {
-            return fetch('/convert', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    filename: data.filename
-                })
-            });
+            return streamConversion(data.filename);
         } else {
             throw new Error(data.message);
         }
     })
-    .then(response => response.json())
     .then(data => {
         hideProgress();
         
-        if (data.success) {
+        if (data.status === 'done') {
             showResults('PDF convertido para Excel com sucesso!', [
                 {
                     text: '📊 Baixar Excel',
@@ -123,7 +125,7 @@ function convertPDF() {
                 }
             ]);
         } else {
-            showError(data.message);
+            showError(data.error || data.message);
         }
     })
     .catch(error => {
@@ -132,6 +134,161 @@ function convertPDF() {
     });
 }
 
+// Follow the conversion through /convert-stream (Server-Sent Events), showing
+// page progress and table previews. A dropped connection reattaches to the
+// same job from the last event received, so the work is never resubmitted;
+// an error from the server (unknown job, invalid options) is shown as sent.
+function streamConversion(filename) {
+    if (!window.EventSource) {
+        return startJob(filename).then(data => waitForJob(data.status_url));
+    }
+    return new Promise((resolve, reject) => {
+        let jobId = null;
+        let lastEventId = 0;
+        let retries = 0;
+        
+        const open = () => {
+            const url = jobId
+                ? `/convert-stream?job_id=${jobId}&last_event_id=${lastEventId}`
+                : `/convert-stream?filename=${encodeURIComponent(filename)}`;
+            const source = new EventSource(url);
+            const on = (type, handler) => source.addEventListener(type, event => {
+                if (event.lastEventId) {
+                    lastEventId = Number(event.lastEventId);
+                }
+                retries = 0;
+                handler(JSON.parse(event.data));
+            });
+            
+            on('job', data => {
+                jobId = data.job_id;
+                if (data.joined) {
+                    progressText.textContent = 'Conversão já em andamento, acompanhando...';
+                }
+            });
+            on('page_started', data => {
+                progressText.textContent = `Convertendo para Excel... página ${data.page} (${data.pages_done} de ${data.pages_total} concluídas)`;
+            });
+            on('page_finished', data => {
+                setProgress(100 * data.pages_done / data.pages_total);
+                progressText.textContent = `Convertendo para Excel... página ${data.pages_done} de ${data.pages_total}` +
+                    (data.rows ? ` (${data.rows} linhas)` : '');
+            });
+            on('fallback', () => {
+                progressText.textContent = 'Nenhuma tabela encontrada, tentando o tabula...';
+            });
+            on('table_preview', showPreview);
+            on('done', data => {
+                source.close();
+                resolve(data);
+            });
+            on('failed', data => {
+                source.close();
+                resolve(data);
+            });
+            // EventSource hides the status and body of a refused stream, so the
+            // reason is asked again over plain JSON routes before giving up
+            source.onerror = () => {
+                source.close();
+                if (!jobId) {
+                    // Refused before the job started (400/404): /convert answers the same
+                    // request with the server's message, or queues it (joining an identical job)
+                    startJob(filename).then(data => waitForJob(data.status_url)).then(resolve, reject);
+                    return;
+                }
+                const retry = () => {
+                    if (retries < 5) {
+                        retries++;
+                        setTimeout(open, 1000 * retries);
+                    } else {
+                        reject(new Error('Conexão com o servidor perdida'));
+                    }
+                };
+                fetch(`/jobs/${jobId}`)
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success) {
+                        reject(new Error(data.message));
+                    } else if (data.status === 'done' || data.status === 'failed') {
+                        resolve(data);
+                    } else {
+                        retry();
+                    }
+                })
+                .catch(retry);
+            };
+        };
+        open();
+    });
+}
+
+// Queue the conversion without streaming (browsers without EventSource)
+function startJob(filename) {
+    return fetch('/convert', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            filename: filename
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            throw new Error(data.message);
+        }
+        return data;
+    });
+}
+
+// Latest table found, as a small HTML table
+function showPreview(data) {
+    const table = document.createElement('table');
+    data.preview.forEach((row, rowIdx) => {
+        const tr = document.createElement('tr');
+        row.forEach(value => {
+            const cell = document.createElement(rowIdx === 0 ? 'th' : 'td');
+            cell.textContent = value;
+            tr.appendChild(cell);
+        });
+        table.appendChild(tr);
+    });
+    
+    const caption = document.createElement('p');
+    caption.textContent = `Página ${data.page}, tabela ${data.table}: ${data.rows} linhas`;
+    previewTable.innerHTML = '';
+    previewTable.appendChild(caption);
+    previewTable.appendChild(table);
+    previewTable.style.display = 'block';
+}
+
+// Poll the conversion job until it finishes, showing page progress
+function waitForJob(statusUrl) {
+    return new Promise((resolve, reject) => {
+        const poll = () => {
+            fetch(statusUrl)
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) {
+                    reject(new Error(data.message));
+                    return;
+                }
+                if (data.status === 'done' || data.status === 'failed') {
+                    resolve(data);
+                    return;
+                }
+                if (data.pages_total > 0) {
+                    progressText.textContent = `Convertendo para Excel... página ${data.pages_done} de ${data.pages_total}`;
+                }
+                setTimeout(poll, 1000);
+            })
+            .catch(reject);
+        };
+        poll();
+    });
+}
+
 // UI functions
 function showProgress(message) {
     progressSection.style.display = 'block';
@@ -139,22 +296,31 @@ function showProgress(message) {
     errorSection.style.display = 'none';
     progressText.textContent = message;
     
-    // Animate progress bar
+    // Animate progress bar until the real page progress arrives
     let progress = 0;
-    const interval = setInterval(() => {
+    clearInterval(progressInterval);
+    progressInterval = setInterval(() => {
         progress += Math.random() * 15;
         if (progress > 90) progress = 90;
         progressFill.style.width = progress + '%';
         
         if (progress >= 90) {
-            clearInterval(interval);
+            clearInterval(progressInterval);
         }
     }, 200);
 }
 
+function setProgress(percent) {
+    clearInterval(progressInterval);
+    progressFill.style.width = percent + '%';
+}
+
 function hideProgress() {
+    clearInterval(progressInterval);
     progressSection.style.display = 'none';
     progressFill.style.width = '0%';
+    previewTable.style.display = 'none';
+    previewTable.innerHTML = '';
 }
 
 function showResults(message, buttons) {